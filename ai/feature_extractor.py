@@ -5,7 +5,7 @@ Extract temporal features từ chuỗi frames để train ML model
 import numpy as np
 from typing import List, Dict
 from collections import deque
-from core.tracker import PersonTrack
+from core.tracker import PersonTrack, TrackEvent
 
 
 class FeatureExtractor:
@@ -199,6 +199,11 @@ class FeatureExtractor:
         if track_id in self.feature_buffers:
             del self.feature_buffers[track_id]
     
+    def on_track_event(self, event: TrackEvent, track: PersonTrack):
+        """Track lifecycle listener: drop feature buffer of removed tracks"""
+        if event == TrackEvent.REMOVED:
+            self.reset_buffer(track.track_id)
+    
     def get_feature_dict_for_logging(
         self, track_id: int, track: PersonTrack
     ) -> Dict:
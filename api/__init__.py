@@ -1,7 +1,12 @@
 """API modules initialization"""
 from api.websocket_server import WebSocketServer, AlertHandler
+from api.alert_forwarder import QueueAlertSink, AlertForwarder
+from api.metrics_server import MetricsServer
 
 __all__ = [
     'WebSocketServer',
-    'AlertHandler'
+    'AlertHandler',
+    'QueueAlertSink',
+    'AlertForwarder',
+    'MetricsServer'
 ]
@@ -0,0 +1,104 @@
+"""
+Alert forwarding giữa worker processes và supervisor
+Worker không mở WebSocket riêng, chỉ đẩy alert vào queue
+Supervisor gom alert từ tất cả worker về 1 WebSocketServer
+"""
+import queue
+import threading
+import time
+
+
+class QueueAlertSink:
+    """
+    Worker-side stand-in for WebSocketServer
+    Cùng interface send_alert/send_warning, nhưng ghi vào multiprocessing queue
+    """
+
+    def __init__(self, alert_queue, worker_name: str):
+        self.alert_queue = alert_queue
+        self.worker_name = worker_name
+        self.enabled = True
+
+        # Giữ attribute giống WebSocketServer (cooldown xử lý ở supervisor)
+        self.clients = set()
+        self.last_alert_time = {}
+        self.messages_sent = 0
+        self.send_failures = 0  # Queue full
+
+    def start(self):
+        """Nothing to start - supervisor owns the server"""
+        pass
+
+    def stop(self):
+        """Nothing to stop"""
+        pass
+
+    def forget_track(self, track_id: int, camera_id: str = None):
+        """Cooldown nằm ở supervisor - không có gì để dọn"""
+        pass
+
+    def send_alert(self, **alert):
+        """Forward alarm to supervisor"""
+        self._put('ALARM', alert)
+
+    def send_warning(self, **warning):
+        """Forward warning to supervisor"""
+        self._put('WARNING', warning)
+
+    def _put(self, alert_type: str, payload: dict):
+        try:
+            self.alert_queue.put_nowait({
+                'type': alert_type,
+                'worker': self.worker_name,
+                'payload': payload,
+            })
+            self.messages_sent += 1
+        except queue.Full:
+            self.send_failures += 1
+            print(f"[WORKER {self.worker_name}] Alert queue full, dropped {alert_type}")
+
+
+class AlertForwarder:
+    """
+    Supervisor-side: drain alert queue → WebSocketServer
+    """
+
+    def __init__(self, alert_queue, websocket_server):
+        self.alert_queue = alert_queue
+        self.websocket_server = websocket_server
+
+        self.running = False
+        self.thread = None
+        self.forwarded = 0
+
+    def start(self):
+        """Start forwarding thread"""
+        self.running = True
+        self.thread = threading.Thread(target=self._forward_loop, daemon=True)
+        self.thread.start()
+
+    def stop(self):
+        """Stop forwarding thread"""
+        self.running = False
+        if self.thread is not None:
+            self.thread.join(timeout=2.0)
+            self.thread = None
+
+    def _forward_loop(self):
+        while self.running:
+            try:
+                message = self.alert_queue.get(timeout=0.5)
+            except queue.Empty:
+                continue
+            except (EOFError, OSError):
+                time.sleep(0.5)
+                continue
+
+            payload = message.get('payload', {})
+
+            if message.get('type') == 'ALARM':
+                self.websocket_server.send_alert(**payload)
+            else:
+                self.websocket_server.send_warning(**payload)
+
+            self.forwarded += 1
@@ -0,0 +1,240 @@
+"""
+Metrics HTTP endpoint (Prometheus text format)
+Chạy aiohttp trong background thread, chỉ đọc counter/histogram có sẵn
+của các FallDetectionSystem → không block detection loop
+"""
+import asyncio
+import threading
+import time
+from typing import Callable, Dict, List
+
+from aiohttp import web
+
+from core.state_machine import FallState
+
+
+def _format_labels(labels: dict) -> str:
+    if not labels:
+        return ''
+    parts = []
+    for key, value in labels.items():
+        value = str(value).replace('\\', '\\\\').replace('"', '\\"').replace('\n', '\\n')
+        parts.append(f'{key}="{value}"')
+    return '{' + ','.join(parts) + '}'
+
+
+class _MetricsWriter:
+    """Gom output theo metric family (HELP/TYPE 1 lần / family)"""
+
+    def __init__(self):
+        self.families: Dict[str, dict] = {}
+
+    def add(self, name: str, metric_type: str, help_text: str, value, labels: dict = None):
+        family = self._family(name, metric_type, help_text)
+        family['samples'].append(f"{name}{_format_labels(labels)} {float(value)!r}")
+
+    def add_histogram(self, name: str, help_text: str, histogram, labels: dict = None):
+        """
+        LatencyHistogram (ms buckets) → Prometheus histogram (seconds)
+        Dùng bộ đếm cumulative, bucket `le` cộng dồn
+        """
+        labels = labels or {}
+        family = self._family(name, 'histogram', help_text)
+        samples = family['samples']
+
+        # Copy trước khi đọc (detection thread vẫn đang ghi)
+        counts = list(histogram.counts)
+        total_count = sum(counts)
+        sum_seconds = histogram.sum_ms / 1000.0
+
+        cumulative = 0
+        for bound_ms, bucket_count in zip(histogram.bounds, counts):
+            cumulative += bucket_count
+            bucket_labels = dict(labels, le=repr(bound_ms / 1000.0))
+            samples.append(f"{name}_bucket{_format_labels(bucket_labels)} {cumulative}")
+
+        samples.append(f"{name}_bucket{_format_labels(dict(labels, le='+Inf'))} {total_count}")
+        samples.append(f"{name}_sum{_format_labels(labels)} {sum_seconds!r}")
+        samples.append(f"{name}_count{_format_labels(labels)} {total_count}")
+
+    def _family(self, name: str, metric_type: str, help_text: str) -> dict:
+        family = self.families.get(name)
+        if family is None:
+            family = {'type': metric_type, 'help': help_text, 'samples': []}
+            self.families[name] = family
+        return family
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for name, family in self.families.items():
+            lines.append(f"# HELP {name} {family['help']}")
+            lines.append(f"# TYPE {name} {family['type']}")
+            lines.extend(family['samples'])
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """
+    GET /metrics → Prometheus text format
+    systems_provider: callable trả về {camera_id: FallDetectionSystem}
+    """
+
+    def __init__(self, config: dict, systems_provider: Callable[[], dict], websocket_server=None):
+        self.config = config
+        self.systems_provider = systems_provider
+        self.websocket_server = websocket_server
+
+        server_config = config.get('monitoring', {}).get('metrics_server', {})
+        self.enabled = server_config.get('enabled', False)
+        self.host = server_config.get('host', '127.0.0.1')
+        self.port = int(server_config.get('port', 9100))
+
+        self.start_time = time.time()
+        self.scrapes = 0
+
+        # Server thread
+        self.server_thread = None
+        self.running = False
+
+    def start(self):
+        """Start HTTP server in background thread"""
+        if not self.enabled:
+            return
+
+        self.running = True
+        self.server_thread = threading.Thread(target=self._run_server, daemon=True)
+        self.server_thread.start()
+
+        print(f"[METRICS] Serving http://{self.host}:{self.port}/metrics")
+
+    def stop(self):
+        """Stop HTTP server"""
+        self.running = False
+        if self.server_thread is not None:
+            self.server_thread.join(timeout=2.0)
+            self.server_thread = None
+
+    def _run_server(self):
+        """Run asyncio event loop in thread"""
+        try:
+            asyncio.run(self._async_server())
+        except OSError as e:
+            print(f"[ERROR] Metrics server failed to start: {e}")
+
+    async def _async_server(self):
+        """Async server main"""
+        app = web.Application()
+        app.router.add_get('/metrics', self._handle_metrics)
+
+        runner = web.AppRunner(app, access_log=None)
+        await runner.setup()
+        site = web.TCPSite(runner, self.host, self.port)
+        await site.start()
+
+        try:
+            while self.running:
+                await asyncio.sleep(0.1)
+        finally:
+            await runner.cleanup()
+
+    async def _handle_metrics(self, request: web.Request) -> web.Response:
+        self.scrapes += 1
+        return web.Response(
+            text=self.render(),
+            content_type='text/plain',
+            headers={'X-Content-Type-Options': 'nosniff'},
+            charset='utf-8'
+        )
+
+    def render(self) -> str:
+        """Build Prometheus exposition text from live component state"""
+        out = _MetricsWriter()
+
+        out.add('fall_uptime_seconds', 'gauge', 'Seconds since metrics server creation',
+                time.time() - self.start_time)
+
+        # list() trước khi iterate: dict có thể thay đổi ở detection thread
+        systems = list(self.systems_provider().items())
+
+        websocket_servers = {}
+        if self.websocket_server is not None:
+            websocket_servers[id(self.websocket_server)] = self.websocket_server
+
+        for camera_id, system in systems:
+            labels = {'camera': camera_id if camera_id is not None else 'default'}
+            self._render_system(out, system, labels)
+            websocket_servers.setdefault(id(system.websocket_server), system.websocket_server)
+
+        for server in websocket_servers.values():
+            out.add('fall_websocket_clients', 'gauge', 'Connected WebSocket clients',
+                    len(getattr(server, 'clients', ())))
+            out.add('fall_websocket_messages_sent_total', 'counter',
+                    'WebSocket messages delivered', getattr(server, 'messages_sent', 0))
+            out.add('fall_websocket_send_failures_total', 'counter',
+                    'WebSocket sends that failed (client dropped)',
+                    getattr(server, 'send_failures', 0))
+
+        return out.render()
+
+    def _render_system(self, out: _MetricsWriter, system, labels: dict):
+        # Frames
+        out.add('fall_frames_processed_total', 'counter', 'Frames processed by the pipeline',
+                system.frame_count, labels)
+        out.add('fall_frames_dropped_total', 'counter',
+                'Frames overwritten by the capture thread before processing',
+                system.dropped_frames, labels)
+        out.add('fall_inference_skipped_total', 'counter',
+                'Frames where pose inference was skipped (adaptive stride)',
+                system.scheduler.skipped_frames, labels)
+        out.add('fall_fps', 'gauge', 'Processed frames per second', system.fps, labels)
+        out.add('fall_capture_latency_seconds', 'gauge', 'Mean capture-to-decision latency',
+                system.latency_ms / 1000.0, labels)
+
+        # Stage latency histograms (StageProfiler)
+        for stage, histogram in list(system.profiler.histograms.items()):
+            out.add_histogram('fall_stage_latency_seconds', 'Per-stage pipeline latency',
+                              histogram, dict(labels, stage=stage))
+
+        # Motion gate (thresholds + skip counters)
+        gate = system.motion_gate
+        out.add('fall_motion_gate_enabled', 'gauge', 'Motion gate enabled (1/0)',
+                1 if gate.enabled else 0, labels)
+        out.add('fall_motion_gate_fg_ratio', 'gauge', 'Last downscaled foreground ratio',
+                gate.fg_ratio, labels)
+        out.add('fall_motion_gate_fg_ratio_threshold', 'gauge',
+                'Foreground ratio below which the scene counts as static',
+                gate.fg_ratio_threshold, labels)
+        out.add('fall_motion_gate_max_skip_frames', 'gauge',
+                'Max consecutive frames served from reused detections',
+                gate.max_skip_frames, labels)
+        out.add('fall_motion_gate_skipped_total', 'counter',
+                'Frames where YOLO was skipped by the motion gate',
+                gate.gated_frames, labels)
+
+        # Tracks + state population
+        out.add('fall_active_tracks', 'gauge', 'Active person tracks',
+                len(system.tracker.get_all_tracks()), labels)
+
+        population = {state: 0 for state in FallState}
+        for sm in list(system.state_manager.state_machines.values()):
+            population[sm.current_state] += 1
+        for state, count in population.items():
+            out.add('fall_state_population', 'gauge', 'Persons per fall state',
+                    count, dict(labels, state=state.value))
+
+        # Alerts
+        out.add('fall_alarms_raised_total', 'counter', 'Alarms triggered',
+                system.alert_handler.alarms_raised, labels)
+        out.add('fall_warnings_raised_total', 'counter', 'Warnings triggered',
+                system.alert_handler.warnings_raised, labels)
+
+        # Recorder
+        recorder = system.recorder
+        out.add('fall_recorder_queue_depth', 'gauge', 'Frames held by the video recorder',
+                len(recorder.buffer.buffer), dict(labels, queue='buffer'))
+        out.add('fall_recorder_queue_depth', 'gauge', 'Frames held by the video recorder',
+                len(recorder.event_frames), dict(labels, queue='event'))
+
+        # SQLite
+        out.add_histogram('fall_sqlite_write_latency_seconds', 'EventLogger SQLite write latency',
+                          system.logger.write_latency, labels)
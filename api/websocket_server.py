@@ -6,8 +6,11 @@ import asyncio
 import websockets
 import json
 from typing import Set, Dict
+from collections import deque
 import threading
 import time
+from core.clock import SystemClock
+from core.tracker import TrackEvent
 
 
 class WebSocketServer:
@@ -15,8 +18,9 @@ class WebSocketServer:
     WebSocket server for iOS app integration
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, clock=None):
         self.config = config
+        self.clock = clock if clock is not None else SystemClock()
         api_config = config.get('ios_api', {})
         
         self.enabled = api_config.get('enabled', False)
@@ -28,7 +32,11 @@ class WebSocketServer:
         self.clients: Set[websockets.WebSocketServerProtocol] = set()
         
         # Alert history (for cooldown)
-        self.last_alert_time = {}  # {track_id: timestamp}
+        self.last_alert_time = {}  # {(camera_id, track_id): timestamp}
+        
+        # Stats (metrics endpoint)
+        self.messages_sent = 0
+        self.send_failures = 0
         
         # Server thread
         self.server_thread = None
@@ -129,7 +137,9 @@ class WebSocketServer:
         state: str,
         snapshot_path: str = None,
         clip_path: str = None,
-        features: dict = None
+        features: dict = None,
+        camera_id: str = None,
+        breathing: dict = None
     ):
         """
         Send alert to all connected clients
@@ -138,25 +148,30 @@ class WebSocketServer:
             return
         
         # Check cooldown
-        current_time = time.time()
-        last_time = self.last_alert_time.get(track_id, 0)
+        current_time = self.clock.now()
+        alert_key = (camera_id, track_id)
+        last_time = self.last_alert_time.get(alert_key)
         
-        if current_time - last_time < self.alert_cooldown:
+        # Chưa alert lần nào → gửi ngay (VideoClock bắt đầu từ 0, không so với 0)
+        if last_time is not None and current_time - last_time < self.alert_cooldown:
             return  # Too soon
         
         # Update last alert time
-        self.last_alert_time[track_id] = current_time
+        self.last_alert_time[alert_key] = current_time
+        self._prune_alert_times(current_time)
         
         # Create alert message
         alert = {
             'type': 'ALARM',
+            'camera_id': camera_id,
             'track_id': track_id,
             'risk_score': risk_score,
             'state': state,
             'timestamp': current_time,
             'snapshot': snapshot_path,
             'clip': clip_path,
-            'features': features
+            'features': dict(features) if features is not None else None,  # PoseFeatures → dict
+            'breathing': breathing
         }
         
         # Send to all clients
@@ -164,11 +179,25 @@ class WebSocketServer:
         
         print(f"[API] Alert sent to {len(self.clients)} clients (track {track_id})")
     
+    def _prune_alert_times(self, current_time: float):
+        """Cooldown hết hạn → không cần giữ nữa (bounded retention)"""
+        expired = [
+            key for key, last_time in self.last_alert_time.items()
+            if current_time - last_time >= self.alert_cooldown
+        ]
+        for key in expired:
+            del self.last_alert_time[key]
+    
+    def forget_track(self, track_id: int, camera_id: str = None):
+        """Drop cooldown entry of a removed track"""
+        self.last_alert_time.pop((camera_id, track_id), None)
+    
     def send_warning(
         self,
         track_id: int,
         risk_score: float,
-        state: str
+        state: str,
+        camera_id: str = None
     ):
         """Send warning (lower priority than alarm)"""
         if not self.enabled or len(self.clients) == 0:
@@ -176,10 +205,11 @@ class WebSocketServer:
         
         warning = {
             'type': 'WARNING',
+            'camera_id': camera_id,
             'track_id': track_id,
             'risk_score': risk_score,
             'state': state,
-            'timestamp': time.time()
+            'timestamp': self.clock.now()
         }
         
         asyncio.run(self._broadcast(warning))
@@ -209,7 +239,9 @@ class WebSocketServer:
         for client in self.clients:
             try:
                 await client.send(message_str)
+                self.messages_sent += 1
             except:
+                self.send_failures += 1
                 disconnected.add(client)
         
         # Remove disconnected clients
@@ -221,12 +253,24 @@ class AlertHandler:
     Manage alerts and notifications
     """
     
-    def __init__(self, config: dict, websocket_server: WebSocketServer):
+    def __init__(
+        self,
+        config: dict,
+        websocket_server: WebSocketServer,
+        camera_id: str = None,
+        clock=None
+    ):
         self.config = config
         self.websocket_server = websocket_server
+        self.camera_id = camera_id  # Multi-camera: nhiều handler dùng chung 1 server
+        self.clock = clock if clock is not None else SystemClock()
+        
+        # Alert history (bounded)
+        self.alert_history = deque(maxlen=config.get('ios_api', {}).get('alert_history_size', 1000))
         
-        # Alert history
-        self.alert_history = []
+        # Counters (metrics endpoint)
+        self.alarms_raised = 0
+        self.warnings_raised = 0
     
     def trigger_alarm(
         self,
@@ -235,18 +279,22 @@ class AlertHandler:
         state: str,
         snapshot_path: str = None,
         clip_path: str = None,
-        features: dict = None
+        features: dict = None,
+        breathing: dict = None
     ):
         """Trigger alarm alert"""
         # Log to history
         alert = {
+            'camera_id': self.camera_id,
             'track_id': track_id,
             'risk_score': risk_score,
             'state': state,
-            'timestamp': time.time(),
-            'type': 'ALARM'
+            'timestamp': self.clock.now(),
+            'type': 'ALARM',
+            'breathing': breathing
         }
         self.alert_history.append(alert)
+        self.alarms_raised += 1
         
         # Send to iOS app
         self.websocket_server.send_alert(
@@ -255,7 +303,9 @@ class AlertHandler:
             state=state,
             snapshot_path=snapshot_path,
             clip_path=clip_path,
-            features=features
+            features=features,
+            camera_id=self.camera_id,
+            breathing=breathing
         )
         
         print(f"[ALERT] ALARM triggered for track {track_id} (risk: {risk_score:.1f})")
@@ -269,23 +319,33 @@ class AlertHandler:
         """Trigger warning alert"""
         # Log to history
         alert = {
+            'camera_id': self.camera_id,
             'track_id': track_id,
             'risk_score': risk_score,
             'state': state,
-            'timestamp': time.time(),
+            'timestamp': self.clock.now(),
             'type': 'WARNING'
         }
         self.alert_history.append(alert)
+        self.warnings_raised += 1
         
         # Send to iOS app
         self.websocket_server.send_warning(
             track_id=track_id,
             risk_score=risk_score,
-            state=state
+            state=state,
+            camera_id=self.camera_id
         )
         
         print(f"[ALERT] WARNING for track {track_id} (risk: {risk_score:.1f})")
     
+    def on_track_event(self, event: TrackEvent, track):
+        """Track lifecycle listener: drop alert cooldown of removed tracks"""
+        if event == TrackEvent.REMOVED:
+            forget_track = getattr(self.websocket_server, 'forget_track', None)
+            if forget_track is not None:
+                forget_track(track.track_id, camera_id=self.camera_id)
+    
     def get_recent_alerts(self, count: int = 10) -> list:
         """Get recent alerts"""
-        return self.alert_history[-count:]
+        return list(self.alert_history)[-count:]
@@ -0,0 +1 @@
+"""Benchmarks & replay checks (chạy từ repo root: python3 -m benchmarks.<name>)"""
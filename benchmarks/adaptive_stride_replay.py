@@ -0,0 +1,166 @@
+"""
+Adaptive stride replay check
+Chạy cùng 1 synthetic scene 2 lần (full-rate vs adaptive stride)
+qua toàn bộ FallDetectionSystem pipeline, so sánh:
+- tỉ lệ frame bỏ qua inference
+- số ca ngã phát hiện được (FALLEN / ALARM) và độ trễ
+Ground truth = các ca ngã theo kịch bản đủ thời gian tới FALLEN trong replay window
+(ngã sau cuối window không tính)
+Exit code 1 nếu adaptive stride bỏ sót ca ngã nào của ground truth, hoặc window quá ngắn
+không chứa ca ngã nào
+
+Usage: python3 -m benchmarks.adaptive_stride_replay [--stride 3] [--seconds 20]
+"""
+import sys
+import json
+import copy
+import argparse
+
+from core import FallState, ManualClock
+from main import FallDetectionSystem
+from benchmarks.synthetic import SyntheticScene, load_benchmark_config
+
+
+# Thời gian (s) để pipeline nhận ra tư thế ngã (vài frame + stride) trước khi FALLING
+DETECTION_SLACK = 1.0
+
+
+def replay(config: dict, scene: SyntheticScene, seconds: float, fps: float, on_start=None) -> dict:
+    """
+    Replay scene qua pipeline, trả về transitions + inference stats
+    on_start: callback(system) trước frame đầu (gắn thêm listener)
+    """
+    clock = ManualClock(start_time=0.0)
+
+    # Predictions được inject trực tiếp → model không bao giờ được gọi
+    system = FallDetectionSystem(config=config, pose_model=scene, clock=clock)
+
+    transitions = []
+    system.state_manager.add_transition_listener(
+        lambda track_id, old, new, t: transitions.append(
+            (track_id, new, t, system.tracker.get_track(track_id))
+        )
+    )
+
+    if on_start is not None:
+        on_start(system)
+
+    frame = scene.blank_frame()
+    num_frames = int(seconds * fps)
+
+    for frame_index in range(num_frames):
+        t = frame_index / fps
+        clock.set(t)
+
+        if system.needs_inference():
+            kpts, boxes, confs = scene.predict(t)
+            detections = system.detector.process_predictions(
+                frame, kpts, boxes, confs, timestamp=t
+            )
+            system._process_frame(frame, t, detections=detections)
+        else:
+            system._process_frame(frame, t, skip_inference=True)
+
+        system.frame_count += 1
+
+    return {
+        'transitions': transitions,
+        'inference': system.scheduler.get_stats(),
+        'seconds': seconds,
+        # FALLING → FALLEN sau fall_duration_threshold
+        'confirm_seconds': config['detection']['fall_duration_threshold'] + DETECTION_SLACK,
+    }
+
+
+def summarize(result: dict, scene: SyntheticScene) -> dict:
+    """
+    Map transitions → synthetic fallers, tính phát hiện + độ trễ
+    'expected': ca ngã đủ thời gian tới FALLEN trước cuối replay (chỉ các ca này được đếm)
+    """
+    fallers = scene.falling_people
+    detected = {}
+
+    for track_id, state, t, track in result['transitions']:
+        if track is None:
+            continue
+
+        # Track → người ngã gần nhất (người ngã đứng yên trước khi ngã)
+        first_x = track.history.centroids[0, 0]
+        person_index = min(
+            range(len(fallers)), key=lambda i: abs(fallers[i].foot_x - first_x)
+        )
+        if abs(fallers[person_index].foot_x - first_x) > fallers[person_index].height:
+            continue  # Không phải người ngã (vd. walking)
+
+        entry = detected.setdefault(person_index, {})
+        entry.setdefault(state.value, t)
+
+    falls = []
+    for i, person in enumerate(fallers):
+        entry = detected.get(i, {})
+        falling_t = entry.get(FallState.FALLING.value)
+        falls.append({
+            'fall_time': person.fall_time,
+            'expected': person.fall_time + person.fall_duration + result['confirm_seconds'] <= result['seconds'],
+            'falling_delay': None if falling_t is None else round(falling_t - person.fall_time, 3),
+            'fallen': FallState.FALLEN.value in entry,
+            'alarm': FallState.ALARM.value in entry,
+        })
+
+    return {
+        'inference': result['inference'],
+        'falls_expected': sum(1 for f in falls if f['expected']),
+        'falls_detected': sum(1 for f in falls if f['expected'] and f['fallen']),
+        'alarms': sum(1 for f in falls if f['expected'] and f['alarm']),
+        'falls': falls,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Adaptive inference stride replay check')
+    parser.add_argument('--stride', type=int, default=3, help='calm_stride to test')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Replay length')
+    parser.add_argument('--fps', type=float, default=30.0, help='Replay frame rate')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    base_config = load_benchmark_config()
+    motions = ['walking', 'sitting', 'falling', 'standing', 'falling']
+    # Ngã ở giữa các giai đoạn calm, nằm 10s rồi đứng dậy
+    fall_times = [12.0, 35.0]
+
+    results = {}
+    for name, enabled in (('full_rate', False), ('adaptive', True)):
+        config = copy.deepcopy(base_config)
+        config['pose']['max_people'] = len(motions)
+        config['pose']['adaptive_stride'] = dict(
+            config['pose'].get('adaptive_stride', {}),
+            enabled=enabled,
+            calm_stride=args.stride,
+        )
+
+        scene = SyntheticScene(
+            len(motions), motions, fall_times=fall_times,
+            lie_duration=10.0, seed=args.seed
+        )
+        results[name] = summarize(replay(config, scene, args.seconds, args.fps), scene)
+
+    # So với kịch bản, không chỉ với full-rate (full-rate cũng có thể bỏ sót)
+    missed = {
+        name: [i for i, fall in enumerate(results[name]['falls']) if fall['expected'] and not fall['fallen']]
+        for name in ('full_rate', 'adaptive')
+    }
+    checked = results['adaptive']['falls_expected']
+    if checked == 0:
+        print(f"[ERROR] No scripted fall can reach FALLEN within {args.seconds}s, nothing checked",
+              file=sys.stderr)
+
+    results['missed_falls'] = missed
+    results['no_missed_falls'] = checked > 0 and not missed['adaptive']
+
+    print(json.dumps(results, indent=2))
+    sys.exit(0 if results['no_missed_falls'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,241 @@
+"""
+Pose backend benchmark
+So sánh các pose.backend trên CPU với cùng input:
+- latency p50 / p95 / mean mỗi frame (sau warmup)
+- keypoint agreement so với backend tham chiếu (mặc định ultralytics):
+  người được ghép theo box IoU, sai số keypoint chuẩn hoá theo cạnh dài box
+Backend không load được (thiếu thư viện / model) được ghi lý do và bỏ qua
+
+Export model trước (ultralytics):
+  yolo export model=yolov8n-pose.pt format=onnx dynamic=True
+  yolo export model=yolov8n-pose.pt format=torchscript
+hoặc --export để script tự export
+
+Usage: python3 -m benchmarks.backend_benchmark [--source video.mp4]
+       [--backends ultralytics onnxruntime onnxruntime-int8 openvino torchscript]
+"""
+import os
+import sys
+import copy
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from core.pose_backends import create_pose_backend
+from utils.metrics import LatencyHistogram
+from benchmarks.synthetic import load_benchmark_config
+
+
+DEFAULT_BACKENDS = ['ultralytics', 'onnxruntime', 'onnxruntime-int8', 'openvino', 'torchscript']
+EXPORT_FORMATS = {'onnxruntime': 'onnx', 'openvino': 'onnx', 'torchscript': 'torchscript'}
+
+
+def load_frames(source: str, count: int) -> list:
+    """Ảnh (lặp lại) hoặc count frame đầu của video; None → ảnh mẫu của ultralytics"""
+    if source is None:
+        from ultralytics.utils import ASSETS
+        source = str(ASSETS / 'bus.jpg')
+
+    image = cv2.imread(source)
+    if image is not None:
+        return [image] * count
+
+    frames = []
+    cap = cv2.VideoCapture(source)
+    while len(frames) < count:
+        ret, frame = cap.read()
+        if not ret:
+            break
+        frames.append(frame)
+    cap.release()
+
+    if not frames:
+        raise ValueError(f"Cannot read frames from {source}")
+    return frames
+
+
+def backend_config(config: dict, name: str) -> dict:
+    """pose.backend (+ int8) cho 1 tên trong --backends"""
+    config = copy.deepcopy(config)
+    pose_cfg = config.setdefault('pose', {})
+
+    if name == 'onnxruntime-int8':
+        pose_cfg['backend'] = 'onnxruntime'
+        pose_cfg.setdefault('onnx', {})['int8'] = True
+    else:
+        pose_cfg['backend'] = name
+        if name == 'onnxruntime':
+            pose_cfg.setdefault('onnx', {})['int8'] = False
+
+    return config
+
+
+def export_models(config: dict, backends: list):
+    """Export .onnx / .torchscript từ pose.model_path nếu chưa có"""
+    from ultralytics import YOLO
+
+    pose_cfg = config.get('pose', {})
+    model = YOLO(pose_cfg.get('model_path', 'yolov8n-pose.pt'))
+    paths = {
+        'onnx': pose_cfg.get('onnx', {}).get('model_path'),
+        'torchscript': pose_cfg.get('torchscript', {}).get('model_path'),
+    }
+
+    for fmt in sorted({EXPORT_FORMATS[name.split('-')[0]] for name in backends
+                       if name.split('-')[0] in EXPORT_FORMATS}):
+        if paths[fmt] and os.path.exists(paths[fmt]):
+            continue
+        kwargs = {'dynamic': True} if fmt == 'onnx' else {}
+        exported = model.export(format=fmt, imgsz=int(pose_cfg.get('imgsz', 640)), **kwargs)
+        print(f"[BENCH] Exported {fmt}: {exported}", file=sys.stderr)
+        if paths[fmt] is None or not os.path.exists(paths[fmt]):
+            section = 'onnx' if fmt == 'onnx' else 'torchscript'
+            pose_cfg.setdefault(section, {})['model_path'] = exported
+            if fmt == 'onnx':
+                pose_cfg.setdefault('openvino', {})['model_path'] = exported
+
+
+def run_backend(backend, frames: list, imgsz: int, conf: float, iou: float, warmup: int):
+    """Predict từng frame (batch 1 như camera đơn), trả về (predictions, histogram)"""
+    for frame in frames[:warmup]:
+        backend.predict_pose([frame], imgsz, conf, iou)
+
+    histogram = LatencyHistogram()
+    predictions = []
+    for frame in frames:
+        start = time.perf_counter()
+        predictions.append(backend.predict_pose([frame], imgsz, conf, iou)[0])
+        histogram.record(time.perf_counter() - start)
+
+    return predictions, histogram
+
+
+def box_iou(a: np.ndarray, b: np.ndarray) -> np.ndarray:
+    """IoU matrix (len(a), len(b)) cho box xyxy"""
+    x1 = np.maximum(a[:, None, 0], b[None, :, 0])
+    y1 = np.maximum(a[:, None, 1], b[None, :, 1])
+    x2 = np.minimum(a[:, None, 2], b[None, :, 2])
+    y2 = np.minimum(a[:, None, 3], b[None, :, 3])
+    inter = np.clip(x2 - x1, 0, None) * np.clip(y2 - y1, 0, None)
+    area_a = (a[:, 2] - a[:, 0]) * (a[:, 3] - a[:, 1])
+    area_b = (b[:, 2] - b[:, 0]) * (b[:, 3] - b[:, 1])
+    return inter / np.maximum(area_a[:, None] + area_b[None, :] - inter, 1e-9)
+
+
+def keypoint_agreement(reference: list, predictions: list, kpt_conf: float,
+                       match_iou: float = 0.5) -> dict:
+    """
+    Người của reference ghép greedy theo IoU với predictions
+    error = khoảng cách keypoint / cạnh dài box reference (chỉ keypoint đủ conf ở cả 2)
+    """
+    matched = 0
+    total = 0
+    extra = 0
+    errors = []
+
+    for (ref_kpts, ref_boxes, _), (kpts, boxes, _) in zip(reference, predictions):
+        total += len(ref_boxes)
+        extra += max(len(boxes) - len(ref_boxes), 0)
+        if len(ref_boxes) == 0 or len(boxes) == 0:
+            continue
+
+        iou = box_iou(ref_boxes, boxes)
+        while True:
+            i, j = np.unravel_index(np.argmax(iou), iou.shape)
+            if iou[i, j] < match_iou:
+                break
+            iou[i, :] = -1
+            iou[:, j] = -1
+            matched += 1
+
+            visible = (ref_kpts[i, :, 2] >= kpt_conf) & (kpts[j, :, 2] >= kpt_conf)
+            if not visible.any():
+                continue
+            scale = max(ref_boxes[i, 2] - ref_boxes[i, 0], ref_boxes[i, 3] - ref_boxes[i, 1], 1.0)
+            dist = np.linalg.norm(ref_kpts[i, visible, :2] - kpts[j, visible, :2], axis=1)
+            errors.extend((dist / scale).tolist())
+
+    errors = np.array(errors) if errors else np.zeros(1)
+    return {
+        'reference_people': total,
+        'matched_people': matched,
+        'match_rate': matched / max(total, 1),
+        'extra_people': extra,
+        'kpt_error_mean': round(float(errors.mean()), 4),
+        'kpt_error_p95': round(float(np.percentile(errors, 95)), 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pose backend CPU latency + agreement')
+    parser.add_argument('--source', default=None, help='Image or video (default: ultralytics bus.jpg)')
+    parser.add_argument('--backends', nargs='+', default=DEFAULT_BACKENDS,
+                        help='Backends to compare (first one is the reference)')
+    parser.add_argument('--frames', type=int, default=50, help='Measured frames per backend')
+    parser.add_argument('--warmup', type=int, default=5)
+    parser.add_argument('--imgsz', type=int, default=None, help='Input size (default: pose.imgsz)')
+    parser.add_argument('--threads', type=int, default=None, help='Override pose.num_threads')
+    parser.add_argument('--onnx', default=None, help='Override pose.onnx.model_path')
+    parser.add_argument('--openvino', default=None, help='Override pose.openvino.model_path')
+    parser.add_argument('--torchscript', default=None, help='Override pose.torchscript.model_path')
+    parser.add_argument('--export', action='store_true', help='Export missing models with ultralytics')
+    args = parser.parse_args()
+
+    config = load_benchmark_config()
+    pose_cfg = config.setdefault('pose', {})
+    for section, path in (('onnx', args.onnx), ('openvino', args.openvino),
+                          ('torchscript', args.torchscript)):
+        if path is not None:
+            pose_cfg.setdefault(section, {})['model_path'] = path
+    if args.threads is not None:
+        pose_cfg['num_threads'] = args.threads
+
+    imgsz = args.imgsz or int(pose_cfg.get('imgsz', 640))
+    conf = float(pose_cfg.get('conf', 0.25))
+    iou = float(pose_cfg.get('iou', 0.45))
+    kpt_conf = float(pose_cfg.get('kpt_conf', 0.30))
+
+    if args.export:
+        export_models(config, args.backends)
+
+    frames = load_frames(args.source, args.frames)
+    results = {}
+    reference = None
+
+    for name in args.backends:
+        print(f"[BENCH] {name}...", file=sys.stderr)
+        try:
+            backend = create_pose_backend(backend_config(config, name))
+        except Exception as e:
+            results[name] = {'skipped': f"{type(e).__name__}: {e}"}
+            continue
+
+        predictions, histogram = run_backend(backend, frames, imgsz, conf, iou, args.warmup)
+        summary = histogram.summary()
+        results[name] = {
+            'latency_ms_p50': round(summary['p50_ms'], 2),
+            'latency_ms_p95': round(summary['p95_ms'], 2),
+            'latency_ms_mean': round(summary['mean_ms'], 2),
+            'fps': round(1000.0 / max(summary['mean_ms'], 1e-6), 1),
+            'people_per_frame': round(sum(len(p[1]) for p in predictions) / len(predictions), 2),
+        }
+
+        if reference is None:
+            reference = (name, predictions)
+        else:
+            results[name]['agreement'] = keypoint_agreement(reference[1], predictions, kpt_conf)
+
+    print(json.dumps({
+        'source': args.source,
+        'frames': len(frames),
+        'imgsz': imgsz,
+        'reference': reference[0] if reference else None,
+        'backends': results,
+    }, indent=2))
+
+
+if __name__ == '__main__':
+    main()
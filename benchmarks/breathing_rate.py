@@ -0,0 +1,82 @@
+"""
+Breathing-rate check at frame rates khác camera.fps
+Tín hiệu ngực tổng hợp (sin nhịp thở đã biết + nhiễu) đưa qua BreathingMonitor với
+sample rate cấu hình = camera.fps, nhưng mẫu thực tế đến ở --actual-fps (camera drop frame,
+adaptive stride, pipeline chậm hơn camera)
+So sánh rate_bpm ước lượng với nhịp thở thật và confidence với detection.breathing.min_confidence
+Exit code 1 nếu sai số > --max-error-bpm hoặc không 'detected' ở bất kỳ tổ hợp nào
+
+Usage: python3 -m benchmarks.breathing_rate [--configured-fps 30] [--actual-fps 10 15 30] [--bpm 12 18 24]
+"""
+import sys
+import json
+import copy
+import argparse
+
+import numpy as np
+
+from core.breathing import BreathingMonitor
+from core.state_machine import FallState
+from benchmarks.synthetic import load_benchmark_config
+
+
+def run(config: dict, actual_fps: float, bpm: float, seconds: float, noise: float, seed: int) -> dict:
+    rng = np.random.default_rng(seed)
+    monitor = BreathingMonitor(config)
+
+    frequency = bpm / 60.0
+    for i in range(int(seconds * actual_fps)):
+        # Jitter nhỏ của timestamp như capture thật
+        t = i / actual_fps + rng.normal(0, 0.002)
+        chest = 0.002 * np.sin(2 * np.pi * frequency * t) + rng.normal(0, noise)
+        monitor.update(0, FallState.FALLEN, None, {'chest': chest}, None, t)
+
+    estimate = monitor.get_estimate(0) or {}
+    return {
+        'actual_fps': actual_fps,
+        'true_bpm': bpm,
+        'rate_bpm': estimate.get('rate_bpm'),
+        'error_bpm': round(abs(estimate['rate_bpm'] - bpm), 2) if estimate else None,
+        'confidence': estimate.get('confidence'),
+        'detected': estimate.get('detected', False),
+        'estimator_rate': round(monitor.estimators[0].sample_rate, 2),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Breathing-rate accuracy when samples arrive off camera.fps')
+    parser.add_argument('--configured-fps', type=float, default=30.0, help='camera.fps seen by BreathingMonitor')
+    parser.add_argument('--actual-fps', type=float, nargs='+', default=[10.0, 15.0, 30.0])
+    parser.add_argument('--bpm', type=float, nargs='+', default=[12.0, 18.0, 24.0])
+    parser.add_argument('--seconds', type=float, default=30.0, help='Signal length (>= window_seconds)')
+    parser.add_argument('--noise', type=float, default=0.0005, help='Gaussian noise std of the chest signal')
+    parser.add_argument('--max-error-bpm', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = copy.deepcopy(load_benchmark_config())
+    config['camera']['fps'] = args.configured_fps
+    config['detection'].setdefault('breathing', {})['enabled'] = True
+    config['detection']['breathing'].pop('sample_rate', None)
+
+    results = [
+        run(config, fps, bpm, args.seconds, args.noise, args.seed)
+        for fps in args.actual_fps
+        for bpm in args.bpm
+    ]
+    passed = all(
+        r['error_bpm'] is not None and r['error_bpm'] <= args.max_error_bpm and r['detected']
+        for r in results
+    )
+
+    print(json.dumps({
+        'configured_fps': args.configured_fps,
+        'seconds': args.seconds,
+        'results': results,
+        'passed': passed,
+    }, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Dynamic imgsz evaluation
+Chạy footage thật qua DynamicResolutionController (pose.dynamic_imgsz) và so với
+inference ở size lớn nhất trên cùng frame:
+- số frame + latency p50 / p95 theo từng size (log từng frame với --per-frame)
+- recall: người thấy ở size lớn nhất cũng thấy ở size đã chọn (ghép theo box IoU)
+- mean keypoint confidence của người được ghép: size đã chọn vs size lớn nhất
+Exit code 1 nếu confidence giảm quá --tolerance hoặc recall < --min-recall
+
+Usage: python3 -m benchmarks.dynamic_imgsz_eval --video ward.mp4 [--max-frames 1500]
+"""
+import sys
+import json
+import time
+import argparse
+
+import cv2
+import numpy as np
+
+from core import MultiPersonTracker
+from core.pose_detector import PoseDetector
+from core.resolution_controller import DynamicResolutionController
+from benchmarks.backend_benchmark import box_iou
+from benchmarks.synthetic import load_benchmark_config
+
+
+def match_people(reference: tuple, prediction: tuple, match_iou: float = 0.5):
+    """Ghép greedy theo IoU → [(index reference, index prediction)]"""
+    ref_boxes, boxes = reference[1], prediction[1]
+    if len(ref_boxes) == 0 or len(boxes) == 0:
+        return []
+
+    iou = box_iou(ref_boxes, boxes)
+    pairs = []
+    while True:
+        i, j = np.unravel_index(np.argmax(iou), iou.shape)
+        if iou[i, j] < match_iou:
+            break
+        iou[i, :] = -1
+        iou[:, j] = -1
+        pairs.append((i, j))
+    return pairs
+
+
+def evaluate(config: dict, video_path: str, max_frames: int, per_frame: bool) -> dict:
+    detector = PoseDetector(config)
+    tracker = MultiPersonTracker(config)
+    controller = DynamicResolutionController(config)
+    if getattr(detector.model, 'static_imgsz', None):
+        raise ValueError("Pose model has a static input size, use a dynamic export")
+    reference_size = controller.max_imgsz
+
+    reference_people = 0
+    matched_people = 0
+    ref_conf, dyn_conf = [], []
+    reference_latency = []
+
+    cap = cv2.VideoCapture(video_path)
+    if not cap.isOpened():
+        raise ValueError(f"Cannot open video: {video_path}")
+
+    frame_index = 0
+    while frame_index < max_frames:
+        ret, frame = cap.read()
+        if not ret:
+            break
+
+        imgsz = controller.select(tracker.get_all_tracks(), frame.shape)
+        start = time.perf_counter()
+        prediction = detector.predict_batch([frame], imgsz=imgsz)[0]
+        latency = time.perf_counter() - start
+        controller.record(imgsz, latency)
+
+        # Tham chiếu ở size lớn nhất (cùng frame)
+        if imgsz == reference_size:
+            reference = prediction
+        else:
+            start = time.perf_counter()
+            reference = detector.predict_batch([frame], imgsz=reference_size)[0]
+            reference_latency.append(time.perf_counter() - start)
+
+        pairs = match_people(reference, prediction)
+        reference_people += len(reference[1])
+        matched_people += len(pairs)
+        for i, j in pairs:
+            ref_conf.append(float(reference[0][i, :, 2].mean()))
+            dyn_conf.append(float(prediction[0][j, :, 2].mean()))
+
+        if per_frame:
+            print(json.dumps({
+                'frame': frame_index,
+                'imgsz': imgsz,
+                'reason': controller.reason,
+                'latency_ms': round(latency * 1000.0, 2),
+                'people': len(prediction[1]),
+                'reference_people': len(reference[1]),
+            }), file=sys.stderr)
+
+        tracker.update(detector.process_predictions(frame, *prediction, timestamp=frame_index))
+        frame_index += 1
+
+    cap.release()
+
+    stats = controller.get_stats()
+    ref_mean = float(np.mean(ref_conf)) if ref_conf else 0.0
+    dyn_mean = float(np.mean(dyn_conf)) if dyn_conf else 0.0
+    return {
+        'frames': frame_index,
+        'reference_imgsz': reference_size,
+        'frames_per_size': stats['frames_per_size'],
+        'forced': stats['forced'],
+        'latency_ms': {
+            size: {'p50': round(summary['p50_ms'], 2), 'p95': round(summary['p95_ms'], 2)}
+            for size, summary in stats['latency_ms'].items()
+        },
+        'reference_latency_ms_mean': round(float(np.mean(reference_latency)) * 1000.0, 2)
+        if reference_latency else None,
+        'reference_people': reference_people,
+        'recall': round(matched_people / max(reference_people, 1), 4),
+        'kpt_conf_reference': round(ref_mean, 4),
+        'kpt_conf_dynamic': round(dyn_mean, 4),
+        'kpt_conf_drop': round(ref_mean - dyn_mean, 4),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dynamic imgsz: latency + keypoint confidence vs max size')
+    parser.add_argument('--video', required=True, help='Footage to evaluate')
+    parser.add_argument('--max-frames', type=int, default=1500)
+    parser.add_argument('--tolerance', type=float, default=0.05,
+                        help='Max allowed drop of mean keypoint confidence')
+    parser.add_argument('--min-recall', type=float, default=0.95,
+                        help='Min fraction of reference people found at the chosen size')
+    parser.add_argument('--per-frame', action='store_true', help='Log chosen size + latency per frame (stderr)')
+    args = parser.parse_args()
+
+    config = load_benchmark_config()
+    config['pose'].setdefault('dynamic_imgsz', {})['enabled'] = True
+
+    result = evaluate(config, args.video, args.max_frames, args.per_frame)
+    result['tolerance'] = args.tolerance
+    result['min_recall'] = args.min_recall
+    result['passed'] = (
+        result['kpt_conf_drop'] <= args.tolerance and result['recall'] >= args.min_recall
+    )
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
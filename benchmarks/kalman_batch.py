@@ -0,0 +1,105 @@
+"""
+Batched Kalman benchmark
+KalmanTracker (1 object / track, np.linalg.inv mỗi update) vs KalmanBank
+(struct-of-arrays, predict / update mọi track trong 1 lần gọi) với 1-200 track:
+- µs / frame cho predict + update của mọi track
+- sai khác state / covariance giữa 2 cách (phải ≈ 0)
+Exit code 1 nếu kết quả khác nhau quá --max-error
+
+Usage: python3 -m benchmarks.kalman_batch [--tracks 1 5 20 50 100 200] [--frames 300]
+"""
+import sys
+import json
+import time
+import argparse
+
+import numpy as np
+
+from core.tracker import KalmanTracker, KalmanBank
+
+
+DEFAULT_TRACKS = [1, 5, 20, 50, 100, 200]
+
+
+def measurements(num_tracks: int, num_frames: int, seed: int) -> np.ndarray:
+    """Quỹ đạo đi bộ + nhiễu đo (num_frames, num_tracks, 2)"""
+    rng = np.random.default_rng(seed)
+    start = rng.uniform(0, 1280, size=(num_tracks, 2))
+    velocity = rng.normal(0, 3, size=(num_tracks, 2))
+    t = np.arange(num_frames)[:, None, None]
+    return start + velocity * t + rng.normal(0, 2, size=(num_frames, num_tracks, 2))
+
+
+def run_per_object(points: np.ndarray):
+    filters = []
+    for x, y in points[0]:
+        kalman = KalmanTracker()
+        kalman.state[:2] = [x, y]
+        filters.append(kalman)
+
+    start = time.perf_counter()
+    for frame in points[1:]:
+        for kalman, measurement in zip(filters, frame):
+            kalman.predict()
+            kalman.update(measurement)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, np.array([k.state for k in filters]), np.array([k.P for k in filters])
+
+
+def run_batched(points: np.ndarray):
+    bank = KalmanBank()
+    rows = np.array([bank.allocate(x, y) for x, y in points[0]])
+
+    start = time.perf_counter()
+    for frame in points[1:]:
+        bank.predict(rows)
+        bank.update(rows, frame)
+    elapsed = time.perf_counter() - start
+
+    return elapsed, bank.state[rows], bank.P[rows]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-object vs batched Kalman filter')
+    parser.add_argument('--tracks', type=int, nargs='+', default=DEFAULT_TRACKS)
+    parser.add_argument('--frames', type=int, default=300, help='Measured frames per track count')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--max-error', type=float, default=1e-6,
+                        help='Max relative state / covariance difference')
+    args = parser.parse_args()
+
+    results = []
+    max_error = 0.0
+    for num_tracks in args.tracks:
+        points = measurements(num_tracks, args.frames + 1, args.seed)
+        object_time, object_state, object_P = run_per_object(points)
+        batch_time, batch_state, batch_P = run_batched(points)
+
+        error = max(
+            np.abs(object_state - batch_state).max() / max(np.abs(object_state).max(), 1.0),
+            np.abs(object_P - batch_P).max() / max(np.abs(object_P).max(), 1.0),
+        )
+        max_error = max(max_error, float(error))
+
+        results.append({
+            'tracks': num_tracks,
+            'per_object_us_per_frame': round(object_time / args.frames * 1e6, 1),
+            'batched_us_per_frame': round(batch_time / args.frames * 1e6, 1),
+            'speedup': round(object_time / max(batch_time, 1e-9), 1),
+            'max_rel_error': float(error),
+        })
+        print(f"[BENCH] {num_tracks} tracks: {results[-1]['speedup']}x", file=sys.stderr)
+
+    passed = max_error <= args.max_error
+    print(json.dumps({
+        'frames': args.frames,
+        'results': results,
+        'max_rel_error': max_error,
+        'passed': passed,
+    }, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,107 @@
+"""
+Low-confidence association replay check
+Synthetic scene trong đó conf của người ngã tụt dưới pose.conf trong lúc ngã
+(thiếu sáng / bị che), chạy qua toàn bộ FallDetectionSystem pipeline 2 lần:
+- single: chỉ detections conf >= pose.conf (track mất sau max_disappeared frame)
+- two_stage: pose.low_conf_tracking (track còn lại ↔ detections conf thấp)
+So sánh số ca ngã phát hiện được, số track tạo ra cho mỗi người ngã (ID đổi → state
+machine bị reset) và số lần track được giữ bởi detection conf thấp
+Exit code 1 nếu two_stage bỏ sót ca ngã nào
+
+Usage: python3 -m benchmarks.low_conf_replay [--conf 0.5] [--dip-conf 0.2] [--dip-seconds 1.5]
+"""
+import sys
+import json
+import copy
+import argparse
+
+from core import TrackEvent
+from benchmarks.synthetic import SyntheticScene, load_benchmark_config
+from benchmarks.adaptive_stride_replay import replay, summarize
+
+
+class DimmedFallScene(SyntheticScene):
+    """SyntheticScene, conf người ngã = dip_conf từ fall_time trong dip_seconds"""
+
+    def __init__(self, *args, dip_conf: float = 0.15, dip_seconds: float = 1.5, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.dip_conf = dip_conf
+        self.dip_seconds = dip_seconds
+
+    def predict(self, t: float):
+        kpts, boxes, confs = super().predict(t)
+        for i, person in enumerate(self.people):
+            if person.fall_time is not None and 0 <= t - person.fall_time < self.dip_seconds:
+                confs[i] = self.dip_conf * self.rng.uniform(0.8, 1.0)
+        return kpts, boxes, confs
+
+
+def tracks_per_faller(created: list, scene: SyntheticScene) -> list:
+    """Số track được tạo cho mỗi người ngã (track → người gần nhất lúc tạo; 1 = không đổi ID)"""
+    centers = [(person.foot_x, person.foot_y - 0.5 * person.height) for person in scene.people]
+    owners = [
+        min(range(len(centers)), key=lambda i: (x - centers[i][0]) ** 2 + (y - centers[i][1]) ** 2)
+        for x, y in created
+    ]
+    return [owners.count(scene.people.index(person)) for person in scene.falling_people]
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Two-stage low-confidence association replay check')
+    parser.add_argument('--conf', type=float, default=0.5, help='pose.conf of both runs')
+    parser.add_argument('--low-conf', type=float, default=0.1)
+    parser.add_argument('--dip-conf', type=float, default=0.2, help='Person conf of a faller while falling')
+    parser.add_argument('--dip-seconds', type=float, default=1.5, help='How long the conf stays low')
+    parser.add_argument('--seconds', type=float, default=60.0, help='Replay length')
+    parser.add_argument('--fps', type=float, default=30.0, help='Replay frame rate')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    base_config = load_benchmark_config()
+    motions = ['walking', 'sitting', 'falling', 'standing', 'falling']
+    fall_times = [12.0, 35.0]
+
+    results = {}
+    for name, enabled in (('single', False), ('two_stage', True)):
+        config = copy.deepcopy(base_config)
+        config['pose']['max_people'] = len(motions)
+        config['pose']['conf'] = args.conf
+        config['pose']['low_conf_tracking'] = {'enabled': enabled, 'low_conf': args.low_conf}
+
+        scene = DimmedFallScene(
+            len(motions), motions, fall_times=fall_times, lie_duration=10.0, seed=args.seed,
+            dip_conf=args.dip_conf, dip_seconds=args.dip_seconds
+        )
+
+        # Centroid lúc tạo của mọi track (đếm track mới của người ngã)
+        created = []
+        trackers = []
+
+        def listen(system):
+            trackers.append(system.tracker)
+            system.tracker.add_lifecycle_listener(
+                lambda event, track: created.append(tuple(track.history.centroids[0].tolist()))
+                if event == TrackEvent.CREATED else None
+            )
+
+        result = summarize(replay(config, scene, args.seconds, args.fps, on_start=listen), scene)
+        result['tracks_per_faller'] = tracks_per_faller(created, scene)
+        result['low_conf_matches'] = trackers[0].low_conf_matches
+        results[name] = result
+        print(f"[BENCH] {name}: {result['falls_detected']}/{result['falls_expected']} falls, "
+              f"tracks per faller {result['tracks_per_faller']}", file=sys.stderr)
+
+    missed = [
+        i for i, fall in enumerate(results['two_stage']['falls']) if fall['expected'] and not fall['fallen']
+    ]
+    results['conf'] = args.conf
+    results['dip_conf'] = args.dip_conf
+    results['dip_seconds'] = args.dip_seconds
+    results['no_missed_falls'] = results['two_stage']['falls_expected'] > 0 and not missed
+
+    print(json.dumps(results, indent=2, default=float))
+    sys.exit(0 if results['no_missed_falls'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,242 @@
+"""
+Synthetic pipeline benchmark
+Đo throughput của mọi thứ sau pose model (không cần ultralytics / weights):
+synthetic keypoints → PoseDetector.process_predictions (format của detect_persons)
+→ MultiPersonTracker → ImmobilityDetector → FeatureExtractor → FallClassifier
+→ StateMachineManager → RiskScorer
+
+Output JSON: FPS + per-stage cost cho 1 / 5 / 20 / 50 người (walking, sitting, falling)
+--baseline: so với kết quả cũ, exit 1 nếu FPS giảm quá --max-regression
+
+Usage: python3 -m benchmarks.pipeline_benchmark [--people 1 5 20 50] [--frames 300]
+"""
+import sys
+import json
+import copy
+import time
+import argparse
+
+import numpy as np
+
+from core import MultiPersonTracker, StateMachineManager, ImmobilityDetector, ManualClock
+from core.pose_detector import PoseDetector
+from ai import FeatureExtractor, FallClassifier
+from utils import RiskScorer, StageProfiler
+from benchmarks.synthetic import SyntheticScene, load_benchmark_config
+
+
+DEFAULT_PEOPLE = [1, 5, 20, 50]
+DEFAULT_MOTIONS = ['walking', 'sitting', 'falling']
+
+
+def fit_benchmark_classifier(
+    classifier: FallClassifier,
+    num_features: int,
+    n_estimators: int = 100,
+    seed: int = 0
+):
+    """
+    Repo không ship model đã train → fit RandomForest (cùng cấu hình data/train.py)
+    trên dữ liệu ngẫu nhiên để stage classifier có chi phí predict thật
+    """
+    from sklearn.ensemble import RandomForestClassifier
+
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(400, num_features))
+    y = (X[:, 0] > 0).astype(int)
+
+    model = RandomForestClassifier(
+        n_estimators=n_estimators, max_depth=10, random_state=seed
+    )
+    model.fit(X, y)
+
+    classifier.model = model
+    classifier.enabled = True
+
+
+def run_scenario(
+    config: dict,
+    num_people: int,
+    motions: list,
+    frames: int,
+    warmup: int,
+    fps: float,
+    classifier_trees: int,
+    seed: int
+) -> dict:
+    """Chạy 1 scenario, trả về FPS + per-stage stats"""
+    config = copy.deepcopy(config)
+    config['pose']['max_people'] = num_people
+
+    duration = (frames + warmup) / fps
+    num_fallers = sum(1 for i in range(num_people) if motions[i % len(motions)] == 'falling')
+    # Ngã rải đều trong khoảng thời gian chạy, nằm 5s rồi đứng dậy
+    fall_times = list(np.linspace(0.2 * duration, 0.7 * duration, max(num_fallers, 1)))
+
+    scene = SyntheticScene(
+        num_people, motions, fall_times=fall_times, lie_duration=5.0, seed=seed
+    )
+
+    clock = ManualClock(start_time=0.0)
+    detector = PoseDetector(config, model=scene)
+    tracker = MultiPersonTracker(config)
+    immobility_detector = ImmobilityDetector(config)
+    feature_extractor = FeatureExtractor(config)
+    classifier = FallClassifier(config)
+    state_manager = StateMachineManager(config, clock=clock)
+    risk_scorer = RiskScorer(config)
+
+    if classifier_trees > 0:
+        fit_benchmark_classifier(
+            classifier, len(feature_extractor.get_feature_names()), classifier_trees, seed
+        )
+
+    # Frame nhiễu cố định: motion energy có chi phí thật nhưng không sinh lại mỗi frame
+    rng = np.random.default_rng(seed)
+    prev_frame = rng.integers(0, 255, size=(scene.height, scene.width, 3), dtype=np.uint8)
+    curr_frame = prev_frame.copy()
+    curr_frame[::7, ::5] = 255 - curr_frame[::7, ::5]
+
+    profiler = StageProfiler(enabled=False)
+    pipeline_time = 0.0
+    track_counts = []
+
+    for frame_index in range(warmup + frames):
+        if frame_index == warmup:
+            # Bỏ số liệu warm-up (track chưa đủ min_hits, buffer chưa đầy)
+            profiler = StageProfiler()
+            pipeline_time = 0.0
+            track_counts = []
+
+        stage = profiler.stage
+
+        t = frame_index / fps
+        clock.set(t)
+        kpts, boxes, confs = scene.predict(t)
+
+        frame_start = time.perf_counter()
+
+        with stage('pose_postprocess'):
+            detections = detector.process_predictions(
+                curr_frame, kpts, boxes, confs, timestamp=t
+            )
+
+        with stage('tracker'):
+            tracks = tracker.update(detections)
+
+        for track_id, track in tracks.items():
+            with stage('immobility'):
+                motion_energy = immobility_detector.calculate_motion_energy(
+                    prev_frame, curr_frame, track.last_bbox
+                )
+                immobility_detector.update_history(track_id, motion_energy)
+                immobility_score = immobility_detector.get_immobility_score(track_id)
+
+            with stage('feature_extractor'):
+                feature_vector = feature_extractor.get_feature_vector(track_id, track)
+
+            ml_prediction = None
+            if feature_vector is not None:
+                with stage('classifier'):
+                    ml_prediction = classifier.predict(feature_vector)
+
+            with stage('state_machine'):
+                state_manager.update(track_id, track, motion_energy, ml_prediction)
+
+            sm = state_manager.get_state_machine(track_id)
+            if sm is None:
+                continue
+
+            with stage('risk_scorer'):
+                risk_scorer.calculate_risk_score(track, sm, immobility_score, ml_prediction)
+
+        pipeline_time += time.perf_counter() - frame_start
+        track_counts.append(len(tracks))
+
+    stages = profiler.snapshot()
+    for stats in stages.values():
+        # Chi phí của stage quy về mỗi frame (stage per-person được gọi N lần / frame)
+        stats['ms_per_frame'] = stats['mean_ms'] * stats['count'] / frames
+
+    return {
+        'people': num_people,
+        'motions': [motions[i % len(motions)] for i in range(num_people)],
+        'frames': frames,
+        'mean_tracks': float(np.mean(track_counts)) if track_counts else 0.0,
+        'fps': frames / max(pipeline_time, 1e-9),
+        'ms_per_frame': pipeline_time / frames * 1000.0,
+        'classifier': classifier.enabled,
+        'alarms': len(state_manager.get_alarms()),
+        'stages': stages,
+    }
+
+
+def compare_to_baseline(results: dict, baseline: dict, max_regression: float) -> list:
+    """Scenario nào FPS giảm hơn max_regression (tỉ lệ) so với baseline"""
+    regressions = []
+    for name, result in results.items():
+        old = baseline.get('scenarios', {}).get(name)
+        if old is None:
+            continue
+        if result['fps'] < old['fps'] * (1.0 - max_regression):
+            regressions.append({
+                'scenario': name,
+                'baseline_fps': round(old['fps'], 1),
+                'fps': round(result['fps'], 1),
+            })
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Synthetic post-detector pipeline benchmark')
+    parser.add_argument('--people', type=int, nargs='+', default=DEFAULT_PEOPLE,
+                        help='People counts to benchmark')
+    parser.add_argument('--motions', nargs='+', default=DEFAULT_MOTIONS,
+                        help='Motion mix (assigned round-robin)')
+    parser.add_argument('--frames', type=int, default=300, help='Measured frames per scenario')
+    parser.add_argument('--warmup', type=int, default=60, help='Warm-up frames (not measured)')
+    parser.add_argument('--fps', type=float, default=30.0, help='Synthetic video frame rate')
+    parser.add_argument('--classifier-trees', type=int, default=100,
+                        help='RandomForest size for the classifier stage (0 = disabled)')
+    parser.add_argument('--seed', type=int, default=0)
+    parser.add_argument('--output', type=str, default=None, help='Write JSON to file')
+    parser.add_argument('--baseline', type=str, default=None,
+                        help='Previous JSON output to compare against')
+    parser.add_argument('--max-regression', type=float, default=0.2,
+                        help='Allowed FPS drop vs baseline (fraction)')
+    args = parser.parse_args()
+
+    config = load_benchmark_config()
+
+    scenarios = {}
+    for num_people in args.people:
+        name = f"{num_people}_people"
+        print(f"[BENCH] {name}...", file=sys.stderr)
+        scenarios[name] = run_scenario(
+            config, num_people, args.motions, args.frames, args.warmup,
+            args.fps, args.classifier_trees, args.seed
+        )
+
+    report = {
+        'benchmark': 'pipeline',
+        'frames': args.frames,
+        'scenarios': scenarios,
+    }
+
+    exit_code = 0
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+        report['regressions'] = compare_to_baseline(scenarios, baseline, args.max_regression)
+        exit_code = 1 if report['regressions'] else 0
+
+    output = json.dumps(report, indent=2)
+    if args.output:
+        with open(args.output, 'w') as f:
+            f.write(output)
+    print(output)
+    sys.exit(exit_code)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,142 @@
+"""
+Pre-processing allocation benchmark
+tracemalloc đo bộ nhớ cấp phát mỗi frame của bước trước pose model:
+- legacy: frame.copy() + letterbox / normalize cấp phát mới (như ultralytics)
+- buffered: LetterboxBuffers.prepare + PoseDetector.advance_frame (đổi reference)
+Steady state (sau warmup): peak bytes / frame và bytes còn giữ lại sau N frame
+Layout switch: xen kẽ full frame (batch 1) và 2 crop (batch 2, imgsz nhỏ) như crop inference,
+blob phải giống hệt blob của LetterboxBuffers mới (padding = 114/255)
+Exit code 1 nếu peak / frame của buffered vượt --max-bytes hoặc blob sai sau khi đổi layout
+
+Usage: python3 -m benchmarks.preprocess_alloc [--width 1280 --height 720] [--imgsz 640]
+"""
+import sys
+import json
+import time
+import argparse
+import tracemalloc
+
+import cv2
+import numpy as np
+
+from core.pose_backends import LetterboxBuffers
+from core.pose_detector import PoseDetector
+from benchmarks.synthetic import load_benchmark_config
+
+
+def legacy_preprocess(frame: np.ndarray, imgsz: int, state: dict) -> np.ndarray:
+    """Đường cũ: copy frame giữ làm current_frame, letterbox + blob cấp phát mỗi lần"""
+    state['prev'], state['current'] = state.get('current'), frame.copy()
+
+    h, w = frame.shape[:2]
+    scale = min(imgsz / h, imgsz / w)
+    new_w, new_h = int(round(w * scale)), int(round(h * scale))
+    top, left = (imgsz - new_h) // 2, (imgsz - new_w) // 2
+
+    padded = np.full((imgsz, imgsz, 3), 114, dtype=np.uint8)
+    padded[top:top + new_h, left:left + new_w] = cv2.resize(frame, (new_w, new_h))
+    blob = padded[:, :, ::-1].transpose(2, 0, 1)[None].astype(np.float32) / 255.0
+    return blob
+
+
+def measure(step, frames: list, warmup: int, iterations: int) -> dict:
+    """Peak bytes / frame, retained bytes, ms / frame của step(frame)"""
+    for i in range(warmup):
+        step(frames[i % len(frames)])
+
+    tracemalloc.start()
+    start_snapshot = tracemalloc.take_snapshot()
+    peaks = []
+    for i in range(iterations):
+        tracemalloc.reset_peak()
+        before, _ = tracemalloc.get_traced_memory()
+        step(frames[i % len(frames)])
+        _, peak = tracemalloc.get_traced_memory()
+        peaks.append(peak - before)
+    end_snapshot = tracemalloc.take_snapshot()
+    tracemalloc.stop()
+
+    retained = sum(stat.size_diff for stat in end_snapshot.compare_to(start_snapshot, 'lineno'))
+
+    # Thời gian đo riêng (tracemalloc làm chậm cấp phát)
+    start = time.perf_counter()
+    for i in range(iterations):
+        step(frames[i % len(frames)])
+    elapsed = time.perf_counter() - start
+
+    return {
+        'peak_bytes_per_frame_max': int(max(peaks)),
+        'peak_bytes_per_frame_median': int(np.median(peaks)),
+        'retained_bytes': int(retained),
+        'ms_per_frame': round(elapsed / iterations * 1000.0, 3),
+    }
+
+
+def layout_switch_check(frames: list, imgsz: int, crop_imgsz: int = 320, rounds: int = 4) -> int:
+    """Số lần prepare (buffer tái sử dụng) cho blob khác blob tính trên buffer mới"""
+    full = frames[0]
+    h, w = full.shape[:2]
+    crops = [full[:h // 2, :w // 3], full[h // 4:, w // 2:]]
+    # Batch crop nhỏ hơn batch full frame → buffer không grow, slot 1 của crop nằm
+    # giữa vùng ảnh của full frame
+    layouts = [([full], imgsz), (crops, crop_imgsz)]
+
+    buffers = LetterboxBuffers()
+    mismatches = 0
+    for _ in range(rounds):
+        for batch, size in layouts:
+            blob, _ = buffers.prepare(batch, size)
+            expected, _ = LetterboxBuffers().prepare(batch, size)
+            mismatches += not np.array_equal(blob, expected)
+    return mismatches
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Per-frame allocations of pose pre-processing')
+    parser.add_argument('--width', type=int, default=1280)
+    parser.add_argument('--height', type=int, default=720)
+    parser.add_argument('--imgsz', type=int, default=640)
+    parser.add_argument('--frames', type=int, default=200, help='Measured frames')
+    parser.add_argument('--warmup', type=int, default=20)
+    parser.add_argument('--max-bytes', type=int, default=65536,
+                        help='Allowed steady-state peak bytes per frame (buffered path)')
+    args = parser.parse_args()
+
+    # Vài frame khác nhau (như camera: mỗi lần đọc là array mới)
+    rng = np.random.default_rng(0)
+    frames = [
+        rng.integers(0, 255, size=(args.height, args.width, 3), dtype=np.uint8)
+        for _ in range(4)
+    ]
+
+    state = {}
+    legacy = measure(
+        lambda frame: legacy_preprocess(frame, args.imgsz, state),
+        frames, args.warmup, args.frames
+    )
+
+    detector = PoseDetector(load_benchmark_config(), model=object())
+    buffers = LetterboxBuffers()
+
+    def buffered_step(frame):
+        detector.advance_frame(frame)
+        buffers.prepare([frame], args.imgsz, auto=True)
+
+    buffered = measure(buffered_step, frames, args.warmup, args.frames)
+    layout_mismatches = layout_switch_check(frames, args.imgsz)
+
+    result = {
+        'frame_shape': [args.height, args.width, 3],
+        'imgsz': args.imgsz,
+        'frames': args.frames,
+        'legacy': legacy,
+        'buffered': buffered,
+        'layout_switch_mismatches': layout_mismatches,
+        'passed': buffered['peak_bytes_per_frame_max'] <= args.max_bytes and layout_mismatches == 0,
+    }
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['passed'] else 1)
+
+
+if __name__ == '__main__':
+    main()
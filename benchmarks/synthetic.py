@@ -0,0 +1,369 @@
+"""
+Synthetic pose scenes
+Sinh keypoints COCO-17 theo format output của YOLOv8-Pose (kpts, boxes, confs)
+cho walking / sitting / falling - không cần model hay camera
+"""
+import os
+import numpy as np
+from typing import List, Tuple
+
+from utils.config import ConfigManager
+
+
+REPO_ROOT = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+# Standing skeleton: (x offset, y from top) theo đơn vị chiều cao người
+STANDING_TEMPLATE = np.array([
+    [0.00, 0.06],   # 0 nose
+    [-0.02, 0.04],  # 1 left eye
+    [0.02, 0.04],   # 2 right eye
+    [-0.04, 0.05],  # 3 left ear
+    [0.04, 0.05],   # 4 right ear
+    [-0.11, 0.18],  # 5 left shoulder
+    [0.11, 0.18],   # 6 right shoulder
+    [-0.14, 0.33],  # 7 left elbow
+    [0.14, 0.33],   # 8 right elbow
+    [-0.15, 0.46],  # 9 left wrist
+    [0.15, 0.46],   # 10 right wrist
+    [-0.07, 0.52],  # 11 left hip
+    [0.07, 0.52],   # 12 right hip
+    [-0.07, 0.74],  # 13 left knee
+    [0.07, 0.74],   # 14 right knee
+    [-0.07, 0.97],  # 15 left ankle
+    [0.07, 0.97],   # 16 right ankle
+], dtype=np.float32)
+
+# Ngồi ghế: hông thấp xuống, đùi nằm ngang, thân vẫn thẳng
+SITTING_TEMPLATE = STANDING_TEMPLATE.copy()
+SITTING_TEMPLATE[:11, 1] += 0.25
+SITTING_TEMPLATE[11:13, 1] = 0.77
+SITTING_TEMPLATE[13:15] = [[-0.07 + 0.22, 0.77], [0.07 + 0.22, 0.77]]
+
+MOTIONS = ('standing', 'walking', 'sitting', 'falling')
+
+
+def load_benchmark_config() -> dict:
+    """Repo config.yaml, chỉnh cho benchmark headless (không ghi file, không API)"""
+    config = ConfigManager(os.path.join(REPO_ROOT, 'config.yaml')).config
+    config['debug']['show_video'] = False
+    config['recording']['enabled'] = False
+    config['ios_api']['enabled'] = False
+    config['monitoring']['enabled'] = False
+    config['ml_classifier']['enabled'] = False
+    config['pose'].setdefault('floor_map', {})['persist'] = False
+    return config
+
+
+class SyntheticPerson:
+    """1 người với motion cố định, keypoints là hàm của thời gian"""
+
+    def __init__(
+        self,
+        motion: str,
+        foot_x: float,
+        foot_y: float,
+        height: float,
+        frame_width: int,
+        fall_time: float = None,
+        fall_duration: float = 0.5,
+        lie_duration: float = None,
+        rng: np.random.Generator = None
+    ):
+        assert motion in MOTIONS, f"unknown motion {motion}"
+        self.motion = motion
+        self.foot_x = foot_x
+        self.foot_y = foot_y
+        self.height = height
+        self.frame_width = frame_width
+        self.fall_time = fall_time
+        self.fall_duration = fall_duration
+        self.lie_duration = lie_duration   # None = nằm luôn, không đứng dậy
+        self.rng = rng if rng is not None else np.random.default_rng(0)
+
+        self.walk_speed = 0.35 * height              # px/s
+        self.walk_range = max(height, 0.15 * frame_width)
+        self.phase = self.rng.uniform(0, 2 * np.pi)
+        self.fall_side = 1.0 if self.rng.random() < 0.5 else -1.0
+
+    def keypoints(self, t: float) -> np.ndarray:
+        """(17, 3) keypoints (x, y, conf) tại thời điểm t"""
+        template = STANDING_TEMPLATE
+        x = self.foot_x
+        angle = 0.0
+
+        if self.motion == 'walking':
+            # Đi qua lại, chân đung đưa
+            x += self.walk_range * np.sin(self.walk_speed * t / self.walk_range + self.phase)
+            template = STANDING_TEMPLATE.copy()
+            swing = 0.05 * np.sin(2 * np.pi * 1.8 * t + self.phase)
+            template[[13, 15], 0] += swing
+            template[[14, 16], 0] -= swing
+
+        elif self.motion == 'sitting':
+            # Chu kỳ 12s: đứng 4s → ngồi xuống chậm 2s → ngồi 4s → đứng dậy 2s
+            cycle = (t + self.phase) % 12.0
+            if cycle < 4.0:
+                blend = 0.0
+            elif cycle < 6.0:
+                blend = (cycle - 4.0) / 2.0
+            elif cycle < 10.0:
+                blend = 1.0
+            else:
+                blend = 1.0 - (cycle - 10.0) / 2.0
+            template = (1 - blend) * STANDING_TEMPLATE + blend * SITTING_TEMPLATE
+
+        elif self.motion == 'falling' and self.fall_time is not None and t >= self.fall_time:
+            # Xoay quanh cổ chân từ 0° → 90° (ease-in, giống trọng lực)
+            progress = min((t - self.fall_time) / self.fall_duration, 1.0)
+
+            # Đứng dậy chậm (2s) sau lie_duration
+            if self.lie_duration is not None:
+                get_up_start = self.fall_time + self.fall_duration + self.lie_duration
+                if t >= get_up_start:
+                    progress = max(0.0, 1.0 - (t - get_up_start) / 2.0)
+
+            angle = self.fall_side * (np.pi / 2) * progress ** 2
+
+        kp = np.empty((17, 3), dtype=np.float32)
+        dx = template[:, 0] * self.height
+        dy = (template[:, 1] - 0.97) * self.height   # relative to ankle pivot (âm = lên trên)
+
+        cos_a, sin_a = np.cos(angle), np.sin(angle)
+        kp[:, 0] = x + dx * cos_a - dy * sin_a
+        kp[:, 1] = self.foot_y + dx * sin_a + dy * cos_a
+
+        # Jitter nhỏ giống detector thật
+        kp[:, :2] += self.rng.normal(0, 0.6, size=(17, 2))
+        kp[:, 2] = self.rng.uniform(0.75, 0.98, size=17)
+        return kp
+
+
+class SyntheticScene:
+    """
+    Nhiều người trong 1 khung hình (grid layout)
+    predict(t) trả về đúng tuple mà PoseDetector.predict_batch trả cho 1 frame
+    """
+
+    def __init__(
+        self,
+        num_people: int,
+        motions: List[str] = None,
+        width: int = 1280,
+        height: int = 720,
+        fall_times: List[float] = None,
+        lie_duration: float = None,
+        seed: int = 0
+    ):
+        self.width = width
+        self.height = height
+        self.rng = np.random.default_rng(seed)
+
+        if motions is None:
+            motions = ['walking'] * num_people
+
+        cols = int(np.ceil(np.sqrt(num_people * width / height)))
+        rows = int(np.ceil(num_people / cols))
+        person_h = min(0.7 * height / rows, 0.45 * height)
+
+        # Vị trí grid, hàng dưới cùng trước
+        # Chân hàng dưới ở 75% chiều cao: đứng → hip_y_ratio < 0.6, nằm → > 0.6
+        # (giống camera gắn cao nhìn xuống mà state machine được tune theo)
+        slots = []
+        for row in range(rows):
+            foot_y = height * 0.75 - row * (height * 0.7 / rows)
+            for col in range(cols):
+                slots.append(((col + 0.5) * width / cols, foot_y))
+
+        person_motions = [motions[i % len(motions)] for i in range(num_people)]
+
+        # Người ngã được xếp ở hàng dưới: nằm trên sàn thấp trong khung hình
+        # (state machine dùng centroid_y_ratio / floor distance để nhận "nằm")
+        order = sorted(range(num_people), key=lambda i: person_motions[i] != 'falling')
+        positions = {}
+        for slot, i in zip(slots, order):
+            positions[i] = slot
+
+        self.people: List[SyntheticPerson] = []
+        fall_index = 0
+        for i, motion in enumerate(person_motions):
+            foot_x, foot_y = positions[i]
+            fall_time = None
+            if motion == 'falling':
+                fall_time = fall_times[fall_index % len(fall_times)] if fall_times else 3.0
+                fall_index += 1
+            self.people.append(SyntheticPerson(
+                motion, foot_x, foot_y, person_h, width,
+                fall_time=fall_time, lie_duration=lie_duration,
+                rng=np.random.default_rng(seed + i + 1)
+            ))
+
+    @property
+    def falling_people(self) -> List[SyntheticPerson]:
+        return [p for p in self.people if p.motion == 'falling']
+
+    def predict(self, t: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(kpts (N,17,3), boxes (N,4) xyxy, confs (N,)) tại thời điểm t"""
+        n = len(self.people)
+        kpts = np.empty((n, 17, 3), dtype=np.float32)
+        for i, person in enumerate(self.people):
+            kpts[i] = person.keypoints(t)
+
+        kpts[:, :, 0] = np.clip(kpts[:, :, 0], 0, self.width - 1)
+        kpts[:, :, 1] = np.clip(kpts[:, :, 1], 0, self.height - 1)
+
+        boxes = np.concatenate([kpts[:, :, :2].min(axis=1), kpts[:, :, :2].max(axis=1)], axis=1)
+        confs = self.rng.uniform(0.6, 0.95, size=n).astype(np.float32)
+        return kpts, boxes, confs
+
+    def blank_frame(self) -> np.ndarray:
+        """Frame tĩnh (motion energy = 0 → immobility sau khi ngã)"""
+        return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+
+class CorridorScene:
+    """
+    Hành lang đông người: người đi vào từ 1 cạnh, đi ngang qua khung hình rồi ra
+    Mỗi người chỉ xuất hiện 1 lần → track ID liên tục tăng (soak test)
+    """
+
+    def __init__(
+        self,
+        arrival_interval: float = 4.0,
+        crossing_time: float = 8.0,
+        width: int = 1280,
+        height: int = 720,
+        seed: int = 0
+    ):
+        self.width = width
+        self.height = height
+        self.arrival_interval = arrival_interval
+        self.crossing_time = crossing_time
+        self.person_h = 0.45 * height
+        self.rng = np.random.default_rng(seed)
+
+        # Người đang trong khung hình: [enter_time, direction, foot_y, phase]
+        self.walkers = []
+        self.next_arrival = 0.0
+        self.total_arrivals = 0
+
+    def _advance(self, t: float):
+        """Spawn người mới (Poisson) và bỏ người đã đi hết hành lang"""
+        while self.next_arrival <= t:
+            direction = 1.0 if self.rng.random() < 0.5 else -1.0
+            foot_y = self.height * self.rng.uniform(0.6, 0.75)
+            phase = self.rng.uniform(0, 2 * np.pi)
+            self.walkers.append([self.next_arrival, direction, foot_y, phase])
+            self.total_arrivals += 1
+            self.next_arrival += self.rng.exponential(self.arrival_interval)
+
+        self.walkers = [w for w in self.walkers if t - w[0] < self.crossing_time]
+
+    def predict(self, t: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(kpts (N,17,3), boxes (N,4) xyxy, confs (N,)) tại thời điểm t"""
+        self._advance(t)
+
+        n = len(self.walkers)
+        kpts = np.empty((n, 17, 3), dtype=np.float32)
+        for i, (enter_time, direction, foot_y, phase) in enumerate(self.walkers):
+            progress = (t - enter_time) / self.crossing_time
+            if direction < 0:
+                progress = 1.0 - progress
+            foot_x = 0.05 * self.width + progress * 0.9 * self.width
+
+            template = STANDING_TEMPLATE.copy()
+            swing = 0.05 * np.sin(2 * np.pi * 1.8 * t + phase)
+            template[[13, 15], 0] += swing
+            template[[14, 16], 0] -= swing
+
+            kpts[i, :, 0] = foot_x + template[:, 0] * self.person_h
+            kpts[i, :, 1] = foot_y + (template[:, 1] - 0.97) * self.person_h
+            kpts[i, :, :2] += self.rng.normal(0, 0.6, size=(17, 2))
+            kpts[i, :, 2] = self.rng.uniform(0.75, 0.98, size=17)
+
+        boxes = np.concatenate([kpts[:, :, :2].min(axis=1), kpts[:, :, :2].max(axis=1)], axis=1)
+        confs = self.rng.uniform(0.6, 0.95, size=n).astype(np.float32)
+        return kpts, boxes, confs
+
+    def blank_frame(self) -> np.ndarray:
+        return np.zeros((self.height, self.width, 3), dtype=np.uint8)
+
+
+class CrowdScene:
+    """
+    Phòng đông người: N người đi thẳng theo hướng ngẫu nhiên, dội lại ở mép khung,
+    sitting_ratio người ngồi yên (ghế / giường)
+    Chiều cao người theo phối cảnh (xa camera = cao trong ảnh → nhỏ) nên người cắt
+    ngang nhau có thể chồng centroid nhưng khác kích thước / dáng
+    miss_rate: tỉ lệ detection bị mất (che khuất); last_ids = người thật của từng detection
+    """
+
+    def __init__(
+        self,
+        num_people: int,
+        width: int = 1920,
+        height: int = 1080,
+        speed: float = 120.0,
+        sitting_ratio: float = 0.3,
+        miss_rate: float = 0.05,
+        seed: int = 0
+    ):
+        self.width = width
+        self.height = height
+        self.miss_rate = miss_rate
+        self.rng = np.random.default_rng(seed)
+
+        self.foot = np.stack([
+            self.rng.uniform(0.05, 0.95, num_people) * width,
+            self.rng.uniform(0.35, 0.95, num_people) * height,
+        ], axis=1)
+        angle = self.rng.uniform(0, 2 * np.pi, num_people)
+        self.velocity = np.stack([np.cos(angle), np.sin(angle)], axis=1) * (
+            speed * self.rng.uniform(0.5, 1.5, num_people)[:, None]
+        )
+        self.phase = self.rng.uniform(0, 2 * np.pi, num_people)
+        self.sitting = self.rng.random(num_people) < sitting_ratio
+        self.velocity[self.sitting] = 0.0
+        self.last_t = 0.0
+        self.last_ids = np.arange(num_people)
+
+    def _advance(self, t: float):
+        dt = t - self.last_t
+        self.last_t = t
+        self.foot += self.velocity * dt
+
+        # Dội lại ở mép (chân trong [5%, 95%] x [35%, 95%])
+        low = np.array([0.05 * self.width, 0.35 * self.height])
+        high = np.array([0.95 * self.width, 0.95 * self.height])
+        out = (self.foot < low) | (self.foot > high)
+        self.velocity[out] *= -1
+        self.foot = np.clip(self.foot, low, high)
+
+    def predict(self, t: float) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """(kpts (N,17,3), boxes (N,4) xyxy, confs (N,)) tại thời điểm t, đã bỏ detection bị mất"""
+        self._advance(t)
+
+        n = len(self.foot)
+        person_h = self.height * (0.15 + 0.35 * self.foot[:, 1] / self.height)
+
+        template = np.repeat(STANDING_TEMPLATE[None], n, axis=0)
+        swing = 0.05 * np.sin(2 * np.pi * 1.8 * t + self.phase) * ~self.sitting
+        template[:, [13, 15], 0] += swing[:, None]
+        template[:, [14, 16], 0] -= swing[:, None]
+        template[self.sitting] = SITTING_TEMPLATE
+
+        kpts = np.empty((n, 17, 3), dtype=np.float32)
+        kpts[:, :, 0] = self.foot[:, 0, None] + template[:, :, 0] * person_h[:, None]
+        kpts[:, :, 1] = self.foot[:, 1, None] + (template[:, :, 1] - 0.97) * person_h[:, None]
+        kpts[:, :, :2] += self.rng.normal(0, 0.6, size=(n, 17, 2))
+        kpts[:, :, 2] = self.rng.uniform(0.75, 0.98, size=(n, 17))
+
+        keep = self.rng.random(n) >= self.miss_rate
+        self.last_ids = np.flatnonzero(keep)
+        kpts = kpts[keep]
+
+        boxes = np.concatenate([kpts[:, :, :2].min(axis=1), kpts[:, :, :2].max(axis=1)], axis=1)
+        confs = self.rng.uniform(0.6, 0.95, size=len(kpts)).astype(np.float32)
+        return kpts, boxes, confs
+
+    def blank_frame(self) -> np.ndarray:
+        return np.zeros((self.height, self.width, 3), dtype=np.uint8)
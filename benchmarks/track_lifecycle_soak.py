@@ -0,0 +1,131 @@
+"""
+Track lifecycle soak test
+Chạy 24h (thời gian video, ManualClock) hành lang đông người qua toàn bộ
+FallDetectionSystem pipeline, mỗi giờ (soak < 3h: mỗi 1/6 thời gian) ghi lại:
+- RSS của process
+- số entry trong từng store per-track (state machines, motion history,
+  feature buffers, alert cooldowns, alert history)
+Exit code 1 nếu memory / store size tăng theo thời gian (leak)
+
+--no-eviction: bỏ lifecycle listeners để so sánh (store tăng tuyến tính)
+
+Usage: python3 -m benchmarks.track_lifecycle_soak [--hours 24] [--fps 2]
+"""
+import sys
+import json
+import argparse
+
+import psutil
+
+from core import ManualClock
+from main import FallDetectionSystem
+from benchmarks.synthetic import CorridorScene, load_benchmark_config
+
+
+def store_sizes(system: FallDetectionSystem) -> dict:
+    """Số entry per-track đang được giữ trong từng component"""
+    sizes = {
+        'tracks': len(system.tracker.tracks),
+        'kalman_rows': system.tracker.kalman_bank.active,
+        'state_machines': len(system.state_manager.state_machines),
+        'motion_history': len(system.immobility_detector.motion_history),
+        'feature_buffers': len(system.feature_extractor.feature_buffers),
+        'alert_cooldowns': len(system.websocket_server.last_alert_time),
+        'alert_history': len(system.alert_handler.alert_history),
+    }
+    keypoint_flow = getattr(system.immobility_detector, 'keypoint_flow', None)
+    if keypoint_flow is not None:
+        sizes['chest_history'] = len(keypoint_flow.chest_history)
+    return sizes
+
+
+def sample_interval(hours: float) -> float:
+    """Giây giữa 2 sample: mỗi giờ, soak ngắn (< 3h) thì 6 sample để vẫn có warm vs last"""
+    return 3600.0 if hours >= 3 else hours * 3600.0 / 6
+
+
+def soak(config: dict, hours: float, fps: float, eviction: bool, seed: int) -> dict:
+    clock = ManualClock(start_time=0.0)
+    scene = CorridorScene(seed=seed)
+
+    system = FallDetectionSystem(config=config, pose_model=scene, clock=clock)
+    if not eviction:
+        system.tracker.lifecycle_listeners.clear()
+
+    process = psutil.Process()
+    frame = scene.blank_frame()
+    interval = sample_interval(hours)
+    frames_per_sample = max(1, int(interval * fps))
+    samples = []
+
+    for index in range(int(hours * 3600.0 / interval + 1e-9)):
+        max_sizes = {}
+        for i in range(frames_per_sample):
+            t = (index * frames_per_sample + i) / fps
+            clock.set(t)
+
+            kpts, boxes, confs = scene.predict(t)
+            detections = system.detector.process_predictions(
+                frame, kpts, boxes, confs, timestamp=t
+            )
+            system._process_frame(frame, t, detections=detections)
+            system.frame_count += 1
+
+            if i % int(fps * 10) == 0:
+                for key, size in store_sizes(system).items():
+                    max_sizes[key] = max(max_sizes.get(key, 0), size)
+
+        samples.append({
+            'hour': round((index + 1) * interval / 3600.0, 2),
+            'rss_mb': round(process.memory_info().rss / 1e6, 1),
+            'people_seen': scene.total_arrivals,
+            'max_store_sizes': max_sizes,
+        })
+        print(f"[SOAK] hour {samples[-1]['hour']}: rss {samples[-1]['rss_mb']} MB, "
+              f"people {scene.total_arrivals}, stores {max_sizes}", file=sys.stderr)
+
+    return {'eviction': eviction, 'hours': hours, 'fps': fps, 'samples': samples}
+
+
+def is_flat(result: dict, rss_tolerance_mb: float) -> bool:
+    """Memory + store size của sample cuối không lớn hơn sample thứ 2 (sau warm-up)"""
+    samples = result['samples']
+    if len(samples) < 3:
+        print(f"[ERROR] Need >= 3 samples to compare warm vs last, got {len(samples)} "
+              f"(increase --hours / --fps)", file=sys.stderr)
+        return False
+
+    warm, last = samples[1], samples[-1]
+    rss_growth = last['rss_mb'] - warm['rss_mb']
+
+    store_growth = any(
+        last['max_store_sizes'][key] > max(warm['max_store_sizes'][key], 1) * 2
+        for key in last['max_store_sizes']
+        if key != 'alert_history'
+    )
+    return rss_growth <= rss_tolerance_mb and not store_growth
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Track lifecycle memory soak test')
+    parser.add_argument('--hours', type=float, default=24.0, help='Simulated hours')
+    parser.add_argument('--fps', type=float, default=2.0, help='Simulated frame rate')
+    parser.add_argument('--rss-tolerance', type=float, default=10.0,
+                        help='Allowed RSS growth (MB) after the first sample')
+    parser.add_argument('--no-eviction', action='store_true',
+                        help='Detach lifecycle listeners (baseline leak)')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+    if args.hours <= 0:
+        parser.error('--hours must be > 0')
+
+    config = load_benchmark_config()
+    result = soak(config, args.hours, args.fps, not args.no_eviction, args.seed)
+    result['flat'] = is_flat(result, args.rss_tolerance)
+
+    print(json.dumps(result, indent=2))
+    sys.exit(0 if result['flat'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+"""
+Tracker association benchmark
+CrowdScene (N người đi cắt ngang nhau + người ngồi yên, có detection bị mất) qua
+PoseDetector.process_predictions → MultiPersonTracker, so sánh:
+- centroid: cost = khoảng cách centroid (tracking.association.oks_weight = 0)
+- oks: trộn thêm 1 - OKS của keypoints (oks_weight = --oks-weight)
+Đo số ID switch (người thật đổi track ID → state machine bị reset) và
+thời gian tracker.update (p50 / p95) cho 10 / 30 / 60 người, cộng dồn qua --seeds scene
+Exit code 1 nếu tổng ID switch của OKS nhiều hơn centroid
+
+Usage: python3 -m benchmarks.tracker_association [--people 10 30 60] [--seeds 5]
+"""
+import sys
+import json
+import copy
+import time
+import argparse
+
+import numpy as np
+
+from core import MultiPersonTracker, TrackEvent
+from core.pose_detector import PoseDetector
+from utils.metrics import LatencyHistogram
+from benchmarks.synthetic import CrowdScene, load_benchmark_config
+
+
+DEFAULT_PEOPLE = [10, 30, 60]
+
+
+def run(config: dict, num_people: int, frames: int, fps: float, oks_weight: float, min_oks: float,
+        seed: int) -> dict:
+    config = copy.deepcopy(config)
+    config['pose']['max_people'] = num_people
+    association = config['tracking'].setdefault('association', {})
+    association['oks_weight'] = oks_weight
+    association['min_oks'] = min_oks
+
+    scene = CrowdScene(num_people, seed=seed)
+    detector = PoseDetector(config, model=scene)
+    tracker = MultiPersonTracker(config)
+    frame = scene.blank_frame()
+
+    created = []
+    tracker.add_lifecycle_listener(
+        lambda event, track: created.append(track.track_id) if event == TrackEvent.CREATED else None
+    )
+
+    histogram = LatencyHistogram()
+    last_track = {}   # người thật → track ID gần nhất
+    switches = 0
+    person_frames = 0
+
+    for i in range(frames):
+        t = i / fps
+        kpts, boxes, confs = scene.predict(t)
+        detections = detector.process_predictions(frame, kpts, boxes, confs, timestamp=t)
+
+        # Detection → người thật (keypoints gần nhất trong output của scene)
+        truth = {}
+        for detection in detections:
+            index = np.argmin(np.abs(kpts[:, :, :2] - detection['keypoints'][None, :, :2]).sum(axis=(1, 2)))
+            truth[id(detection)] = int(scene.last_ids[index])
+
+        start = time.perf_counter()
+        tracker.update(detections)
+        histogram.record(time.perf_counter() - start)
+
+        for track in tracker.tracks.values():
+            person = truth.get(id(track.last_detection)) if track.disappeared == 0 else None
+            if person is None:
+                continue
+            person_frames += 1
+            previous = last_track.get(person)
+            if previous is not None and previous != track.track_id:
+                switches += 1
+            last_track[person] = track.track_id
+
+    summary = histogram.summary()
+    return {
+        'id_switches': switches,
+        'person_frames': person_frames,
+        'tracks_created': len(created),
+        'update_ms_p50': summary['p50_ms'],
+        'update_ms_p95': summary['p95_ms'],
+    }
+
+
+def run_seeds(config: dict, num_people: int, args, oks_weight: float) -> dict:
+    """Cộng ID switches qua các seed, latency lấy trung bình"""
+    runs = [
+        run(config, num_people, args.frames, args.fps, oks_weight, args.min_oks, seed)
+        for seed in range(args.seed, args.seed + args.seeds)
+    ]
+    switches = sum(r['id_switches'] for r in runs)
+    person_frames = sum(r['person_frames'] for r in runs)
+    return {
+        'id_switches': switches,
+        'id_switches_per_seed': [r['id_switches'] for r in runs],
+        'switches_per_1000_person_frames': round(switches * 1000.0 / max(person_frames, 1), 2),
+        'tracks_created': sum(r['tracks_created'] for r in runs),
+        'update_ms_p50': round(float(np.mean([r['update_ms_p50'] for r in runs])), 3),
+        'update_ms_p95': round(float(np.mean([r['update_ms_p95'] for r in runs])), 3),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Tracker association: ID switches + update cost')
+    parser.add_argument('--people', type=int, nargs='+', default=DEFAULT_PEOPLE)
+    parser.add_argument('--frames', type=int, default=300, help='Frames per scene')
+    parser.add_argument('--seeds', type=int, default=5, help='Scenes per people count')
+    parser.add_argument('--fps', type=float, default=15.0, help='Detection rate of the synthetic scene')
+    parser.add_argument('--oks-weight', type=float, default=0.5)
+    parser.add_argument('--min-oks', type=float, default=0.1, help='OKS gate of the oks run')
+    parser.add_argument('--seed', type=int, default=0, help='First scene seed')
+    args = parser.parse_args()
+
+    config = load_benchmark_config()
+    results = []
+    totals = {'centroid': 0, 'oks': 0}
+    for num_people in args.people:
+        centroid = run_seeds(config, num_people, args, 0.0)
+        oks = run_seeds(config, num_people, args, args.oks_weight)
+        totals['centroid'] += centroid['id_switches']
+        totals['oks'] += oks['id_switches']
+        results.append({'people': num_people, 'centroid': centroid, 'oks': oks})
+        print(f"[BENCH] {num_people} people: ID switches {centroid['id_switches']} → "
+              f"{oks['id_switches']}", file=sys.stderr)
+
+    print(json.dumps({
+        'frames': args.frames,
+        'fps': args.fps,
+        'oks_weight': args.oks_weight,
+        'min_oks': args.min_oks,
+        'seeds': args.seeds,
+        'results': results,
+        'total_id_switches': totals,
+        'passed': totals['oks'] <= totals['centroid'],
+    }, indent=2))
+    sys.exit(0 if totals['oks'] <= totals['centroid'] else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,144 @@
+"""
+Spatial-grid association benchmark
+CrowdScene lớn (50-400 người, khung hình nở theo số người như camera góc rộng) qua
+MultiPersonTracker; ở mỗi frame, cùng 1 input (tracks, Kalman predict, detections) được ghép bằng:
+- dense: cost matrix N x M + 1 Hungarian trên mọi cặp (_cost_matrix + _assign)
+- grid: spatial hash ô = gate_distance → cặp ở gần, Hungarian riêng từng thành phần liên thông
+Đo ms / frame (p50 / p95), số cặp ứng viên so với N x M, kích thước thành phần lớn nhất
+và kiểm tra 2 cách cho cùng kết quả ghép
+Exit code 1 nếu kết quả khác nhau hoặc grid chậm hơn dense ở số người lớn nhất
+
+Usage: python3 -m benchmarks.tracker_grid [--people 50 100 200 400] [--frames 150]
+"""
+import sys
+import json
+import copy
+import time
+import argparse
+
+import numpy as np
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+
+from core import MultiPersonTracker
+from core.pose_detector import PoseDetector
+from utils.metrics import LatencyHistogram
+from benchmarks.synthetic import CrowdScene, load_benchmark_config
+
+
+DEFAULT_PEOPLE = [50, 100, 200, 400]
+
+# Mật độ của CrowdScene mặc định ở 30 người (1920x1080)
+BASE_PEOPLE = 30
+
+
+def timed(histogram: LatencyHistogram, fn, *args):
+    start = time.perf_counter()
+    result = fn(*args)
+    histogram.record(time.perf_counter() - start)
+    return result
+
+
+def grid_stats(tracker: MultiPersonTracker, predicted: np.ndarray, detections: list):
+    """(số cặp ứng viên của grid, số track của thành phần liên thông lớn nhất)"""
+    centroids = np.array([d['features']['centroid'] for d in detections], dtype=float)
+    rows, cols = tracker._grid_candidates(predicted, centroids)
+    near = np.hypot(*(predicted[rows] - centroids[cols]).T) <= tracker.gate_distance
+
+    num_tracks = len(predicted)
+    num_nodes = num_tracks + len(centroids)
+    graph = coo_matrix(
+        (np.ones(near.sum()), (rows[near], num_tracks + cols[near])), shape=(num_nodes, num_nodes)
+    )
+    _, labels = connected_components(graph, directed=False)
+    return len(rows), int(np.bincount(labels[:num_tracks]).max())
+
+
+def run(config: dict, num_people: int, frames: int, fps: float, oks_weight: float, seed: int) -> dict:
+    config = copy.deepcopy(config)
+    config['pose']['max_people'] = num_people
+    config['tracking'].setdefault('association', {})['oks_weight'] = oks_weight
+
+    scale = np.sqrt(num_people / BASE_PEOPLE)
+    scene = CrowdScene(num_people, width=int(1920 * scale), height=int(1080 * scale), seed=seed)
+    detector = PoseDetector(config, model=scene)
+    tracker = MultiPersonTracker(config)
+    frame = scene.blank_frame()
+
+    dense_histogram = LatencyHistogram()
+    grid_histogram = LatencyHistogram()
+    mismatched_frames = 0
+    candidate_ratio = []
+    largest_component = 0
+
+    for i in range(frames):
+        t = i / fps
+        detections = detector.process_predictions(frame, *scene.predict(t), timestamp=t)
+
+        if tracker.tracks and detections:
+            tracks = list(tracker.tracks.values())
+            rows = np.array([track.kalman.row for track in tracks])
+            # predict() đổi state → đo trên bản copy của Kalman predict, tracker.update tự predict lại
+            state, P = tracker.kalman_bank.state[rows].copy(), tracker.kalman_bank.P[rows].copy()
+            predicted = tracker.kalman_bank.predict(rows)
+            tracker.kalman_bank.state[rows], tracker.kalman_bank.P[rows] = state, P
+
+            dense = timed(dense_histogram, lambda: tracker._assign(
+                *tracker._cost_matrix(tracks, predicted, detections)
+            ))
+            grid = timed(grid_histogram, tracker._match_sparse, tracks, predicted, detections)
+            mismatched_frames += sorted(dense) != sorted(grid)
+
+            candidates, largest = grid_stats(tracker, predicted, detections)
+            candidate_ratio.append(candidates / (len(tracks) * len(detections)))
+            largest_component = max(largest_component, largest)
+
+        tracker.update(detections)
+
+    dense_summary, grid_summary = dense_histogram.summary(), grid_histogram.summary()
+    return {
+        'people': num_people,
+        'frame_size': [scene.width, scene.height],
+        'dense_ms_p50': round(dense_summary['p50_ms'], 3),
+        'dense_ms_p95': round(dense_summary['p95_ms'], 3),
+        'grid_ms_p50': round(grid_summary['p50_ms'], 3),
+        'grid_ms_p95': round(grid_summary['p95_ms'], 3),
+        'speedup_p50': round(dense_summary['p50_ms'] / max(grid_summary['p50_ms'], 1e-9), 2),
+        'candidate_pairs_ratio': round(float(np.mean(candidate_ratio)), 4) if candidate_ratio else None,
+        'largest_component_tracks': largest_component,
+        'mismatched_frames': mismatched_frames,
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Dense vs spatial-grid component-wise association')
+    parser.add_argument('--people', type=int, nargs='+', default=DEFAULT_PEOPLE)
+    parser.add_argument('--frames', type=int, default=150, help='Frames per people count')
+    parser.add_argument('--fps', type=float, default=15.0, help='Detection rate of the synthetic scene')
+    parser.add_argument('--oks-weight', type=float, default=0.0, help='tracking.association.oks_weight')
+    parser.add_argument('--seed', type=int, default=0)
+    args = parser.parse_args()
+
+    config = load_benchmark_config()
+    results = []
+    for num_people in args.people:
+        results.append(run(config, num_people, args.frames, args.fps, args.oks_weight, args.seed))
+        print(f"[BENCH] {num_people} people: dense {results[-1]['dense_ms_p50']} ms, "
+              f"grid {results[-1]['grid_ms_p50']} ms", file=sys.stderr)
+
+    largest = max(results, key=lambda r: r['people'])
+    passed = (
+        all(r['mismatched_frames'] == 0 for r in results)
+        and largest['grid_ms_p50'] <= largest['dense_ms_p50']
+    )
+    print(json.dumps({
+        'frames': args.frames,
+        'oks_weight': args.oks_weight,
+        'results': results,
+        'passed': passed,
+    }, indent=2))
+    sys.exit(0 if passed else 1)
+
+
+if __name__ == '__main__':
+    main()
@@ -1,19 +1,25 @@
 """Core modules initialization"""
 from core.detector import FallDetector
-from core.tracker import MultiPersonTracker, PersonTrack
+from core.tracker import MultiPersonTracker, PersonTrack, TrackEvent
 from core.state_machine import (
     StateMachineManager, 
     PersonStateMachine, 
     FallState
 )
-from core.immobility import ImmobilityDetector
+from core.immobility import ImmobilityDetector, AdvancedImmobilityDetector
+from core.clock import SystemClock, ManualClock, VideoClock
 
 __all__ = [
     'FallDetector',
     'MultiPersonTracker',
     'PersonTrack',
+    'TrackEvent',
     'StateMachineManager',
     'PersonStateMachine',
     'FallState',
-    'ImmobilityDetector'
+    'ImmobilityDetector',
+    'AdvancedImmobilityDetector',
+    'SystemClock',
+    'ManualClock',
+    'VideoClock'
 ]
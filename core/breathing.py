@@ -0,0 +1,253 @@
+"""
+Streaming breathing-rate estimator
+Chỉ chạy cho track đang FALLEN / ALARM (người đã ngã còn thở không?)
+- Tín hiệu: độ dời ngực mỗi frame (KeypointFlow) hoặc sai phân độ sáng vùng ngực
+- Sliding DFT chỉ trên các bin trong dải thở (0.1-0.7 Hz): mỗi mẫu O(số bin),
+  không FFT lại cả window mỗi frame
+"""
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+from core.state_machine import FallState
+from core.tracker import TrackEvent
+
+
+class SlidingDFT:
+    """
+    Sliding DFT (recursive) cho 1 tập bin cố định của window N mẫu
+    X_k ← r·e^{j2πk/N} · (X_k + x_new − r^N · x_old)   (r < 1: ổn định số học)
+    """
+
+    def __init__(self, window: int, bins: np.ndarray, damping: float = 0.99999):
+        self.window = int(window)
+        self.bins = np.asarray(bins, dtype=np.float64)
+        self.damping_n = damping ** self.window
+        self.twiddle = damping * np.exp(2j * np.pi * self.bins / self.window)
+
+        self.spectrum = np.zeros(len(self.bins), dtype=np.complex128)
+        self.samples = np.zeros(self.window)
+        self.index = 0
+        self.count = 0
+
+    def update(self, x: float):
+        old = self.samples[self.index]
+        self.samples[self.index] = x
+        self.index = (self.index + 1) % self.window
+        self.count = min(self.count + 1, self.window)
+
+        self.spectrum = self.twiddle * (self.spectrum + (x - self.damping_n * old))
+
+
+class BreathingEstimator:
+    """
+    Nhịp thở của 1 người từ chuỗi mẫu đều (1 mẫu / frame)
+    Window + bin tính theo sample rate; khi rate đo từ timestamps (frame rate thực tế,
+    stride / drop frame) lệch khỏi rate đang dùng → dựng lại DFT theo rate đo được
+    """
+
+    def __init__(
+        self,
+        sample_rate: float = 30.0,
+        window_seconds: float = 20.0,
+        min_freq: float = 0.1,
+        max_freq: float = 0.7,
+        min_seconds: float = 4.0,
+        rate_tolerance: float = 0.1,
+        calibration_seconds: float = 2.0,
+    ):
+        self.window_seconds = window_seconds
+        self.min_freq = min_freq
+        self.max_freq = max_freq
+        self.min_seconds = min_seconds
+        self.rate_tolerance = rate_tolerance  # Lệch tương đối > ngưỡng → dựng lại DFT
+        self.calibration_seconds = calibration_seconds  # Rate chỉ tin khi đo trên >= N giây
+
+        self._configure(float(sample_rate))
+
+    def _configure(self, sample_rate: float):
+        self.sample_rate = sample_rate
+        window = max(int(round(self.window_seconds * self.sample_rate)), 8)
+
+        # Bin k ↔ tần số k * fs / N, thêm 1 bin mỗi bên cho Hann window
+        k_min = max(int(np.ceil(self.min_freq * window / self.sample_rate)), 2)
+        k_max = max(int(np.floor(self.max_freq * window / self.sample_rate)), k_min)
+        self.dft = SlidingDFT(window, np.arange(k_min - 1, k_max + 2))
+
+        self.min_samples = max(int(round(self.min_seconds * self.sample_rate)), 1)
+        self.timestamps = np.zeros(window)
+
+    def update(self, x: float, timestamp: float):
+        self.timestamps[self.dft.index] = timestamp
+        self.dft.update(x)
+
+        if self._span() >= self.calibration_seconds:
+            rate = self.measured_rate()
+            if abs(rate - self.sample_rate) > self.rate_tolerance * self.sample_rate:
+                self._resample(rate)
+
+    def _span(self) -> float:
+        """Khoảng thời gian (s) giữa mẫu cũ nhất và mới nhất trong window"""
+        count = self.dft.count
+        if count < 2:
+            return 0.0
+        newest = self.timestamps[(self.dft.index - 1) % self.dft.window]
+        oldest = self.timestamps[(self.dft.index - count) % self.dft.window]
+        return float(newest - oldest)
+
+    def _resample(self, sample_rate: float):
+        """Dựng lại DFT cho sample rate mới, nạp lại các mẫu đang có (theo thứ tự thời gian)"""
+        order = (self.dft.index - self.dft.count + np.arange(self.dft.count)) % self.dft.window
+        samples, timestamps = self.dft.samples[order], self.timestamps[order]
+
+        self._configure(sample_rate)
+        keep = min(len(samples), self.dft.window)
+        for x, timestamp in zip(samples[-keep:], timestamps[-keep:]):
+            self.timestamps[self.dft.index] = timestamp
+            self.dft.update(x)
+
+    def measured_rate(self) -> float:
+        """Sample rate thực tế (theo timestamps trong window)"""
+        span = self._span()
+        if span <= 0:
+            return self.sample_rate
+        return (self.dft.count - 1) / span
+
+    def estimate(self) -> Optional[Dict]:
+        """
+        {rate_bpm, frequency_hz, confidence, window_s} hoặc None nếu chưa đủ mẫu
+        confidence = công suất đỉnh / tổng công suất trong dải (nhiễu trắng ≈ 1 / số bin)
+        """
+        if self.dft.count < self.min_samples:
+            return None
+
+        # Hann window trong miền tần số: 0.5·X_k − 0.25·(X_{k−1} + X_{k+1}) → ít leakage
+        X = self.dft.spectrum
+        windowed = 0.5 * X[1:-1] - 0.25 * (X[:-2] + X[2:])
+        magnitude = np.abs(windowed)
+        power = magnitude ** 2
+        total = power.sum()
+        if total <= 1e-18:
+            return None
+
+        # Đỉnh + nội suy parabol giữa 3 bin lân cận
+        peak = int(np.argmax(magnitude))
+        offset = 0.0
+        if 0 < peak < len(magnitude) - 1:
+            left, center, right = magnitude[peak - 1], magnitude[peak], magnitude[peak + 1]
+            denominator = left - 2 * center + right
+            if denominator != 0:
+                offset = 0.5 * (left - right) / denominator
+
+        fs = self.measured_rate()
+        frequency = (self.dft.bins[peak + 1] + offset) * fs / self.dft.window
+        return {
+            'rate_bpm': round(float(frequency * 60.0), 1),
+            'frequency_hz': round(float(frequency), 3),
+            'confidence': round(float(power[peak] / total), 3),
+            'window_s': round(float(self.dft.count / fs), 1),
+        }
+
+
+class BreathingMonitor:
+    """
+    Estimator theo track, chỉ tồn tại khi track ở FALLEN / ALARM
+    (rời các state đó → bỏ estimator, vận hành bình thường không tốn gì)
+    """
+
+    ACTIVE_STATES = (FallState.FALLEN, FallState.ALARM)
+
+    def __init__(self, config: dict):
+        breathing_config = config.get('detection', {}).get('breathing', {})
+
+        self.enabled = breathing_config.get('enabled', False)
+        # Rate ban đầu, estimator tự chỉnh theo rate đo từ timestamps
+        self.sample_rate = breathing_config.get('sample_rate', config.get('camera', {}).get('fps', 30))
+        self.window_seconds = breathing_config.get('window_seconds', 20.0)
+        self.min_freq = breathing_config.get('min_freq', 0.1)
+        self.max_freq = breathing_config.get('max_freq', 0.7)
+        self.min_seconds = breathing_config.get('min_seconds', 4.0)
+        self.min_confidence = breathing_config.get('min_confidence', 0.3)
+
+        self.estimators: Dict[int, BreathingEstimator] = {}
+        self.last_intensity: Dict[int, float] = {}
+        self.reported = set()  # Track đã log estimate đủ window
+
+    def update(self, track_id: int, state: FallState, track, keypoint_motion, frame, timestamp: float):
+        """1 mẫu / frame: độ dời ngực (keypoint flow) hoặc sai phân độ sáng vùng ngực"""
+        if state not in self.ACTIVE_STATES:
+            if track_id in self.estimators:
+                self.discard(track_id)
+            return
+
+        if keypoint_motion is not None and keypoint_motion.get('chest') is not None:
+            sample = keypoint_motion['chest']
+        else:
+            intensity = self._chest_intensity(track, frame)
+            if intensity is None:
+                return
+            last = self.last_intensity.get(track_id)
+            self.last_intensity[track_id] = intensity
+            if last is None:
+                return
+            sample = intensity - last
+
+        estimator = self.estimators.get(track_id)
+        if estimator is None:
+            estimator = self.estimators[track_id] = BreathingEstimator(
+                self.sample_rate, self.window_seconds,
+                self.min_freq, self.max_freq, self.min_seconds
+            )
+        estimator.update(sample, timestamp)
+
+    def _chest_intensity(self, track, frame) -> Optional[float]:
+        """Độ sáng trung bình vùng ngực (nửa trên thân, từ vai + hông)"""
+        keypoints = getattr(track, 'last_keypoints', None)
+        if keypoints is None or frame is None:
+            return None
+
+        torso = keypoints[[5, 6, 11, 12]]
+        if np.any(torso[:, 2] < 0.3):
+            return None
+
+        # Nửa trên thân theo hướng thân (người nằm: thân nằm ngang trong ảnh)
+        shoulders, hips = torso[:2, :2], torso[2:, :2]
+        chest = np.concatenate([shoulders, (shoulders + hips) / 2.0])
+        H, W = frame.shape[:2]
+        x1, y1 = np.maximum(chest.min(axis=0).astype(int), 0)
+        x2, y2 = np.minimum(np.ceil(chest.max(axis=0)).astype(int), (W, H))
+        if x2 - x1 < 2 or y2 - y1 < 2:
+            return None
+
+        return float(np.mean(cv2.mean(frame[y1:y2, x1:x2])[:3 if frame.ndim == 3 else 1]))
+
+    def get_estimate(self, track_id: int) -> Optional[Dict]:
+        """Estimate hiện tại (None nếu chưa đủ mẫu / không ở FALLEN, ALARM)"""
+        estimator = self.estimators.get(track_id)
+        if estimator is None:
+            return None
+
+        estimate = estimator.estimate()
+        if estimate is not None:
+            estimate['detected'] = estimate['confidence'] >= self.min_confidence
+        return estimate
+
+    def take_full_estimate(self, track_id: int) -> Optional[Dict]:
+        """Estimate trên cả window, trả về 1 lần duy nhất / lần ngã (để log event riêng)"""
+        estimator = self.estimators.get(track_id)
+        if estimator is None or track_id in self.reported or estimator.dft.count < estimator.dft.window:
+            return None
+
+        self.reported.add(track_id)
+        return self.get_estimate(track_id)
+
+    def discard(self, track_id: int):
+        self.estimators.pop(track_id, None)
+        self.last_intensity.pop(track_id, None)
+        self.reported.discard(track_id)
+
+    def on_track_event(self, event: TrackEvent, track):
+        """Track lifecycle listener: drop estimator of removed tracks"""
+        if event == TrackEvent.REMOVED:
+            self.discard(track.track_id)
@@ -0,0 +1,139 @@
+"""
+Threaded Frame Capture
+Đọc camera trong thread riêng, chỉ giữ frame mới nhất (latest-frame-only)
+"""
+import threading
+import time
+import numpy as np
+from typing import Optional, Tuple
+
+
+class LatestFrameGrabber:
+    """
+    Capture stage chạy trong background thread
+    Giữ 1 slot duy nhất: (frame, capture timestamp, sequence number)
+    Nếu processing chậm hơn camera, frame cũ bị ghi đè thay vì xếp hàng
+    """
+
+    def __init__(
+        self,
+        cap,
+        drop_frames: bool = True,
+        frame_event: Optional[threading.Event] = None
+    ):
+        """
+        Args:
+            cap: opened cv2.VideoCapture (hoặc object có read()/release())
+            drop_frames: True cho camera live (ghi đè frame chưa xử lý),
+                         False cho video file (chờ consumer, không mất frame)
+            frame_event: Event dùng chung, set mỗi khi có frame mới
+                         (multi-camera loop chờ trên 1 event cho tất cả camera)
+        """
+        self.cap = cap
+        self.drop_frames = drop_frames
+        self.frame_event = frame_event
+
+        # Single-slot buffer
+        self._frame: Optional[np.ndarray] = None
+        self._timestamp = 0.0
+        self._seq = 0
+        self._last_read_seq = 0
+
+        self._cond = threading.Condition()
+        self._thread = None
+        self.running = False
+        self.stopped = False  # Stream kết thúc hoặc lỗi đọc
+
+        # Stats
+        self.frames_captured = 0
+        self.frames_dropped = 0
+
+    def start(self):
+        """Start capture thread"""
+        self.running = True
+        self._thread = threading.Thread(target=self._capture_loop, daemon=True)
+        self._thread.start()
+        return self
+
+    def stop(self):
+        """Stop capture thread"""
+        with self._cond:
+            self.running = False
+            self._cond.notify_all()
+
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _capture_loop(self):
+        """Read frames as fast as the source delivers them"""
+        while self.running:
+            ret, frame = self.cap.read()
+            timestamp = time.time()
+
+            if not ret:
+                with self._cond:
+                    self.stopped = True
+                    self._cond.notify_all()
+                if self.frame_event is not None:
+                    self.frame_event.set()
+                break
+
+            with self._cond:
+                if not self.drop_frames:
+                    # Video file: chờ consumer lấy frame trước
+                    while self.running and self._seq > self._last_read_seq:
+                        self._cond.wait(timeout=0.1)
+                    if not self.running:
+                        break
+                elif self._seq > self._last_read_seq:
+                    # Frame trước chưa được xử lý → bị ghi đè
+                    self.frames_dropped += 1
+
+                self._frame = frame
+                self._timestamp = timestamp
+                self._seq += 1
+                self.frames_captured += 1
+                self._cond.notify_all()
+
+            if self.frame_event is not None:
+                self.frame_event.set()
+
+    def read(self, timeout: float = 1.0) -> Tuple[bool, Optional[np.ndarray], float, int]:
+        """
+        Lấy frame mới nhất (block đến khi có frame mới)
+        Returns:
+            (ok, frame, capture_timestamp, skipped)
+            skipped = số frame bị bỏ qua kể từ lần read trước
+        """
+        deadline = time.time() + timeout
+
+        with self._cond:
+            while self._seq == self._last_read_seq:
+                if self.stopped or not self.running:
+                    return False, None, 0.0, 0
+
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return False, None, 0.0, 0
+                self._cond.wait(timeout=remaining)
+
+            skipped = self._seq - self._last_read_seq - 1
+            self._last_read_seq = self._seq
+            frame, timestamp = self._frame, self._timestamp
+            self._frame = None
+            self._cond.notify_all()
+
+        return True, frame, timestamp, skipped
+
+    def has_new_frame(self) -> bool:
+        """Check if an unread frame is waiting in the slot"""
+        with self._cond:
+            return self._seq > self._last_read_seq
+
+    def get_stats(self) -> dict:
+        """Capture statistics"""
+        return {
+            'captured': self.frames_captured,
+            'dropped': self.frames_dropped,
+        }
@@ -0,0 +1,63 @@
+"""
+Injectable clocks
+Live camera dùng wall clock, offline video dùng thời gian của video (PTS)
+để các ngưỡng thời gian (fall_duration_threshold, immobility_threshold...)
+vẫn đúng khi xử lý nhanh hơn realtime
+"""
+import time
+import cv2
+
+
+class SystemClock:
+    """Wall clock (default, live camera)"""
+
+    def now(self) -> float:
+        return time.time()
+
+
+class ManualClock:
+    """Clock chỉ tiến khi được set/advance (offline replay, benchmark)"""
+
+    def __init__(self, start_time: float = 0.0):
+        self._now = float(start_time)
+
+    def now(self) -> float:
+        return self._now
+
+    def set(self, timestamp: float):
+        self._now = float(timestamp)
+
+    def advance(self, seconds: float):
+        self._now += float(seconds)
+
+
+class VideoClock(ManualClock):
+    """
+    Clock theo presentation timestamp của video
+    Dùng CAP_PROP_POS_MSEC, fallback frame_index / fps nếu backend không hỗ trợ
+    """
+
+    def __init__(self, fps: float = 30.0, start_time: float = 0.0):
+        super().__init__(start_time)
+        self.fps = fps if fps and fps > 0 else 30.0
+        self.start_time = float(start_time)
+
+    def update_from_capture(self, cap, frame_index: int) -> float:
+        """
+        Cập nhật clock sau mỗi cap.read()
+        Args:
+            cap: cv2.VideoCapture
+            frame_index: index của frame vừa đọc (0-based)
+        Returns: timestamp (seconds)
+        """
+        pos_msec = cap.get(cv2.CAP_PROP_POS_MSEC)
+
+        # Một số backend không hỗ trợ POS_MSEC (trả 0) → dùng frame index
+        if pos_msec and pos_msec > 0:
+            video_time = pos_msec / 1000.0
+        else:
+            video_time = frame_index / self.fps
+
+        # Không cho clock chạy lùi
+        self.set(max(self.start_time + video_time, self._now))
+        return self._now
@@ -0,0 +1,140 @@
+"""
+Tracked-region crop inference
+Giữa các lần full-frame detection, chỉ chạy pose model trên vùng crop quanh
+bbox dự đoán (Kalman) của từng track, ở imgsz nhỏ hơn
+1-2 người / phòng → số pixel đưa vào model giảm nhiều lần
+"""
+from typing import Dict, List, Optional, Tuple
+
+from core.tracker import PersonTrack
+
+
+class CropRegionPlanner:
+    """
+    Quyết định frame nào chạy full-frame, frame nào chỉ chạy crop
+    Full-frame khi:
+    - mỗi full_frame_interval frame (bắt người mới xuất hiện giữa khung)
+    - không có track / có track bị mất detection
+    - có track sát mép khung hình (người có thể đang đi vào / ra)
+    - tổng diện tích crop quá lớn (không còn lợi)
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        pose_cfg = config.get('pose', {})
+        crop_config = pose_cfg.get('crop_inference', {})
+
+        self.enabled = crop_config.get('enabled', False)
+        self.full_frame_interval = max(1, int(crop_config.get('full_frame_interval', 10)))
+        self.padding = float(crop_config.get('padding', 0.25))
+        self.edge_margin = float(crop_config.get('edge_margin', 0.05))
+        self.max_crops = int(crop_config.get('max_crops', 4))
+        self.max_area_ratio = float(crop_config.get('max_area_ratio', 0.5))
+        self.crop_imgsz = int(crop_config.get('imgsz', 320))
+        self.full_imgsz = int(pose_cfg.get('imgsz', 640))
+
+        self.frames_since_full = 0
+
+        # Stats
+        self.full_frames = 0
+        self.crop_frames = 0
+        self.crops = 0
+        self.input_pixels = 0         # Pixel thực sự đưa vào model
+        self.full_input_pixels = 0    # Nếu mọi frame đều chạy full-frame
+
+    def plan(
+        self,
+        tracks: Dict[int, PersonTrack],
+        frame_shape: Tuple[int, ...]
+    ) -> Optional[List[Tuple[int, int, int, int]]]:
+        """
+        Returns: None → chạy full-frame
+                 List[(x1, y1, x2, y2)] → chỉ chạy các vùng crop này
+        """
+        regions = self._plan_regions(tracks, frame_shape) if self.enabled else None
+
+        self.full_input_pixels += self.full_imgsz * self.full_imgsz
+        if regions is None:
+            self.frames_since_full = 0
+            self.full_frames += 1
+            self.input_pixels += self.full_imgsz * self.full_imgsz
+        else:
+            self.frames_since_full += 1
+            self.crop_frames += 1
+            self.crops += len(regions)
+            self.input_pixels += len(regions) * self.crop_imgsz * self.crop_imgsz
+
+        return regions
+
+    def _plan_regions(self, tracks, frame_shape):
+        if self.frames_since_full + 1 >= self.full_frame_interval:
+            return None
+
+        if len(tracks) == 0 or len(tracks) > self.max_crops:
+            return None
+
+        H, W = frame_shape[:2]
+        margin_x, margin_y = self.edge_margin * W, self.edge_margin * H
+
+        boxes = []
+        for track in tracks.values():
+            if track.disappeared > 0:
+                return None
+
+            x1, y1, x2, y2 = self._predicted_box(track)
+
+            # Sát mép → có thể có người đi vào / ra khỏi khung hình
+            if x1 < margin_x or y1 < margin_y or x2 > W - margin_x or y2 > H - margin_y:
+                return None
+
+            pad = self.padding * max(x2 - x1, y2 - y1)
+            boxes.append([
+                max(0, int(x1 - pad)), max(0, int(y1 - pad)),
+                min(W, int(x2 + pad)), min(H, int(y2 + pad)),
+            ])
+
+        regions = self._merge_overlapping(boxes)
+
+        area = sum((x2 - x1) * (y2 - y1) for x1, y1, x2, y2 in regions)
+        if area > self.max_area_ratio * W * H:
+            return None
+
+        return [tuple(region) for region in regions]
+
+    def _predicted_box(self, track: PersonTrack) -> Tuple[float, float, float, float]:
+        """Bbox cuối dịch theo vận tốc Kalman (không gọi predict → không đổi state)"""
+        x, y, w, h = track.last_bbox
+        vx, vy = track.kalman.state[2:4]
+        return x + vx, y + vy, x + vx + w, y + vy + h
+
+    def _merge_overlapping(self, boxes: List[List[int]]) -> List[List[int]]:
+        """Gộp crop chồng nhau → 1 người không bị detect 2 lần"""
+        merged = True
+        while merged and len(boxes) > 1:
+            merged = False
+            for i in range(len(boxes)):
+                for j in range(i + 1, len(boxes)):
+                    a, b = boxes[i], boxes[j]
+                    if a[0] < b[2] and b[0] < a[2] and a[1] < b[3] and b[1] < a[3]:
+                        boxes[i] = [
+                            min(a[0], b[0]), min(a[1], b[1]),
+                            max(a[2], b[2]), max(a[3], b[3]),
+                        ]
+                        del boxes[j]
+                        merged = True
+                        break
+                if merged:
+                    break
+        return boxes
+
+    def get_stats(self) -> dict:
+        """Full vs crop frames + input pixel saving"""
+        return {
+            'enabled': self.enabled,
+            'full_frame_interval': self.full_frame_interval,
+            'crop_imgsz': self.crop_imgsz,
+            'full_frames': self.full_frames,
+            'crop_frames': self.crop_frames,
+            'crops': self.crops,
+            'pixel_ratio': self.input_pixels / max(self.full_input_pixels, 1),
+        }
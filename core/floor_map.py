@@ -0,0 +1,311 @@
+"""
+Floor map
+Ước lượng "sàn nhà" từ vị trí ankle (cổ chân) theo từng cột ảnh:
+camera nghiêng / góc rộng → đường sàn không phải 1 đường ngang duy nhất
+- Mỗi cột giữ 1 P² quantile estimator (5 marker, O(1) update, bộ nhớ cố định)
+  theo cửa sổ `window` mẫu gần nhất → camera bị dời / đổi góc thì floor đi theo
+- Cột chưa đủ mẫu → dùng ước lượng toàn ảnh
+- Lưu JSON theo camera → restart không phải warm-up lại
+Toạ độ lưu dạng normalized (x / W, y / H) → không phụ thuộc độ phân giải
+"""
+import os
+import re
+import json
+import time
+from bisect import insort
+from typing import Optional
+
+import numpy as np
+
+
+class P2Quantile:
+    """
+    P² streaming quantile (Jain & Chlamtac 1985)
+    5 marker heights / positions, cập nhật O(1), không giữ lại mẫu
+    """
+
+    __slots__ = ('p', 'count', 'heights', 'positions', 'desired', 'increments')
+
+    def __init__(self, p: float):
+        self.p = p
+        self.count = 0
+        self.heights = []
+        self.positions = [1.0, 2.0, 3.0, 4.0, 5.0]
+        self.desired = [1.0, 1.0 + 2 * p, 1.0 + 4 * p, 3.0 + 2 * p, 5.0]
+        self.increments = [0.0, p / 2, p, (1.0 + p) / 2, 1.0]
+
+    def add(self, x: float):
+        self.count += 1
+        q = self.heights
+
+        # 5 mẫu đầu: giữ nguyên (sorted) làm marker ban đầu
+        if self.count <= 5:
+            insort(q, x)
+            return
+
+        if x < q[0]:
+            q[0] = x
+            k = 0
+        elif x >= q[4]:
+            q[4] = x
+            k = 3
+        else:
+            k = 0
+            while x >= q[k + 1]:
+                k += 1
+
+        n = self.positions
+        for i in range(k + 1, 5):
+            n[i] += 1
+        for i in range(5):
+            self.desired[i] += self.increments[i]
+
+        # Chỉnh 3 marker giữa về vị trí mong muốn
+        for i in (1, 2, 3):
+            d = self.desired[i] - n[i]
+            if (d >= 1 and n[i + 1] - n[i] > 1) or (d <= -1 and n[i - 1] - n[i] < -1):
+                d = 1 if d > 0 else -1
+                height = self._parabolic(i, d)
+                if not q[i - 1] < height < q[i + 1]:
+                    height = q[i] + d * (q[i + d] - q[i]) / (n[i + d] - n[i])
+                q[i] = height
+                n[i] += d
+
+    def _parabolic(self, i: int, d: int) -> float:
+        q, n = self.heights, self.positions
+        return q[i] + d / (n[i + 1] - n[i - 1]) * (
+            (n[i] - n[i - 1] + d) * (q[i + 1] - q[i]) / (n[i + 1] - n[i])
+            + (n[i + 1] - n[i] - d) * (q[i] - q[i - 1]) / (n[i] - n[i - 1])
+        )
+
+    def value(self) -> Optional[float]:
+        """Quantile hiện tại (None nếu chưa có mẫu)"""
+        if self.count == 0:
+            return None
+        if self.count <= 5:
+            # Ít mẫu: nội suy tuyến tính trên mẫu đã sort
+            position = self.p * (len(self.heights) - 1)
+            lower = int(position)
+            upper = min(lower + 1, len(self.heights) - 1)
+            return self.heights[lower] + (position - lower) * (self.heights[upper] - self.heights[lower])
+        return self.heights[2]
+
+    def to_dict(self) -> dict:
+        return {
+            'count': self.count,
+            'heights': list(self.heights),
+            'positions': list(self.positions),
+            'desired': list(self.desired),
+        }
+
+    @classmethod
+    def from_dict(cls, p: float, state: dict) -> 'P2Quantile':
+        estimator = cls(p)
+        estimator.count = int(state['count'])
+        estimator.heights = [float(v) for v in state['heights']]
+        estimator.positions = [float(v) for v in state['positions']]
+        estimator.desired = [float(v) for v in state['desired']]
+        return estimator
+
+
+class WindowedP2Quantile:
+    """
+    P² chỉ nhớ ~window mẫu gần nhất: 2 estimator chạy gối nhau (active, warming),
+    warming đủ window mẫu → thay active, warming mới bắt đầu từ 0
+    value() luôn dựa trên [window, 2 * window) mẫu gần nhất
+    """
+
+    __slots__ = ('p', 'window', 'active', 'warming')
+
+    def __init__(self, p: float, window: int):
+        self.p = p
+        self.window = max(int(window), 6)
+        self.active = P2Quantile(p)
+        self.warming = P2Quantile(p)
+
+    @property
+    def count(self) -> int:
+        return self.active.count
+
+    def add(self, x: float):
+        self.active.add(x)
+        if self.active.count <= self.window:
+            return
+
+        # Active đã quá window: warming gom dữ liệu mới, đủ window → thay thế
+        self.warming.add(x)
+        if self.warming.count >= self.window:
+            self.active = self.warming
+            self.warming = P2Quantile(self.p)
+
+    def value(self) -> Optional[float]:
+        return self.active.value()
+
+    def to_dict(self) -> dict:
+        return {'active': self.active.to_dict(), 'warming': self.warming.to_dict()}
+
+    @classmethod
+    def from_dict(cls, p: float, window: int, state: dict) -> 'WindowedP2Quantile':
+        estimator = cls(p, window)
+        if 'active' in state:
+            estimator.active = P2Quantile.from_dict(p, state['active'])
+            estimator.warming = P2Quantile.from_dict(p, state['warming'])
+        else:
+            # Format cũ (1 P² cộng dồn): dùng làm active, bị thay sau window mẫu mới
+            estimator.active = P2Quantile.from_dict(p, state)
+        return estimator
+
+
+class FloorMap:
+    """
+    Floor y (normalized) theo cột ảnh
+    lookup(x) là table lookup: mảng `floor` (columns,) được cập nhật cùng lúc với estimator
+    """
+
+    def __init__(self, config: dict, camera_id: str = None):
+        floor_config = config.get('pose', {}).get('floor_map', {})
+
+        self.columns = max(1, int(floor_config.get('columns', 8)))
+        self.quantile = float(floor_config.get('quantile', 0.9))
+        self.min_samples = int(floor_config.get('min_samples', 30))
+        self.save_interval = float(floor_config.get('save_interval', 300))
+        self.window = int(floor_config.get('window', 300))
+
+        self.path = None
+        directory = floor_config.get('path', 'data/floor_maps')
+        if floor_config.get('persist', True) and directory:
+            name = re.sub(r'[^A-Za-z0-9_.-]+', '_', str(camera_id)) if camera_id is not None else 'default'
+            self.path = os.path.join(directory, f"{name}.json")
+
+        self.reset()
+        self._last_save = time.time()
+        self._dirty = False
+
+        if self.path is not None:
+            # floor_map.reset / main.py --reset-floor-map: bỏ map đã lưu (camera bị dời / đổi góc)
+            if floor_config.get('reset', False):
+                self.delete_saved()
+            else:
+                self.load()
+
+    def reset(self):
+        """Bỏ toàn bộ ước lượng (camera bị dời / đổi góc)"""
+        # Ước lượng toàn ảnh nhận mẫu của mọi cột → window lớn hơn tương ứng
+        self.global_estimator = WindowedP2Quantile(self.quantile, self.window * self.columns)
+        self.column_estimators = [WindowedP2Quantile(self.quantile, self.window) for _ in range(self.columns)]
+        # Table lookup: NaN = cột chưa đủ mẫu
+        self.floor = np.full(self.columns, np.nan)
+        self.global_floor = None
+
+    def update(self, x: float, y: float):
+        """1 ankle (x, y normalized 0-1)"""
+        column = min(max(int(x * self.columns), 0), self.columns - 1)
+
+        estimator = self.column_estimators[column]
+        estimator.add(y)
+        if estimator.count >= self.min_samples:
+            self.floor[column] = estimator.value()
+
+        self.global_estimator.add(y)
+        if self.global_estimator.count >= self.min_samples:
+            self.global_floor = self.global_estimator.value()
+
+        self._dirty = True
+
+    def lookup(self, xs: np.ndarray) -> np.ndarray:
+        """
+        Floor y (normalized) tại các vị trí x (normalized)
+        Cột chưa đủ mẫu → floor toàn ảnh, chưa có gì → NaN
+        """
+        columns = np.clip((np.asarray(xs) * self.columns).astype(np.int64), 0, self.columns - 1)
+        floor = self.floor[columns]
+        if self.global_floor is not None:
+            floor = np.where(np.isnan(floor), self.global_floor, floor)
+        return floor
+
+    @property
+    def ready(self) -> bool:
+        return self.global_floor is not None
+
+    def maybe_save(self):
+        """Lưu định kỳ (save_interval giây) nếu có mẫu mới"""
+        if self.path is None or not self._dirty:
+            return
+        if time.time() - self._last_save >= self.save_interval:
+            self.save()
+
+    def save(self):
+        """Ghi map ra JSON (atomic: file tạm + rename)"""
+        if self.path is None or not self._dirty:
+            return
+
+        state = {
+            'columns': self.columns,
+            'quantile': self.quantile,
+            'global': self.global_estimator.to_dict(),
+            'cells': [estimator.to_dict() for estimator in self.column_estimators],
+        }
+
+        try:
+            os.makedirs(os.path.dirname(self.path) or '.', exist_ok=True)
+            tmp_path = self.path + '.tmp'
+            with open(tmp_path, 'w') as f:
+                json.dump(state, f)
+            os.replace(tmp_path, self.path)
+            self._dirty = False
+        except OSError as e:
+            print(f"[ERROR] Failed to save floor map: {e}")
+
+        self._last_save = time.time()
+
+    def load(self) -> bool:
+        """Đọc map đã lưu (bỏ qua nếu khác columns / quantile)"""
+        if self.path is None or not os.path.exists(self.path):
+            return False
+
+        try:
+            with open(self.path, 'r') as f:
+                state = json.load(f)
+
+            if int(state['columns']) != self.columns or float(state['quantile']) != self.quantile:
+                print(f"[WARNING] Floor map {self.path} has different columns/quantile, ignored")
+                return False
+
+            self.global_estimator = WindowedP2Quantile.from_dict(
+                self.quantile, self.window * self.columns, state['global']
+            )
+            self.column_estimators = [
+                WindowedP2Quantile.from_dict(self.quantile, self.window, cell) for cell in state['cells']
+            ]
+        except (OSError, ValueError, KeyError, TypeError) as e:
+            print(f"[ERROR] Failed to load floor map: {e}")
+            self.reset()
+            return False
+
+        for column, estimator in enumerate(self.column_estimators):
+            if estimator.count >= self.min_samples:
+                self.floor[column] = estimator.value()
+        if self.global_estimator.count >= self.min_samples:
+            self.global_floor = self.global_estimator.value()
+
+        print(f"[POSE] Floor map loaded: {self.path} ({self.global_estimator.count} samples)")
+        return True
+
+    def delete_saved(self):
+        """Xóa map đã lưu của camera này (ước lượng lại từ đầu)"""
+        if self.path is None or not os.path.exists(self.path):
+            return
+
+        try:
+            os.remove(self.path)
+            print(f"[POSE] Floor map reset: {self.path} removed")
+        except OSError as e:
+            print(f"[ERROR] Failed to remove floor map: {e}")
+
+    def get_stats(self) -> dict:
+        return {
+            'samples': self.global_estimator.count,
+            'global_floor': self.global_floor,
+            'columns_ready': int(np.count_nonzero(~np.isnan(self.floor))),
+            'columns': self.columns,
+        }
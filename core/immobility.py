@@ -2,10 +2,12 @@
 Immobility Detection Module
 Phát hiện bất động sau khi ngã
 """
-import cv2
 import numpy as np
 from typing import Tuple
 from collections import deque
+from core.tracker import TrackEvent
+from core.motion_energy import FrameDiff
+from core.keypoint_flow import KeypointFlow
 
 
 class ImmobilityDetector:
@@ -21,6 +23,9 @@ class ImmobilityDetector:
         self.motion_history = {}  # {track_id: deque}
         self.history_size = 10
         
+        # Frame diff + integral images (main gán chung instance với PoseDetector)
+        self.frame_diff = FrameDiff.from_config(config)
+        
     def calculate_motion_energy(
         self,
         prev_frame: np.ndarray,
@@ -51,31 +56,8 @@ class ImmobilityDetector:
         if w <= 0 or h <= 0:
             return 0.0
         
-        # Extract ROI
-        roi_prev = prev_frame[y:y+h, x:x+w]
-        roi_curr = curr_frame[y:y+h, x:x+w]
-        
-        if roi_prev.shape != roi_curr.shape or roi_prev.size == 0:
-            return 0.0
-        
-        # Convert to grayscale if needed
-        if len(roi_prev.shape) == 3:
-            roi_prev = cv2.cvtColor(roi_prev, cv2.COLOR_BGR2GRAY)
-        if len(roi_curr.shape) == 3:
-            roi_curr = cv2.cvtColor(roi_curr, cv2.COLOR_BGR2GRAY)
-        
-        # Frame difference
-        diff = cv2.absdiff(roi_prev, roi_curr)
-        
-        # Threshold to remove noise
-        _, thresh = cv2.threshold(diff, 25, 255, cv2.THRESH_BINARY)
-        
-        # Motion energy = percentage of moving pixels
-        motion_pixels = np.count_nonzero(thresh)
-        total_pixels = thresh.size
-        motion_energy = (motion_pixels / total_pixels) * 100
-        
-        return motion_energy
+        # Motion energy = percentage of moving pixels (|diff| > 25)
+        return self.frame_diff.moving_percent(prev_frame, curr_frame, (x, y, w, h))
     
     def update_history(self, track_id: int, motion_energy: float):
         """Update motion history for smoothing"""
@@ -105,6 +87,11 @@ class ImmobilityDetector:
         if track_id in self.motion_history:
             del self.motion_history[track_id]
     
+    def on_track_event(self, event: TrackEvent, track):
+        """Track lifecycle listener: drop motion history of removed tracks"""
+        if event == TrackEvent.REMOVED:
+            self.reset_history(track.track_id)
+    
     def get_immobility_score(self, track_id: int) -> float:
         """
         Get immobility score (0-1)
@@ -119,24 +106,61 @@ class ImmobilityDetector:
 
 class AdvancedImmobilityDetector(ImmobilityDetector):
     """
-    Nâng cấp: phát hiện chuyển động của các body parts (nếu có pose)
-    Hiện tại chỉ dùng basic version
+    Nâng cấp: phát hiện chuyển động của các body parts (pose keypoints)
+    Sparse LK optical flow (KeypointFlow): chuyển động từng chi + micro-motion vùng ngực
     """
     
     def __init__(self, config: dict):
         super().__init__(config)
-        # TODO: Add pose-based immobility detection
-        # Check if hands/legs are moving even if body is still
+        flow_config = config.get('detection', {}).get('keypoint_flow', {})
+        self.keypoint_flow = KeypointFlow.from_config(config)
+        
+        # Chi dời > limb_threshold (tỉ lệ chiều cao người / frame) → không bất động
+        self.limb_threshold = flow_config.get('limb_threshold', 0.01)
+        # Dao động ngực > vital_threshold (tỉ lệ chiều dài thân) → còn cử động vi tế (thở)
+        self.vital_threshold = flow_config.get('vital_threshold', 0.002)
+        
+        self.keypoint_motion = {}  # {track_id: motion của frame gần nhất}
     
-    def detect_vital_movements(
-        self, 
-        bbox: Tuple[int, int, int, int],
-        frame: np.ndarray
-    ) -> bool:
+    def update_keypoint_flow(
+        self,
+        prev_frame: np.ndarray,
+        curr_frame: np.ndarray,
+        tracks: dict
+    ) -> dict:
+        """LK flow cho mọi track (1 pyramid / frame), gọi 1 lần mỗi frame"""
+        self.keypoint_motion = self.keypoint_flow.measure(prev_frame, curr_frame, tracks)
+        return self.keypoint_motion
+    
+    def get_keypoint_motion(self, track_id: int):
+        """Per-limb motion + chest của frame gần nhất (None nếu không đo được)"""
+        motion = self.keypoint_motion.get(track_id)
+        if motion is None:
+            return None
+        
+        motion = dict(motion)
+        motion['limbs_moving'] = motion['limb_max'] > self.limb_threshold
+        motion['vital'] = self.detect_vital_movements(track_id)
+        return motion
+    
+    def is_immobile(self, track_id: int) -> bool:
+        """Bất động: motion energy thấp và không chi nào dời"""
+        if not super().is_immobile(track_id):
+            return False
+        
+        motion = self.keypoint_motion.get(track_id)
+        return motion is None or motion['limb_max'] <= self.limb_threshold
+    
+    def detect_vital_movements(self, track_id: int) -> bool:
         """
         Phát hiện chuyển động vi tế (breathing, small movements)
-        Placeholder for future enhancement
+        Ngực còn dao động trong khi các chi đứng yên
         """
-        # TODO: Implement optical flow analysis
-        # TODO: Or use small region analysis for chest movement
-        return False
+        micro_motion = self.keypoint_flow.chest_micro_motion(track_id)
+        return micro_motion is not None and micro_motion > self.vital_threshold
+    
+    def reset_history(self, track_id: int):
+        """Reset history for a track"""
+        super().reset_history(track_id)
+        self.keypoint_motion.pop(track_id, None)
+        self.keypoint_flow.reset_track(track_id)
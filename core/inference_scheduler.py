@@ -0,0 +1,94 @@
+"""
+Adaptive Inference Scheduler
+Bỏ qua pose inference khi mọi người đều đứng yên/đi chậm (STANDING)
+Giữa các lần inference, track được propagate bằng Kalman predict
+"""
+from typing import Dict
+from core.state_machine import FallState, StateMachineManager
+from core.tracker import PersonTrack
+
+
+class AdaptiveInferenceScheduler:
+    """
+    Quyết định frame nào cần chạy YOLOv8-Pose
+    - Tất cả track calm (STANDING + hip speed thấp) → inference mỗi calm_stride frame
+    - Bất kỳ track nào nhanh / rời STANDING / mới xuất hiện / bị mất → full rate
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        stride_config = config.get('pose', {}).get('adaptive_stride', {})
+
+        self.enabled = stride_config.get('enabled', False)
+        self.calm_stride = max(1, int(stride_config.get('calm_stride', 3)))
+        # Phải thấp hơn nhiều so với speed_thr 0.70 của state machine
+        self.hip_speed_threshold = float(stride_config.get('hip_speed_threshold', 0.25))
+        self.min_hits = int(stride_config.get('min_hits', 2))
+
+        self.frames_since_inference = 0
+
+        # Stats
+        self.total_frames = 0
+        self.inferred_frames = 0
+        self.skipped_frames = 0
+
+    def should_infer(
+        self,
+        tracks: Dict[int, PersonTrack],
+        state_manager: StateMachineManager
+    ) -> bool:
+        """Decide whether the current frame needs pose inference"""
+        self.total_frames += 1
+
+        if not self.enabled or self.calm_stride <= 1:
+            return self._mark_inferred()
+
+        # Không có ai → vẫn phải detect mỗi frame để bắt người mới vào
+        if len(tracks) == 0:
+            return self._mark_inferred()
+
+        if not self._all_calm(tracks, state_manager):
+            return self._mark_inferred()
+
+        if self.frames_since_inference + 1 >= self.calm_stride:
+            return self._mark_inferred()
+
+        self.frames_since_inference += 1
+        self.skipped_frames += 1
+        return False
+
+    def _mark_inferred(self) -> bool:
+        self.frames_since_inference = 0
+        self.inferred_frames += 1
+        return True
+
+    def _all_calm(
+        self,
+        tracks: Dict[int, PersonTrack],
+        state_manager: StateMachineManager
+    ) -> bool:
+        """True nếu mọi track đều STANDING, ổn định và di chuyển chậm"""
+        for track_id, track in tracks.items():
+            # Track mới hoặc vừa mất detection → cần dữ liệu thật
+            if track.disappeared > 0 or track.hits < self.min_hits:
+                return False
+
+            state = state_manager.get_state(track_id)
+            if state is not None and state != FallState.STANDING:
+                return False
+
+            if track.get_hip_speed_norm() > self.hip_speed_threshold:
+                return False
+
+        return True
+
+    def get_stats(self) -> dict:
+        """Skip statistics"""
+        return {
+            'enabled': self.enabled,
+            'calm_stride': self.calm_stride,
+            'total_frames': self.total_frames,
+            'inferred_frames': self.inferred_frames,
+            'skipped_frames': self.skipped_frames,
+            'skip_ratio': self.skipped_frames / max(self.total_frames, 1),
+        }
@@ -0,0 +1,242 @@
+"""
+Sparse keypoint optical flow (pyramidal Lucas-Kanade)
+Thay vì diff dày đặc trong cả bbox, chỉ theo dõi vài chục điểm / người:
+- keypoints đủ conf → độ dời theo từng chi (head / arms / legs)
+- lưới điểm vùng ngực (giữa vai và hông) → tín hiệu micro-motion của ngực
+Điểm seed = keypoints của track ở frame trước (vị trí trên prev frame), LK tìm vị trí trên curr
+Gray cache theo frame; điểm của mọi track gom vào 1 lần gọi calcOpticalFlowPyrLK trên cả frame
+→ pyramid dựng 1 lần / frame cho mọi track (Python binding không nhận pyramid dựng sẵn
+của buildOpticalFlowPyramid nên không dựng riêng được)
+Tách "nằm yên nhưng còn thở" khỏi "không có chuyển động nào"
+"""
+from collections import deque
+from typing import Dict, Optional
+
+import cv2
+import numpy as np
+
+
+# Nhóm keypoints COCO-17 theo chi
+LIMBS = {
+    'head': [0, 1, 2, 3, 4],
+    'left_arm': [5, 7, 9],
+    'right_arm': [6, 8, 10],
+    'left_leg': [11, 13, 15],
+    'right_leg': [12, 14, 16],
+}
+
+
+def _masked_median(values: np.ndarray, mask: np.ndarray) -> np.ndarray:
+    """Median theo hàng (N, K) chỉ trên phần tử mask, hàng không có phần tử nào → 0"""
+    ordered = np.sort(np.where(mask, values, np.inf), axis=1)
+    count = mask.sum(axis=1)
+    rows = np.arange(len(values))
+    lower = ordered[rows, np.maximum((count - 1) // 2, 0)]
+    upper = ordered[rows, np.maximum(count // 2, 0) % values.shape[1]]
+    return np.where(count > 0, (lower + upper) / 2.0, 0.0)
+
+
+class KeypointFlow:
+    """
+    Mỗi frame: measure(prev, curr, tracks) → {track_id: motion}
+    motion = {
+        'limbs': {limb: độ dời / chiều cao người},   # median của các keypoint trong chi
+        'limb_max': max các chi,
+        'chest': độ dời ngực theo pháp tuyến thân (đã trừ trôi của thân) / chiều dài thân,
+        'points': số điểm LK bám được,
+    }
+    Tín hiệu ngực (tích luỹ) được giữ theo track để đo micro-motion / nhịp thở
+    """
+
+    def __init__(
+        self,
+        win_size: int = 11,
+        max_level: int = 2,
+        kpt_conf: float = 0.5,
+        chest_grid: int = 3,
+        history: int = 150,
+    ):
+        self.win_size = (int(win_size), int(win_size))
+        self.max_level = int(max_level)
+        self.kpt_conf = float(kpt_conf)
+        self.history = int(history)
+
+        # Lưới điểm ngực trong toạ độ thân: u dọc vai (0 = vai trái, 1 = vai phải),
+        # v từ vai xuống hông (0.15-0.45: nửa trên thân)
+        u, v = np.meshgrid(np.linspace(0.25, 0.75, chest_grid), np.linspace(0.15, 0.45, chest_grid))
+        self._chest_uv = np.stack([u.ravel(), v.ravel()], axis=1)
+
+        self.criteria = (cv2.TERM_CRITERIA_EPS | cv2.TERM_CRITERIA_COUNT, 20, 0.03)
+
+        # Gray cache theo frame object: gray của current = gray của prev ở frame sau
+        self._grays = []
+
+        # Keypoints của mọi track ở frame _seed_frame (seed LK của frame kế tiếp)
+        self._seeds: Dict[int, np.ndarray] = {}
+        self._seed_frame = None
+
+        # Tín hiệu ngực tích luỹ theo track
+        self.chest_history: Dict[int, deque] = {}
+
+        # Stats
+        self.lk_calls = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'KeypointFlow':
+        flow_config = config.get('detection', {}).get('keypoint_flow', {})
+        return cls(
+            win_size=flow_config.get('win_size', 11),
+            max_level=flow_config.get('max_level', 2),
+            kpt_conf=flow_config.get('kpt_conf', 0.5),
+            chest_grid=flow_config.get('chest_grid', 3),
+            history=flow_config.get('history', 150),
+        )
+
+    def _gray(self, frame: np.ndarray) -> np.ndarray:
+        """Gray của frame (cache 2 frame gần nhất)"""
+        for cached_frame, gray in self._grays:
+            if cached_frame is frame:
+                return gray
+
+        gray = cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY) if frame.ndim == 3 else frame
+        self._grays.append((frame, gray))
+        if len(self._grays) > 2:
+            self._grays.pop(0)
+        return gray
+
+    def _seed_points(self, keypoints: np.ndarray):
+        """
+        Điểm khởi tạo của N người, layout cố định (N, 17 + C): 17 keypoints rồi C điểm ngực
+        Returns: (points (N, P, 2), valid (N, P), torso_axis (N, 2))
+        Vùng ngực cần đủ 2 vai + 2 hông
+        """
+        n = len(keypoints)
+        conf_ok = keypoints[:, :, 2] >= self.kpt_conf
+
+        ls, rs = keypoints[:, 5, None, :2], keypoints[:, 6, None, :2]
+        lh, rh = keypoints[:, 11, None, :2], keypoints[:, 12, None, :2]
+        u, v = self._chest_uv[None, :, :1], self._chest_uv[None, :, 1:]
+        top = ls + u * (rs - ls)
+        bottom = lh + u * (rh - lh)
+        chest = top + v * (bottom - top)
+        chest_ok = conf_ok[:, [5, 6, 11, 12]].all(axis=1)
+
+        points = np.concatenate([keypoints[:, :, :2], chest], axis=1)
+        valid = np.concatenate([conf_ok, np.repeat(chest_ok[:, None], len(self._chest_uv), axis=1)], axis=1)
+        torso_axis = (lh + rh)[:, 0] / 2.0 - (ls + rs)[:, 0] / 2.0
+        return points, valid, torso_axis.reshape(n, 2)
+
+    def measure(
+        self,
+        prev_frame: np.ndarray,
+        curr_frame: np.ndarray,
+        tracks: Dict
+    ) -> Dict[int, Dict]:
+        """
+        LK flow prev → curr cho mọi track có keypoints ở cả 2 frame
+        Args:
+            tracks: {track_id: PersonTrack} (dùng last_keypoints, last_bbox)
+        """
+        # Seed chỉ hợp lệ nếu được lưu ở đúng prev_frame (bỏ qua frame → không đo)
+        seeds = self._seeds if self._seed_frame is prev_frame else {}
+        self._seeds = {
+            track_id: track.last_keypoints for track_id, track in tracks.items()
+            if getattr(track, 'last_keypoints', None) is not None
+        }
+        self._seed_frame = curr_frame
+
+        if prev_frame is None or curr_frame is None or prev_frame.shape != curr_frame.shape:
+            return {}
+
+        track_ids, heights, keypoints = [], [], []
+        for track_id in self._seeds:
+            if track_id in seeds:
+                track_ids.append(track_id)
+                heights.append(tracks[track_id].last_bbox[3])
+                keypoints.append(seeds[track_id])
+        if not track_ids:
+            return {}
+
+        points, valid, torso_axis = self._seed_points(np.stack(keypoints))
+        flow = np.zeros(points.shape, dtype=np.float32)
+        ok = np.zeros(valid.shape, dtype=bool)
+
+        rows = np.flatnonzero(valid.any(axis=1))
+        if len(rows) > 0:
+            p0 = points[valid].astype(np.float32).reshape(-1, 1, 2)
+            p1, status, _ = cv2.calcOpticalFlowPyrLK(
+                self._gray(prev_frame), self._gray(curr_frame), p0, None,
+                winSize=self.win_size, maxLevel=self.max_level, criteria=self.criteria
+            )
+            self.lk_calls += 1
+
+            flow[valid] = (p1 - p0).reshape(-1, 2)
+            ok[valid] = status.ravel() == 1
+
+        n_kpts = keypoints[0].shape[0]
+        magnitude = np.hypot(flow[:, :n_kpts, 0], flow[:, :n_kpts, 1])
+        kpt_ok = ok[:, :n_kpts]
+        height = np.maximum(np.asarray(heights, dtype=np.float64), 1.0)
+
+        # Per-limb: median độ dời các keypoint bám được / chiều cao người
+        limbs = {
+            limb: _masked_median(magnitude[:, indices], kpt_ok[:, indices]) / height
+            for limb, indices in LIMBS.items()
+        }
+        limb_max = np.max(np.stack(list(limbs.values())), axis=0)
+
+        # Ngực: độ dời theo pháp tuyến thân, trừ trôi chung của thân (vai + hông)
+        chest_flow, chest_ok = flow[:, n_kpts:], ok[:, n_kpts:]
+        chest_shift = np.stack([_masked_median(chest_flow[:, :, k], chest_ok) for k in (0, 1)], axis=1)
+        torso = [5, 6, 11, 12]
+        torso_ok = kpt_ok[:, torso]
+        torso_shift = np.stack([_masked_median(flow[:, torso, k], torso_ok) for k in (0, 1)], axis=1)
+
+        torso_len = np.maximum(np.hypot(torso_axis[:, 0], torso_axis[:, 1]), 1.0)
+        normal = np.stack([-torso_axis[:, 1], torso_axis[:, 0]], axis=1) / torso_len[:, None]
+        chest = np.einsum('ij,ij->i', chest_shift - torso_shift, normal) / torso_len
+        has_chest = chest_ok.any(axis=1)
+
+        points_ok = ok.sum(axis=1)
+        results = {}
+        for row in rows:
+            track_id = track_ids[row]
+            chest_value = None
+            if has_chest[row]:
+                chest_value = float(chest[row])
+                self._append_chest(track_id, chest_value)
+
+            results[track_id] = {
+                'limbs': {limb: float(values[row]) for limb, values in limbs.items()},
+                'limb_max': float(limb_max[row]),
+                'chest': chest_value,
+                'points': int(points_ok[row]),
+            }
+
+        return results
+
+    def _append_chest(self, track_id: int, chest: float):
+        history = self.chest_history.get(track_id)
+        if history is None:
+            history = self.chest_history[track_id] = deque(maxlen=self.history)
+
+        # Tích luỹ độ dời → vị trí ngực (tương đối)
+        position = history[-1] + chest if history else chest
+        history.append(position)
+
+    def chest_micro_motion(self, track_id: int, min_samples: int = 30) -> Optional[float]:
+        """
+        Độ dao động của ngực (std sau khi bỏ trend tuyến tính, đơn vị chiều dài thân)
+        None nếu chưa đủ mẫu
+        """
+        history = self.chest_history.get(track_id)
+        if history is None or len(history) < min_samples:
+            return None
+
+        signal = np.asarray(history)
+        t = np.arange(len(signal))
+        trend = np.polyval(np.polyfit(t, signal, 1), t)
+        return float(np.std(signal - trend))
+
+    def reset_track(self, track_id: int):
+        self.chest_history.pop(track_id, None)
@@ -0,0 +1,180 @@
+"""
+Frame difference + integral images
+Grayscale diff của (prev, current) tính 1 lần / frame, dùng chung cho mọi track:
+- integral image của |diff|       → mean motion trong bbox: O(1)
+- integral image của diff > thr   → % pixel chuyển động trong bbox: O(1)
+Nhiều track tốn gần như bằng 1 track
+Ít track, bbox nhỏ → tính thẳng trên ROI (rẻ hơn dựng integral cho cả frame)
+"""
+from typing import Optional, Tuple
+
+import cv2
+import numpy as np
+
+
+class FrameDiff:
+    """
+    Cache theo cặp frame object (prev, current): gọi lại với cùng cặp không tính lại
+    Gray của current được giữ lại làm prev cho frame sau → 1 cvtColor / frame
+    - Tổng diện tích bbox đã hỏi trong frame < roi_area_ratio * frame → tính trên ROI
+    - Vượt ngưỡng → dựng diff + integral cả frame, các bbox sau là O(1)
+    downscale_width > 0: luôn dùng diff trên frame thu nhỏ (nhanh hơn, xấp xỉ)
+    """
+
+    def __init__(self, downscale_width: int = 0, threshold: int = 25, roi_area_ratio: float = 0.25):
+        self.downscale_width = int(downscale_width)
+        self.threshold = int(threshold)
+        self.roi_area_ratio = float(roi_area_ratio)
+
+        self._prev = None
+        self._curr = None
+        self._valid = False
+        self._roi_area = 0
+
+        # Full-frame diff + integral (lazy theo loại) của cặp hiện tại
+        self._diff_ready = False
+        self._sums = {}
+        self._gray_frame = None
+        self._gray = None
+        self.scale = 1.0
+
+        # Buffers tái sử dụng (cấp phát lại khi kích thước frame đổi)
+        self._diff = None
+        self._mask = None
+        self._diff_sum = None
+        self._mask_sum = None
+
+        # Stats
+        self.roi_lookups = 0
+        self.integral_frames = 0
+
+    @classmethod
+    def from_config(cls, config: dict) -> 'FrameDiff':
+        motion_config = config.get('detection', {}).get('motion_energy', {})
+        return cls(
+            downscale_width=motion_config.get('downscale_width', 0),
+            threshold=motion_config.get('diff_threshold', 25),
+            roi_area_ratio=motion_config.get('roi_area_ratio', 0.25),
+        )
+
+    def mean_diff(self, prev_frame: np.ndarray, curr_frame: np.ndarray,
+                  bbox: Tuple[int, int, int, int]) -> float:
+        """Mean |curr - prev| (gray, 0-255) trong bbox (x, y, w, h)"""
+        result = self._box_sum(prev_frame, curr_frame, bbox, moving=False)
+        return result[0] / result[1] if result is not None else 0.0
+
+    def moving_percent(self, prev_frame: np.ndarray, curr_frame: np.ndarray,
+                       bbox: Tuple[int, int, int, int]) -> float:
+        """% pixel có |diff| > threshold trong bbox (x, y, w, h)"""
+        result = self._box_sum(prev_frame, curr_frame, bbox, moving=True)
+        return result[0] / result[1] * 100 if result is not None else 0.0
+
+    def _box_sum(self, prev_frame, curr_frame, bbox, moving: bool) -> Optional[Tuple[float, int]]:
+        """(sum, pixel count) trong bbox, None nếu không tính được"""
+        if prev_frame is None or curr_frame is None:
+            return None
+
+        if prev_frame is not self._prev or curr_frame is not self._curr:
+            self._prev, self._curr = prev_frame, curr_frame
+            self._valid = prev_frame.shape == curr_frame.shape
+            self._roi_area = 0
+            self._diff_ready = False
+            self._sums = {}
+
+        if not self._valid:
+            return None
+
+        H, W = curr_frame.shape[:2]
+        x, y, w, h = bbox
+        x1, y1 = min(max(x, 0), W), min(max(y, 0), H)
+        x2, y2 = min(max(x + w, 0), W), min(max(y + h, 0), H)
+        area = (x2 - x1) * (y2 - y1)
+        if area <= 0:
+            return None
+
+        # Ít pixel → tính thẳng trên ROI
+        if (
+            not self._diff_ready
+            and self.downscale_width <= 0
+            and self._roi_area + area <= self.roi_area_ratio * H * W
+        ):
+            self._roi_area += area
+            self.roi_lookups += 1
+            return self._roi_sum(prev_frame[y1:y2, x1:x2], curr_frame[y1:y2, x1:x2], moving), area
+
+        S = self._integral(moving)
+        if self.scale != 1.0:
+            s = self.scale
+            sx1, sy1 = int(x1 * s), int(y1 * s)
+            sx2 = min(max(int(round(x2 * s)), sx1 + 1), S.shape[1] - 1)
+            sy2 = min(max(int(round(y2 * s)), sy1 + 1), S.shape[0] - 1)
+            area = (sx2 - sx1) * (sy2 - sy1)
+            x1, y1, x2, y2 = sx1, sy1, sx2, sy2
+
+        total = S[y2, x2] - S[y1, x2] - S[y2, x1] + S[y1, x1]
+        return float(total), area
+
+    def _roi_sum(self, roi_prev: np.ndarray, roi_curr: np.ndarray, moving: bool) -> float:
+        if roi_prev.ndim == 3:
+            roi_prev = cv2.cvtColor(roi_prev, cv2.COLOR_BGR2GRAY)
+            roi_curr = cv2.cvtColor(roi_curr, cv2.COLOR_BGR2GRAY)
+
+        diff = cv2.absdiff(roi_prev, roi_curr)
+        if moving:
+            return float(np.count_nonzero(diff > self.threshold))
+        return float(cv2.sumElems(diff)[0])
+
+    def _integral(self, moving: bool) -> np.ndarray:
+        """Integral image (lazy theo loại) của diff cả frame"""
+        S = self._sums.get(moving)
+        if S is not None:
+            return S
+
+        if not self._diff_ready:
+            self._build_diff()
+
+        if moving:
+            cv2.threshold(self._diff, self.threshold, 1, cv2.THRESH_BINARY, dst=self._mask)
+            cv2.integral(self._mask, sum=self._mask_sum, sdepth=cv2.CV_32S)
+            S = self._mask_sum
+        else:
+            sdepth = cv2.CV_32S if self._diff_sum.dtype == np.int32 else cv2.CV_64F
+            cv2.integral(self._diff, sum=self._diff_sum, sdepth=sdepth)
+            S = self._diff_sum
+
+        self._sums[moving] = S
+        return S
+
+    def _build_diff(self):
+        # Gray của prev: dùng lại gray của current ở frame trước nếu có
+        prev_gray = self._gray if self._prev is self._gray_frame else self._to_gray(self._prev)
+        curr_gray = self._to_gray(self._curr)
+        self._gray_frame, self._gray = self._curr, curr_gray
+
+        if self._diff is None or self._diff.shape != curr_gray.shape:
+            H, W = curr_gray.shape
+            self._diff = np.empty((H, W), dtype=np.uint8)
+            self._mask = np.empty((H, W), dtype=np.uint8)
+            # int32 đủ cho tổng 255 * H * W tới ~8M pixel
+            depth = np.int32 if 255 * H * W < 2 ** 31 else np.float64
+            self._diff_sum = np.empty((H + 1, W + 1), dtype=depth)
+            self._mask_sum = np.empty((H + 1, W + 1), dtype=np.int32)
+
+        cv2.absdiff(prev_gray, curr_gray, dst=self._diff)
+        self._diff_ready = True
+        self.integral_frames += 1
+
+    def _to_gray(self, frame: np.ndarray) -> np.ndarray:
+        h, w = frame.shape[:2]
+        if self.downscale_width > 0 and w > self.downscale_width:
+            self.scale = self.downscale_width / w
+            frame = cv2.resize(
+                frame, (self.downscale_width, max(1, int(round(h * self.scale)))),
+                interpolation=cv2.INTER_AREA
+            )
+        else:
+            self.scale = 1.0
+
+        if frame.ndim == 3:
+            return cv2.cvtColor(frame, cv2.COLOR_BGR2GRAY)
+        return frame
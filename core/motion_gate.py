@@ -0,0 +1,126 @@
+"""
+Motion Gate
+MOG2 background model trên frame thu nhỏ đứng trước PoseDetector.detect_persons:
+cảnh tĩnh + mọi người đều STANDING → bỏ qua YOLO, dùng lại detections cũ
+(phòng trống ban đêm gần như không tốn CPU)
+"""
+import cv2
+import numpy as np
+from typing import Dict
+
+from core.state_machine import FallState, StateMachineManager
+from core.tracker import PersonTrack
+
+
+class MotionGate:
+    """
+    Foreground ratio (downscaled MOG2) quyết định frame nào cần pose inference
+    - ratio < fg_ratio_threshold và không ai ở state khác STANDING → skip
+    - Heartbeat: tối đa max_skip_frames frame liên tiếp bị skip
+    """
+
+    def __init__(self, config: dict):
+        self.config = config
+        gate_config = config.get('pose', {}).get('motion_gate', {})
+        bg_config = config.get('detection', {}).get('background_subtraction', {})
+
+        self.enabled = gate_config.get('enabled', False)
+        self.downscale_width = int(gate_config.get('downscale_width', 160))
+        self.fg_ratio_threshold = float(gate_config.get('fg_ratio_threshold', 0.002))
+        self.max_skip_frames = int(gate_config.get('max_skip_frames', 150))
+        self.warmup_frames = int(gate_config.get('warmup_frames', 30))
+        self.learning_rate = float(gate_config.get('learning_rate', -1))
+
+        self.bg_subtractor = cv2.createBackgroundSubtractorMOG2(
+            history=int(gate_config.get('history', bg_config.get('history', 500))),
+            varThreshold=float(gate_config.get('var_threshold', bg_config.get('var_threshold', 16))),
+            detectShadows=False
+        )
+        self.kernel = cv2.getStructuringElement(cv2.MORPH_ELLIPSE, (3, 3))
+
+        # Frame đã được đưa vào background model (update idempotent theo frame)
+        self._last_frame = None
+        self.fg_ratio = 0.0
+        self.frames_since_inference = 0
+
+        # Stats
+        self.observed_frames = 0
+        self.checked_frames = 0
+        self.gated_frames = 0
+
+    def update(self, frame: np.ndarray) -> float:
+        """
+        Đưa frame vào background model, trả về foreground ratio (0-1)
+        Gọi nhiều lần với cùng 1 frame chỉ tính 1 lần
+        """
+        if not self.enabled:
+            return 0.0
+        if frame is self._last_frame:
+            return self.fg_ratio
+
+        h, w = frame.shape[:2]
+        scale = min(1.0, self.downscale_width / max(w, 1))
+        small = cv2.resize(
+            frame, (max(1, int(w * scale)), max(1, int(h * scale))),
+            interpolation=cv2.INTER_AREA
+        )
+        if small.ndim == 3:
+            small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+
+        fg_mask = self.bg_subtractor.apply(small, learningRate=self.learning_rate)
+        fg_mask = cv2.morphologyEx(fg_mask, cv2.MORPH_OPEN, self.kernel)
+
+        self.fg_ratio = float(np.count_nonzero(fg_mask)) / fg_mask.size
+        self.observed_frames += 1
+        self._last_frame = frame
+        return self.fg_ratio
+
+    def allows_skip(
+        self,
+        frame: np.ndarray,
+        tracks: Dict[int, PersonTrack],
+        state_manager: StateMachineManager
+    ) -> bool:
+        """True nếu frame này có thể dùng lại detections cũ thay vì chạy YOLO"""
+        if not self.enabled:
+            return False
+
+        fg_ratio = self.update(frame)
+        self.checked_frames += 1
+
+        if (
+            self.observed_frames <= self.warmup_frames
+            or fg_ratio >= self.fg_ratio_threshold
+            or self.frames_since_inference >= self.max_skip_frames
+            or not self._all_standing(tracks, state_manager)
+        ):
+            self.frames_since_inference = 0
+            return False
+
+        self.frames_since_inference += 1
+        self.gated_frames += 1
+        return True
+
+    def _all_standing(
+        self,
+        tracks: Dict[int, PersonTrack],
+        state_manager: StateMachineManager
+    ) -> bool:
+        for track_id in tracks:
+            state = state_manager.get_state(track_id)
+            if state is not None and state != FallState.STANDING:
+                return False
+        return True
+
+    def get_stats(self) -> dict:
+        """Gate thresholds + skip statistics"""
+        return {
+            'enabled': self.enabled,
+            'fg_ratio': self.fg_ratio,
+            'fg_ratio_threshold': self.fg_ratio_threshold,
+            'max_skip_frames': self.max_skip_frames,
+            'downscale_width': self.downscale_width,
+            'checked_frames': self.checked_frames,
+            'gated_frames': self.gated_frames,
+            'gate_ratio': self.gated_frames / max(self.checked_frames, 1),
+        }
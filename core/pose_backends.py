@@ -0,0 +1,442 @@
+"""
+Pose inference backends
+pose.backend chọn runtime cho YOLOv8-Pose trên CPU:
+- ultralytics  : YOLO(model_path) (PyTorch eager, mặc định)
+- onnxruntime  : model export ONNX, tuỳ chọn INT8 (dynamic quantization)
+- openvino     : OpenVINO CPU (đọc .onnx hoặc .xml)
+- torchscript  : torch.jit.load (.torchscript)
+Letterbox + NMS viết bằng NumPy/cv2 → onnxruntime/openvino không import torch
+"""
+import os
+from abc import ABC, abstractmethod
+from typing import List, Tuple
+
+import cv2
+import numpy as np
+
+
+NUM_KEYPOINTS = 17
+
+
+def _empty_prediction() -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+    return (
+        np.zeros((0, NUM_KEYPOINTS, 3), dtype=np.float32),
+        np.zeros((0, 4), dtype=np.float32),
+        np.zeros((0,), dtype=np.float32),
+    )
+
+
+def nms_boxes(boxes: np.ndarray, scores: np.ndarray, iou_threshold: float) -> np.ndarray:
+    """
+    Greedy NMS (NumPy)
+    boxes: (N, 4) xyxy, scores: (N,)
+    Returns: indices giữ lại, theo score giảm dần
+    """
+    if len(boxes) == 0:
+        return np.zeros((0,), dtype=np.int64)
+
+    x1, y1, x2, y2 = boxes[:, 0], boxes[:, 1], boxes[:, 2], boxes[:, 3]
+    areas = np.maximum(x2 - x1, 0) * np.maximum(y2 - y1, 0)
+    order = np.argsort(-scores)
+
+    keep = []
+    while order.size > 0:
+        i = order[0]
+        keep.append(i)
+        if order.size == 1:
+            break
+
+        rest = order[1:]
+        inter_w = np.maximum(0.0, np.minimum(x2[i], x2[rest]) - np.maximum(x1[i], x1[rest]))
+        inter_h = np.maximum(0.0, np.minimum(y2[i], y2[rest]) - np.maximum(y1[i], y1[rest]))
+        inter = inter_w * inter_h
+        iou = inter / np.maximum(areas[i] + areas[rest] - inter, 1e-9)
+        order = rest[iou <= iou_threshold]
+
+    return np.array(keep, dtype=np.int64)
+
+
+class LetterboxBuffers:
+    """
+    Letterbox + normalize vào buffer cấp phát sẵn (tái sử dụng mỗi frame)
+    - cv2.resize(dst=...) ghi thẳng vào buffer uint8
+    - BGR → RGB, HWC → CHW, /255 ghi thẳng vào blob float32 (np.multiply(out=...))
+    - Padding chỉ fill lại khi hình học (kích thước frame / input) thay đổi
+    Buffer chỉ lớn lên, không co lại → steady state không cấp phát mới
+    Blob trả về là view của buffer: hợp lệ đến lần prepare() tiếp theo
+
+    auto=True: pad tới bội số stride thay vì vuông imgsz x imgsz (như ultralytics
+    LetterBox(auto=True)), chỉ khi mọi frame trong batch cùng kích thước
+    """
+
+    def __init__(self, stride: int = 32, color: int = 114):
+        self.stride = stride
+        self.color = color
+        self.pad_value = color / 255.0
+        self.scale = np.float32(1.0 / 255.0)
+
+        self._blob = np.empty(0, dtype=np.float32)
+        self._resized = np.empty(0, dtype=np.uint8)
+        self._geometry = []  # Hình học của từng slot trong blob lần trước
+        self._batch_shape = None  # (N, out_h, out_w) lần trước: khác → vị trí slot trong buffer đổi
+
+    def prepare(self, frames: List[np.ndarray], imgsz: int, auto: bool = False) -> Tuple[np.ndarray, list]:
+        """
+        BGR frames → NCHW float32 RGB [0, 1] (view của buffer)
+        Returns: (blob, [(scale, (pad_x, pad_y)), ...])
+        """
+        shapes = [frame.shape[:2] for frame in frames]
+        auto = auto and all(shape == shapes[0] for shape in shapes)
+
+        layouts = [self._layout(h, w, imgsz, auto) for h, w in shapes]
+        out_h, out_w = layouts[0][0]
+        if not auto:
+            out_h, out_w = imgsz, imgsz
+
+        blob = self._view('_blob', (len(frames), 3, out_h, out_w))
+        if self._batch_shape != (len(frames), out_h, out_w):
+            # Layout batch đổi (crop ↔ full frame, số camera) → slot i nằm ở chỗ khác trong
+            # flat buffer, pixel cũ ở đó không phải padding → fill lại mọi slot
+            self._batch_shape = (len(frames), out_h, out_w)
+            self._geometry = [None] * len(frames)
+
+        metas = []
+        for i, (frame, (_, (new_h, new_w), scale, (left, top))) in enumerate(zip(frames, layouts)):
+            geometry = (out_h, out_w, new_h, new_w, top, left)
+            if self._geometry[i] != geometry:
+                blob[i].fill(self.pad_value)
+                self._geometry[i] = geometry
+
+            if (new_h, new_w) != frame.shape[:2]:
+                resized = self._view('_resized', (new_h, new_w, 3))
+                cv2.resize(frame, (new_w, new_h), dst=resized, interpolation=cv2.INTER_LINEAR)
+            else:
+                resized = frame
+
+            for channel in range(3):
+                np.multiply(
+                    resized[:, :, 2 - channel], self.scale,
+                    out=blob[i, channel, top:top + new_h, left:left + new_w],
+                    dtype=np.float32, casting='unsafe'
+                )
+
+            metas.append((scale, (left, top)))
+
+        return blob, metas
+
+    def _layout(self, h: int, w: int, imgsz: int, auto: bool):
+        """(output shape, resized shape, scale, (left, top)) giống ultralytics LetterBox"""
+        scale = min(imgsz / h, imgsz / w)
+        new_w, new_h = int(round(w * scale)), int(round(h * scale))
+
+        pad_w, pad_h = imgsz - new_w, imgsz - new_h
+        if auto:
+            pad_w, pad_h = pad_w % self.stride, pad_h % self.stride
+
+        left, top = int(round(pad_w / 2 - 0.1)), int(round(pad_h / 2 - 0.1))
+        return (new_h + pad_h, new_w + pad_w), (new_h, new_w), scale, (left, top)
+
+    def _view(self, name: str, shape: tuple) -> np.ndarray:
+        """Contiguous view shape từ flat buffer, grow khi không đủ"""
+        size = int(np.prod(shape))
+        buffer = getattr(self, name)
+        if buffer.size < size:
+            buffer = np.empty(size, dtype=buffer.dtype)
+            setattr(self, name, buffer)
+            if name == '_blob':
+                # Buffer mới → padding của mọi slot phải fill lại
+                self._geometry = [None] * len(self._geometry)
+        return buffer[:size].reshape(shape)
+
+
+def scale_to_frame(
+    kpts: np.ndarray,
+    boxes: np.ndarray,
+    meta: tuple,
+    frame_shape: tuple
+):
+    """Toạ độ letterbox → toạ độ frame gốc (in-place)"""
+    scale, (pad_x, pad_y) = meta
+    height, width = frame_shape[:2]
+
+    boxes[:, [0, 2]] = np.clip((boxes[:, [0, 2]] - pad_x) / scale, 0, width)
+    boxes[:, [1, 3]] = np.clip((boxes[:, [1, 3]] - pad_y) / scale, 0, height)
+    kpts[:, :, 0] = np.clip((kpts[:, :, 0] - pad_x) / scale, 0, width)
+    kpts[:, :, 1] = np.clip((kpts[:, :, 1] - pad_y) / scale, 0, height)
+
+
+def postprocess(
+    output: np.ndarray,
+    metas: list,
+    frame_shapes: list,
+    conf: float,
+    iou: float,
+    max_det: int = 300
+) -> List[Tuple[np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Raw YOLOv8-Pose output (B, 56, A): [cx, cy, w, h, score, 17 x (x, y, conf)]
+    → List[(kpts (N,17,3), boxes (N,4) xyxy, confs (N,))] theo toạ độ frame gốc
+    """
+    outputs = []
+
+    for i in range(output.shape[0]):
+        pred = output[i].T  # (A, 56)
+        scores = pred[:, 4]
+        pred = pred[scores > conf]
+
+        if len(pred) == 0:
+            outputs.append(_empty_prediction())
+            continue
+
+        boxes = np.empty((len(pred), 4), dtype=np.float32)
+        boxes[:, 0] = pred[:, 0] - pred[:, 2] / 2
+        boxes[:, 1] = pred[:, 1] - pred[:, 3] / 2
+        boxes[:, 2] = pred[:, 0] + pred[:, 2] / 2
+        boxes[:, 3] = pred[:, 1] + pred[:, 3] / 2
+        confs = pred[:, 4].astype(np.float32)
+        kpts = pred[:, 5:5 + NUM_KEYPOINTS * 3].reshape(-1, NUM_KEYPOINTS, 3).astype(np.float32)
+
+        keep = nms_boxes(boxes, confs, iou)[:max_det]
+        boxes, confs, kpts = boxes[keep], confs[keep], kpts[keep]
+
+        scale_to_frame(kpts, boxes, metas[i], frame_shapes[i])
+        outputs.append((kpts, boxes, confs))
+
+    return outputs
+
+
+class UltralyticsBackend:
+    """
+    YOLO(model_path) - PyTorch eager (cần ultralytics + torch)
+    Model ultralytics thật: letterbox vào buffer sẵn có rồi đưa tensor BCHW vào predict
+    (ultralytics bỏ qua bước letterbox / normalize của nó với tensor input)
+    """
+
+    name = 'ultralytics'
+
+    def __init__(self, model_path: str = None, model=None):
+        if model is None:
+            from ultralytics import YOLO
+            print(f"[POSE] Loading YOLOv8-Pose model: {model_path}")
+            model = YOLO(model_path)
+        self.model = model
+
+        # Model giả (replay/benchmark) → giữ input numpy như cũ
+        self.torch = None
+        self.buffers = None
+        if type(model).__module__.startswith('ultralytics'):
+            import torch
+            self.torch = torch
+            self.buffers = LetterboxBuffers(stride=int(max(getattr(model.model, 'stride', [32]))))
+
+    def predict_pose(self, frames: List[np.ndarray], imgsz: int, conf: float, iou: float) -> list:
+        if self.buffers is not None:
+            if len(frames) == 0:
+                return []
+            blob, metas = self.buffers.prepare(frames, imgsz, auto=True)
+            source = self.torch.from_numpy(blob)
+        else:
+            source, metas = frames, None
+
+        results = self.model.predict(
+            source,
+            conf=conf,
+            iou=iou,
+            imgsz=imgsz,
+            verbose=False
+        )
+
+        outputs = []
+        for i, result in enumerate(results):
+            # Không có keypoints → mảng rỗng
+            if result.keypoints is None or len(result.keypoints) == 0:
+                outputs.append(_empty_prediction())
+                continue
+
+            kpts = result.keypoints.data.cpu().numpy()  # (N, 17, 3) => x, y, conf
+            boxes = result.boxes.xyxy.cpu().numpy()     # (N, 4)
+            confs = result.boxes.conf.cpu().numpy()     # (N,)
+
+            if metas is not None:
+                scale_to_frame(kpts, boxes, metas[i], frames[i].shape)
+            outputs.append((kpts, boxes, confs))
+
+        return outputs
+
+
+class _RawOutputBackend(ABC):
+    """
+    Backend trả về raw tensor (B, 56, A): dùng chung letterbox/NMS NumPy
+    Model export với input tĩnh → dùng imgsz của model, batch 1 → chạy từng frame
+    Subclass phải implement _infer (thiếu → lỗi ngay khi khởi tạo)
+    """
+
+    name = 'raw'
+    static_imgsz = None
+    static_batch = None
+    buffers = None
+
+    def predict_pose(self, frames: List[np.ndarray], imgsz: int, conf: float, iou: float) -> list:
+        if len(frames) == 0:
+            return []
+
+        if self.buffers is None:
+            self.buffers = LetterboxBuffers()
+
+        # Input động → pad tới bội số 32 (ít pixel hơn với frame 4:3 / 16:9)
+        blob, metas = self.buffers.prepare(
+            frames, self.static_imgsz or imgsz, auto=self.static_imgsz is None
+        )
+        shapes = [frame.shape for frame in frames]
+
+        if self.static_batch is None or self.static_batch == len(frames):
+            output = self._infer(blob)
+        else:
+            output = np.concatenate([
+                self._infer(blob[i:i + 1]) for i in range(len(frames))
+            ])
+
+        return postprocess(output, metas, shapes, conf, iou)
+
+    @abstractmethod
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        """(B, 3, H, W) float32 → raw output (B, 56, A)"""
+
+    @staticmethod
+    def _static_dim(value):
+        return value if isinstance(value, int) and value > 0 else None
+
+
+class OnnxRuntimeBackend(_RawOutputBackend):
+    """ONNX Runtime CPUExecutionProvider, tuỳ chọn INT8 dynamic quantization"""
+
+    name = 'onnxruntime'
+
+    def __init__(self, model_path: str, num_threads: int = 0, int8: bool = False,
+                 int8_model_path: str = None):
+        import onnxruntime as ort
+
+        if int8:
+            model_path = self._quantized_model(model_path, int8_model_path)
+
+        options = ort.SessionOptions()
+        options.graph_optimization_level = ort.GraphOptimizationLevel.ORT_ENABLE_ALL
+        if num_threads > 0:
+            options.intra_op_num_threads = num_threads
+
+        print(f"[POSE] Loading ONNX model (onnxruntime CPU): {model_path}")
+        self.session = ort.InferenceSession(
+            model_path, sess_options=options, providers=['CPUExecutionProvider']
+        )
+
+        model_input = self.session.get_inputs()[0]
+        self.input_name = model_input.name
+        self.static_batch = self._static_dim(model_input.shape[0])
+        self.static_imgsz = self._static_dim(model_input.shape[2])
+
+    def _quantized_model(self, model_path: str, int8_model_path: str = None) -> str:
+        """INT8 weights (dynamic quantization), tạo 1 lần rồi cache cạnh model gốc"""
+        if int8_model_path is None:
+            int8_model_path = os.path.splitext(model_path)[0] + '.int8.onnx'
+
+        if not os.path.exists(int8_model_path):
+            from onnxruntime.quantization import quantize_dynamic, QuantType
+            print(f"[POSE] Quantizing {model_path} → {int8_model_path} (INT8)")
+            quantize_dynamic(model_path, int8_model_path, weight_type=QuantType.QUInt8)
+
+        return int8_model_path
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        return self.session.run(None, {self.input_name: blob})[0]
+
+
+class OpenVinoBackend(_RawOutputBackend):
+    """OpenVINO CPU plugin (.xml IR hoặc .onnx)"""
+
+    name = 'openvino'
+
+    def __init__(self, model_path: str, num_threads: int = 0):
+        import openvino as ov
+
+        core = ov.Core()
+        config = {'PERFORMANCE_HINT': 'LATENCY'}
+        if num_threads > 0:
+            config['INFERENCE_NUM_THREADS'] = num_threads
+
+        print(f"[POSE] Loading OpenVINO model (CPU): {model_path}")
+        model = core.read_model(model_path)
+        self.compiled = core.compile_model(model, 'CPU', config)
+        self.output = self.compiled.output(0)
+
+        shape = self.compiled.input(0).get_partial_shape()
+        self.static_batch = shape[0].get_length() if shape[0].is_static else None
+        self.static_imgsz = shape[2].get_length() if shape[2].is_static else None
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        return self.compiled([blob])[self.output]
+
+
+class TorchScriptBackend(_RawOutputBackend):
+    """torch.jit.load (model export format=torchscript)"""
+
+    name = 'torchscript'
+
+    def __init__(self, model_path: str, num_threads: int = 0, imgsz: int = None):
+        import torch
+
+        if num_threads > 0:
+            torch.set_num_threads(num_threads)
+
+        print(f"[POSE] Loading TorchScript model: {model_path}")
+        self.torch = torch
+        self.model = torch.jit.load(model_path, map_location='cpu').eval()
+        # TorchScript export của ultralytics có input tĩnh = imgsz lúc export
+        self.static_imgsz = imgsz
+        self.static_batch = 1
+
+    def _infer(self, blob: np.ndarray) -> np.ndarray:
+        with self.torch.inference_mode():
+            output = self.model(self.torch.from_numpy(blob))
+        if isinstance(output, (list, tuple)):
+            output = output[0]
+        return output.numpy()
+
+
+BACKENDS = ('ultralytics', 'onnxruntime', 'openvino', 'torchscript')
+
+
+def create_pose_backend(config: dict):
+    """Backend theo pose.backend (mặc định ultralytics)"""
+    pose_cfg = config.get('pose', {})
+    backend = pose_cfg.get('backend', 'ultralytics')
+    num_threads = int(pose_cfg.get('num_threads', 0))
+    model_path = pose_cfg.get('model_path', 'yolov8n-pose.pt')
+
+    if backend == 'ultralytics':
+        return UltralyticsBackend(model_path)
+
+    if backend == 'onnxruntime':
+        onnx_cfg = pose_cfg.get('onnx', {})
+        return OnnxRuntimeBackend(
+            onnx_cfg.get('model_path', os.path.splitext(model_path)[0] + '.onnx'),
+            num_threads=num_threads,
+            int8=onnx_cfg.get('int8', False),
+            int8_model_path=onnx_cfg.get('int8_model_path'),
+        )
+
+    if backend == 'openvino':
+        openvino_cfg = pose_cfg.get('openvino', {})
+        return OpenVinoBackend(
+            openvino_cfg.get('model_path', os.path.splitext(model_path)[0] + '.onnx'),
+            num_threads=num_threads,
+        )
+
+    if backend == 'torchscript':
+        torchscript_cfg = pose_cfg.get('torchscript', {})
+        return TorchScriptBackend(
+            torchscript_cfg.get('model_path', os.path.splitext(model_path)[0] + '.torchscript'),
+            num_threads=num_threads,
+            imgsz=int(torchscript_cfg.get('imgsz', pose_cfg.get('imgsz', 640))),
+        )
+
+    raise ValueError(f"Unknown pose.backend '{backend}' (expected one of {BACKENDS})")
@@ -3,10 +3,14 @@ Pose-based Person Detector using YOLOv8-Pose
 Phát hiện người qua keypoints (17 điểm COCO) thay vì contour
 """
 import time
+from collections.abc import Mapping
 import cv2
 import numpy as np
-from typing import List, Dict
-from ultralytics import YOLO
+from typing import List, Dict, Tuple
+
+from core.floor_map import FloorMap
+from core.motion_energy import FrameDiff
+from core.pose_backends import UltralyticsBackend, create_pose_backend, nms_boxes
 
 
 # COCO-17 skeleton edges (để vẽ xương người)
@@ -32,20 +36,173 @@ COCO_EDGES = [
 ]
 
 
+# Cột của bảng pose features (N, F) - 1 hàng / người
+FEATURE_COLUMNS = (
+    "bbox_x", "bbox_y", "bbox_w", "bbox_h",
+    "shoulder_x", "shoulder_y", "hip_x", "hip_y",
+    "torso_angle", "aspect_ratio", "centroid_y_ratio", "floor_dist_norm",
+    "shoulder_ok", "hip_ok", "valid_kpts",
+)
+(BBOX_X, BBOX_Y, BBOX_W, BBOX_H,
+ SHOULDER_X, SHOULDER_Y, HIP_X, HIP_Y,
+ TORSO_ANGLE, ASPECT_RATIO, CENTROID_Y_RATIO, FLOOR_DIST_NORM,
+ SHOULDER_OK, HIP_OK, VALID_KPTS) = range(len(FEATURE_COLUMNS))
+
+
+def pose_feature_table(
+    kpts: np.ndarray,
+    kpt_conf: float,
+    frame_shape: Tuple[int, ...],
+    floor_map: FloorMap = None
+) -> np.ndarray:
+    """
+    (N, 17, 3) keypoints → (N, F) features trong 1 lần tính NumPy (không loop theo người)
+    bbox từ keypoints đủ conf, mid-shoulder, mid-hip (fallback tâm bbox),
+    torso angle (0° đứng thẳng, 90° nằm ngang), floor distance (floor map), validity masks
+    """
+    H, W = frame_shape[:2]
+    table = np.zeros((len(kpts), len(FEATURE_COLUMNS)), dtype=np.float64)
+    if len(kpts) == 0:
+        return table
+    
+    xs, ys, cs = kpts[:, :, 0], kpts[:, :, 1], kpts[:, :, 2]
+    valid = cs >= kpt_conf
+    table[:, VALID_KPTS] = valid.sum(axis=1)
+    
+    # Bbox từ keypoints (thay vì dùng bbox của YOLO), clamp theo frame
+    x1 = np.where(valid, xs, np.inf).min(axis=1)
+    y1 = np.where(valid, ys, np.inf).min(axis=1)
+    x2 = np.where(valid, xs, -np.inf).max(axis=1)
+    y2 = np.where(valid, ys, -np.inf).max(axis=1)
+    
+    has_kpts = valid.any(axis=1)
+    x1, y1, x2, y2 = (np.where(has_kpts, v, 0.0).astype(np.int64) for v in (x1, y1, x2, y2))
+    x1, y1 = np.maximum(x1, 0), np.maximum(y1, 0)
+    x2, y2 = np.minimum(x2, W - 1), np.minimum(y2, H - 1)
+    w, h = np.maximum(x2 - x1, 1), np.maximum(y2 - y1, 1)
+    table[:, BBOX_X], table[:, BBOX_Y] = x1, y1
+    table[:, BBOX_W], table[:, BBOX_H] = w, h
+    
+    # Mid-shoulder (5, 6) và mid-hip (11, 12)
+    shoulder_ok = valid[:, 5] & valid[:, 6]
+    hip_ok = valid[:, 11] & valid[:, 12]
+    table[:, SHOULDER_OK], table[:, HIP_OK] = shoulder_ok, hip_ok
+    
+    shx = (xs[:, 5] + xs[:, 6]) / 2.0
+    shy = (ys[:, 5] + ys[:, 6]) / 2.0
+    hpx = np.where(hip_ok, (xs[:, 11] + xs[:, 12]) / 2.0, x1 + w / 2.0)
+    hpy = np.where(hip_ok, (ys[:, 11] + ys[:, 12]) / 2.0, y1 + h / 2.0)
+    table[:, SHOULDER_X], table[:, SHOULDER_Y] = shx, shy
+    table[:, HIP_X], table[:, HIP_Y] = hpx, hpy
+    
+    # ★ TORSO ANGLE: góc vector vai → hông so với trục dọc
+    angle = np.degrees(np.arctan2(np.abs(hpx - shx), np.abs(hpy - shy) + 1e-6))
+    table[:, TORSO_ANGLE] = np.where(shoulder_ok & hip_ok, angle, 0.0)
+    
+    table[:, ASPECT_RATIO] = w / np.maximum(h, 1)
+    table[:, CENTROID_Y_RATIO] = hpy / max(H, 1)
+    
+    # Floor distance: floor map tra theo cột tại vị trí hip (chưa có floor → 1.0)
+    if floor_map is not None and floor_map.ready:
+        floor = floor_map.lookup(hpx / max(W, 1))
+        table[:, FLOOR_DIST_NORM] = np.abs(floor - hpy / max(H, 1))
+    else:
+        table[:, FLOOR_DIST_NORM] = 1.0
+    
+    return table
+
+
+class PoseFeatures(Mapping):
+    """
+    Mapping (lazy) của 1 hàng trong pose feature table
+    Giữ format features cũ cho tracker / state_machine / feature_extractor:
+    giá trị chỉ được tính khi key được đọc lần đầu, sau đó là dict lookup thường
+    Không phải dict: json.dumps báo lỗi thay vì ghi "{}" → dict(features) trước khi
+    serialize (JSON / gửi qua process khác)
+    """
+    
+    __slots__ = ("row", "_values")
+    
+    KEYS = (
+        "aspect_ratio", "centroid", "angle", "torso_angle", "extent", "solidity",
+        "bbox_height", "bbox_width", "centroid_y_ratio", "floor_dist_norm",
+        "shoulder_pos", "hip_pos",
+    )
+    
+    def __init__(self, row: np.ndarray):
+        self.row = row
+        self._values = {}
+    
+    def __getitem__(self, key):
+        try:
+            return self._values[key]
+        except KeyError:
+            pass
+        
+        row = self.row
+        if key == "centroid":
+            # ★ Dùng hip làm centroid (ổn định)
+            value = (int(row[HIP_X]), int(row[HIP_Y]))
+        elif key == "torso_angle" or key == "angle":
+            value = float(row[TORSO_ANGLE])
+        elif key == "centroid_y_ratio":
+            value = float(row[CENTROID_Y_RATIO])
+        elif key == "floor_dist_norm":
+            value = float(row[FLOOR_DIST_NORM])
+        elif key == "aspect_ratio":
+            value = float(row[ASPECT_RATIO])
+        elif key == "bbox_height":
+            value = int(row[BBOX_H])
+        elif key == "bbox_width":
+            value = int(row[BBOX_W])
+        elif key == "hip_pos":
+            value = (float(row[HIP_X]), float(row[HIP_Y]))
+        elif key == "shoulder_pos":
+            value = (float(row[SHOULDER_X]), float(row[SHOULDER_Y])) if row[SHOULDER_OK] else None
+        elif key == "extent" or key == "solidity":
+            value = 0.0  # Không dùng nữa (contour features)
+        else:
+            raise KeyError(key)
+        self._values[key] = value
+        return value
+    
+    def __contains__(self, key):
+        return key in self.KEYS
+    
+    def __iter__(self):
+        return iter(self.KEYS)
+    
+    def __len__(self):
+        return len(self.KEYS)
+    
+    def __repr__(self):
+        return f"PoseFeatures({dict(self.items())!r})"
+
 class PoseDetector:
     """
     YOLOv8-Pose detector - multi-person
     Thay thế FallDetector (contour-based)
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, model=None, camera_id: str = None):
+        """
+        Args:
+            config: system config
+            model: YOLO model đã load sẵn (share giữa nhiều camera).
+                   None → tự load từ pose.model_path
+            camera_id: ID camera (floor map được lưu riêng theo camera)
+        """
         self.config = config
         pose_cfg = config.get("pose", {})
         
-        # YOLOv8-Pose model
-        model_path = pose_cfg.get("model_path", "yolov8n-pose.pt")
-        print(f"[POSE] Loading YOLOv8-Pose model: {model_path}")
-        self.model = YOLO(model_path)
+        # YOLOv8-Pose model (backend theo pose.backend)
+        if model is None:
+            # Import lazy trong backend: replay/benchmark truyền model giả, không cần ultralytics
+            model = create_pose_backend(config)
+        elif not hasattr(model, "predict_pose"):
+            # YOLO object / model giả có .predict() → bọc như ultralytics backend
+            model = UltralyticsBackend(model=model)
+        self.model = model
         
         # Thresholds
         self.conf = float(pose_cfg.get("conf", 0.25))
@@ -53,192 +210,216 @@ class PoseDetector:
         self.kpt_conf = float(pose_cfg.get("kpt_conf", 0.30))
         self.max_people = int(pose_cfg.get("max_people", 5))
         self.imgsz = int(pose_cfg.get("imgsz", 640))
+        self.crop_imgsz = int(pose_cfg.get("crop_inference", {}).get("imgsz", 320))
+        
+        # Two-stage association (ByteTrack): model chạy ở low_conf, người có conf trong
+        # [low_conf, conf) chỉ được tracker dùng để giữ track đang có (không tạo track mới)
+        low_cfg = pose_cfg.get("low_conf_tracking", {})
+        self.low_conf = self.conf
+        if low_cfg.get("enabled", False):
+            self.low_conf = min(float(low_cfg.get("low_conf", 0.1)), self.conf)
         
         # Tracking (giữ format cũ để tương thích)
         self.prev_frame = None
         self.current_frame = None
         self.frame_count = 0
         
-        # Floor estimation (tự động ước lượng "sàn nhà")
-        self.floor_y = None
-        self.floor_history = []
+        # Gray diff + integral image của (prev, current), dùng chung cho mọi track
+        self.frame_diff = FrameDiff.from_config(config)
+        
+        # Detections của lần inference gần nhất (motion gate dùng lại)
+        self.last_detections = []
+        self.last_low_detections = []  # conf trong [low_conf, conf) → tracker.update(..., low_detections)
+        
+        # Floor estimation (tự động ước lượng "sàn nhà" theo từng cột ảnh)
+        self.floor_map = FloorMap(config, camera_id=camera_id)
         
         print(f"[POSE] Initialized (conf={self.conf}, kpt_conf={self.kpt_conf})")
     
-    def detect_persons(self, frame: np.ndarray) -> List[Dict]:
+    def detect_persons(self, frame: np.ndarray, timestamp: float = None, imgsz: int = None) -> List[Dict]:
         """
         Phát hiện người qua pose keypoints
+        timestamp: thời điểm capture (None → wall clock)
+        imgsz: input size (dynamic resolution), None → pose.imgsz
         Returns: List[Dict] với format tương thích FallDetector
         """
-        self.current_frame = frame.copy()
-        self.frame_count += 1
-        timestamp = time.time()
-        
-        # YOLOv8 inference
-        results = self.model.predict(
-            frame,
-            conf=self.conf,
-            iou=self.iou,
-            imgsz=self.imgsz,
-            verbose=False
-        )[0]
+        kpts, boxes, confs = self.predict_batch([frame], imgsz=imgsz)[0]
+        return self.process_predictions(frame, kpts, boxes, confs, timestamp)
+    
+    def detect_persons_in_regions(
+        self,
+        frame: np.ndarray,
+        regions: List[Tuple[int, int, int, int]],
+        timestamp: float = None
+    ) -> List[Dict]:
+        """
+        Crop inference: chỉ chạy pose model trên các vùng quanh track
+        regions: [(x1, y1, x2, y2)] theo toạ độ frame
+        """
+        kpts, boxes, confs = self.predict_regions([(frame, regions)])[0]
+        return self.process_predictions(frame, kpts, boxes, confs, timestamp)
+    
+    def predict_batch(self, frames: List[np.ndarray], imgsz: int = None) -> List[Tuple]:
+        """
+        Chạy YOLOv8-Pose trên nhiều frame trong 1 lần predict (batched)
+        imgsz: None → pose.imgsz
+        Returns: List[(kpts (N,17,3), boxes (N,4), confs (N,))] theo thứ tự frames
+        """
+        return self.model.predict_pose(frames, imgsz or self.imgsz, self.low_conf, self.iou)
+    
+    def predict_regions(self, frame_regions: List[Tuple]) -> List[Tuple]:
+        """
+        Crops của 1 hoặc nhiều frame (multi-camera) → 1 lần predict ở crop_imgsz
+        frame_regions: [(frame, [(x1, y1, x2, y2), ...]), ...]
+        Returns: List[(kpts, boxes, confs)] theo toạ độ frame, thứ tự như frame_regions
+        """
+        crops = []
+        owners = []
+        for index, (frame, regions) in enumerate(frame_regions):
+            for x1, y1, x2, y2 in regions:
+                crops.append(frame[y1:y2, x1:x2])
+                owners.append((index, x1, y1))
+        
+        predictions = self.predict_batch(crops, imgsz=self.crop_imgsz) if crops else []
+        
+        per_frame = [([], [], []) for _ in frame_regions]
+        for (index, x1, y1), (kpts, boxes, confs) in zip(owners, predictions):
+            if len(kpts) == 0:
+                continue
+            # Crop → frame coordinates
+            kpts = kpts.copy()
+            kpts[:, :, 0] += x1
+            kpts[:, :, 1] += y1
+            boxes = boxes + np.array([x1, y1, x1, y1], dtype=boxes.dtype)
+            
+            per_frame[index][0].append(kpts)
+            per_frame[index][1].append(boxes)
+            per_frame[index][2].append(confs)
+        
+        outputs = []
+        for kpts_list, boxes_list, confs_list in per_frame:
+            if not kpts_list:
+                outputs.append((
+                    np.zeros((0, 17, 3), dtype=np.float32),
+                    np.zeros((0, 4), dtype=np.float32),
+                    np.zeros((0,), dtype=np.float32),
+                ))
+                continue
+            
+            kpts = np.concatenate(kpts_list)
+            boxes = np.concatenate(boxes_list)
+            confs = np.concatenate(confs_list)
+            
+            # Người nằm giữa 2 crop có thể bị detect 2 lần
+            keep = nms_boxes(boxes, confs, self.iou)
+            outputs.append((kpts[keep], boxes[keep], confs[keep]))
         
-        # Không có keypoints → return empty
-        if results.keypoints is None or len(results.keypoints) == 0:
-            self.prev_frame = self.current_frame
+        return outputs
+    
+    def process_predictions(
+        self,
+        frame: np.ndarray,
+        kpts: np.ndarray,
+        boxes: np.ndarray,
+        confs: np.ndarray,
+        timestamp: float = None
+    ) -> List[Dict]:
+        """
+        Chuyển raw predictions của 1 frame thành detections
+        (tách riêng để batched inference trả kết quả về từng camera)
+        timestamp: thời điểm capture / video PTS (None → wall clock)
+        Returns: detections conf >= conf; conf thấp hơn (>= low_conf) ở last_low_detections
+        """
+        self.advance_frame(frame)
+        if timestamp is None:
+            timestamp = time.time()
+        
+        # Không có người → return empty
+        if len(kpts) == 0:
+            self.last_detections = []
+            self.last_low_detections = []
             return []
         
-        # Extract data
-        kpts = results.keypoints.data.cpu().numpy()  # (N, 17, 3) => x, y, conf
-        boxes = results.boxes.xyxy.cpu().numpy()     # (N, 4)
-        confs = results.boxes.conf.cpu().numpy()     # (N,)
-        
-        # Sort by person confidence (lấy người rõ nhất trước)
+        # Sort by person confidence (lấy người rõ nhất trước), max_people mỗi nhóm conf
         order = np.argsort(-confs)
+        high = confs[order] >= self.conf
+        order = np.concatenate([
+            order[high][:self.max_people],
+            order[~high & (confs[order] >= self.low_conf)][:self.max_people]
+        ])
         
-        # Process each person
-        detections = []
-        H, W = frame.shape[:2]
+        # Features của mọi người trong 1 lần tính (floor map của frame trước)
+        table = pose_feature_table(kpts[order], self.kpt_conf, frame.shape, self.floor_map)
         
-        for idx in order[:self.max_people]:
-            kp = kpts[idx]  # (17, 3)
-            
-            # Lọc keypoints có confidence đủ cao
-            valid = kp[:, 2] >= self.kpt_conf
-            if valid.sum() < 6:  # Cần ít nhất 6 keypoints
-                continue
-            
-            # Tính bbox từ keypoints (thay vì dùng bbox của YOLO)
-            xs, ys = kp[valid, 0], kp[valid, 1]
-            x1, y1 = xs.min(), ys.min()
-            x2, y2 = xs.max(), ys.max()
-            
-            # Clamp bbox
-            x1, y1 = max(0, int(x1)), max(0, int(y1))
-            x2, y2 = min(W - 1, int(x2)), min(H - 1, int(y2))
-            bbox = (x1, y1, max(1, x2 - x1), max(1, y2 - y1))
-            
-            # Extract pose features (thay thế contour features)
-            features = self._extract_pose_features(kp, bbox, H, W)
+        detections = []
+        low_detections = []
+        for i in np.flatnonzero(table[:, VALID_KPTS] >= 6):  # Cần ít nhất 6 keypoints
+            row = table[i]
+            bbox = (int(row[BBOX_X]), int(row[BBOX_Y]), int(row[BBOX_W]), int(row[BBOX_H]))
+            idx = order[i]
             
-            detections.append({
+            (detections if confs[idx] >= self.conf else low_detections).append({
                 "bbox": bbox,
-                "keypoints": kp,                 # ★ Quan trọng để vẽ skeleton
+                "keypoints": kpts[idx],              # ★ Quan trọng để vẽ skeleton
                 "pose_conf": float(confs[idx]),
-                "features": features,            # Tương thích với tracker/state_machine
+                "features": PoseFeatures(row),       # Tương thích với tracker/state_machine
                 "timestamp": timestamp,
-                "contour": None,                 # Không dùng contour nữa
+                "contour": None,                     # Không dùng contour nữa
                 "area": bbox[2] * bbox[3],
             })
         
         # Update floor estimation
-        self._update_floor_estimation(detections)
+        self._update_floor_estimation(detections, frame.shape)
         
-        self.prev_frame = self.current_frame
+        self.last_detections = detections
+        self.last_low_detections = low_detections
         return detections
     
-    def _extract_pose_features(self, kp, bbox, H, W) -> Dict:
+    def advance_frame(self, frame: np.ndarray):
         """
-        Extract features từ keypoints thay vì contour
-        Tương thích với format cũ để không phá tracker/state_machine
+        Cập nhật prev/current frame (cả frame không chạy inference)
+        để calculate_motion_energy dùng đúng cặp frame liên tiếp
+        Chỉ đổi reference, không copy: frame từ capture là array mới mỗi lần đọc
+        và không bị vẽ đè (display vẽ lên bản copy)
         """
-        # COCO keypoint indices
-        # 0: nose, 5/6: shoulders, 11/12: hips, 15/16: ankles
-        def get_point(i):
-            return kp[i, 0], kp[i, 1], kp[i, 2]
-        
-        lsx, lsy, lsc = get_point(5)  # left shoulder
-        rsx, rsy, rsc = get_point(6)  # right shoulder
-        lhx, lhy, lhc = get_point(11) # left hip
-        rhx, rhy, rhc = get_point(12) # right hip
-        
-        # Mid-shoulder và mid-hip
-        shoulder_ok = (lsc >= self.kpt_conf and rsc >= self.kpt_conf)
-        hip_ok = (lhc >= self.kpt_conf and rhc >= self.kpt_conf)
-        
-        if shoulder_ok:
-            shx, shy = (lsx + rsx) / 2.0, (lsy + rsy) / 2.0
-        else:
-            shx, shy = None, None
-        
-        if hip_ok:
-            hpx, hpy = (lhx + rhx) / 2.0, (lhy + rhy) / 2.0
-        else:
-            # Fallback to bbox center
-            x, y, w, h = bbox
-            hpx, hpy = x + w / 2.0, y + h / 2.0
-        
-        # ★ TORSO ANGLE (góc thân người)
-        # 0° = đứng thẳng, 90° = nằm ngang
-        torso_angle = 0.0
-        if shoulder_ok and hip_ok:
-            dx = hpx - shx
-            dy = hpy - shy
-            # Tính góc từ vector thân người so với trục dọc
-            torso_angle = float(np.degrees(np.arctan2(abs(dx), abs(dy) + 1e-6)))
-        
-        # ★ HIP DROP & SPEED (để phát hiện ngã)
-        # Sẽ tính trong PersonTrack khi có history
-        
-        # Bbox features (tương thích với code cũ)
-        x, y, w, h = bbox
-        aspect_ratio = w / max(h, 1)
-        centroid_y_ratio = hpy / max(H, 1)
-        
-        # Floor distance (khoảng cách từ hip đến sàn)
-        floor_dist_norm = 1.0
-        if self.floor_y is not None:
-            floor_dist_norm = abs(self.floor_y - hpy) / max(H, 1)
+        self.prev_frame = self.current_frame
+        self.current_frame = frame
+        self.frame_count += 1
+    
+    def reuse_detections(self, frame: np.ndarray, timestamp: float = None) -> List[Dict]:
+        """
+        Motion gate: cảnh tĩnh → không chạy YOLO, trả lại detections
+        của lần inference trước với timestamp mới
+        """
+        self.advance_frame(frame)
+        if timestamp is None:
+            timestamp = time.time()
         
-        return {
-            "aspect_ratio": float(aspect_ratio),
-            "centroid": (int(hpx), int(hpy)),     # ★ Dùng hip làm centroid (ổn định)
-            "angle": float(torso_angle),          # Map vào angle cũ
-            "torso_angle": float(torso_angle),    # ★ Góc thân người (quan trọng!)
-            "extent": 0.0,                        # Không dùng nữa
-            "solidity": 0.0,                      # Không dùng nữa
-            "bbox_height": int(h),
-            "bbox_width": int(w),
-            "centroid_y_ratio": float(centroid_y_ratio),
-            "floor_dist_norm": float(floor_dist_norm),
-            "shoulder_pos": (shx, shy) if shoulder_ok else None,
-            "hip_pos": (hpx, hpy),
-        }
-    
-    def _update_floor_estimation(self, detections: List[Dict]):
+        self.last_low_detections = [dict(det, timestamp=timestamp) for det in self.last_low_detections]
+        return [dict(det, timestamp=timestamp) for det in self.last_detections]
+    
+    def _update_floor_estimation(self, detections: List[Dict], frame_shape: Tuple[int, ...]):
         """
         Tự động ước lượng "sàn nhà" từ vị trí ankle (cổ chân)
         Dùng để check "nằm sát sàn"
+        Floor = percentile 90 của ankle y theo từng cột (ankle thấp nhất thường gần sàn)
         """
         if len(detections) == 0:
             return
         
-        for det in detections:
-            kp = det.get("keypoints")
-            if kp is None:
-                continue
-            
-            # Lấy ankle (15, 16)
-            l_ankle_y, l_ankle_c = kp[15, 1], kp[15, 2]
-            r_ankle_y, r_ankle_c = kp[16, 1], kp[16, 2]
-            
-            if l_ankle_c >= self.kpt_conf:
-                self.floor_history.append(l_ankle_y)
-            if r_ankle_c >= self.kpt_conf:
-                self.floor_history.append(r_ankle_y)
+        H, W = frame_shape[:2]
         
-        # Giữ 300 frames gần nhất
-        if len(self.floor_history) > 300:
-            self.floor_history = self.floor_history[-300:]
+        # Ankle (15, 16) của mọi người
+        ankles = np.stack([det["keypoints"][15:17] for det in detections]).reshape(-1, 3)
+        ankles = ankles[ankles[:, 2] >= self.kpt_conf]
         
-        # Floor = percentile 90 (ankle thấp nhất thường gần sàn)
-        if len(self.floor_history) >= 30:
-            self.floor_y = np.percentile(self.floor_history, 90)
+        for x, y in zip((ankles[:, 0] / max(W, 1)).tolist(), (ankles[:, 1] / max(H, 1)).tolist()):
+            self.floor_map.update(x, y)
     
     def calculate_motion_energy(self, bbox) -> float:
         """
         Tính motion energy (tương thích với code cũ)
-        Dùng frame difference trong bbox
+        Mean frame difference (gray) trong bbox: diff + integral image tính 1 lần / frame
         """
         if self.prev_frame is None or self.current_frame is None:
             return 0.0
@@ -253,23 +434,11 @@ class PoseDetector:
         if w <= 0 or h <= 0:
             return 0.0
         
-        # Extract ROI
-        roi_prev = self.prev_frame[y:y+h, x:x+w]
-        roi_curr = self.current_frame[y:y+h, x:x+w]
-        
-        if roi_prev.shape != roi_curr.shape:
-            return 0.0
-        
-        # Convert to grayscale
-        if len(roi_prev.shape) == 3:
-            roi_prev = cv2.cvtColor(roi_prev, cv2.COLOR_BGR2GRAY)
-            roi_curr = cv2.cvtColor(roi_curr, cv2.COLOR_BGR2GRAY)
-        
-        # Frame difference
-        diff = cv2.absdiff(roi_prev, roi_curr)
-        motion_energy = np.mean(diff)
-        
-        return float(motion_energy)
+        return self.frame_diff.mean_diff(self.prev_frame, self.current_frame, (x, y, w, h))
+
+
+# (E, 2) chỉ số keypoint đầu / cuối của mỗi edge
+COCO_EDGE_INDEX = np.array(COCO_EDGES)
 
 
 def draw_skeleton(img, kp, kpt_th=0.30, thickness=2, alpha=0.8):
@@ -277,26 +446,51 @@ def draw_skeleton(img, kp, kpt_th=0.30, thickness=2, alpha=0.8):
     Vẽ skeleton (xương người) lên ảnh
     Giống hình 4: không vẽ bbox, chỉ vẽ keypoints + edges
     """
-    overlay = img.copy()
+    draw_skeletons(img, [kp], kpt_th=kpt_th, thickness=thickness, alpha=alpha)
+
+
+def draw_skeletons(img, keypoints, kpt_th=0.30, thickness=2, alpha=0.8, radius=4):
+    """
+    Vẽ skeleton của mọi người trong 1 lượt (live display + offline annotated video)
+    - mọi edge hợp lệ của mọi người → 1 lần cv2.polylines
+    - mọi khớp → 1 lần cv2.polylines (đoạn 1 điểm, nét dày 2·radius = hình tròn đặc)
+    - 1 lần blend alpha / frame, chỉ trên vùng bao các skeleton
+    Args:
+        keypoints: list các (17, 3) hoặc array (N, 17, 3)
+    """
+    if len(keypoints) == 0:
+        return
     
-    # Vẽ edges (xương) trước
-    for a, b in COCO_EDGES:
-        if kp[a, 2] < kpt_th or kp[b, 2] < kpt_th:
-            continue
-        
-        xa, ya = int(kp[a, 0]), int(kp[a, 1])
-        xb, yb = int(kp[b, 0]), int(kp[b, 1])
-        
-        # Màu xanh dương cho xương
-        cv2.line(overlay, (xa, ya), (xb, yb), (255, 100, 0), thickness)
+    kps = np.asarray(keypoints, dtype=np.float64).reshape(-1, 17, 3)
+    valid = kps[:, :, 2] >= kpt_th
+    if not valid.any():
+        return
     
-    # Vẽ keypoints (khớp) sau
-    for i, (x, y, c) in enumerate(kp):
-        if c < kpt_th:
-            continue
-        
-        # Màu vàng cho keypoints
-        cv2.circle(overlay, (int(x), int(y)), 4, (0, 255, 255), -1)
+    points = kps[:, :, :2].astype(np.int32)
+    
+    # Vùng bao mọi điểm hợp lệ (+ nét vẽ), clamp theo ảnh
+    H, W = img.shape[:2]
+    pad = max(thickness, 2 * radius) + 2
+    visible = points[valid]
+    x1, y1 = np.maximum(visible.min(axis=0) - pad, 0)
+    x2, y2 = np.minimum(visible.max(axis=0) + pad + 1, (W, H))
+    if x2 <= x1 or y2 <= y1:
+        return
+    
+    offset = np.array([x1, y1], dtype=np.int32)
+    roi = img[y1:y2, x1:x2]
+    overlay = roi.copy()
+    
+    # Vẽ edges (xương) trước - màu xanh dương
+    a, b = COCO_EDGE_INDEX[:, 0], COCO_EDGE_INDEX[:, 1]
+    edge_ok = valid[:, a] & valid[:, b]
+    if edge_ok.any():
+        segments = np.stack([points[:, a], points[:, b]], axis=2)[edge_ok] - offset
+        cv2.polylines(overlay, segments, False, (255, 100, 0), thickness)
+    
+    # Vẽ keypoints (khớp) sau - màu vàng
+    joints = np.repeat(visible[:, None, :] - offset, 2, axis=1)
+    cv2.polylines(overlay, joints, False, (0, 255, 255), 2 * radius)
     
-    # Blend với alpha
-    cv2.addWeighted(overlay, alpha, img, 1 - alpha, 0, img)
+    # Blend với alpha (chỉ trên ROI)
+    img[y1:y2, x1:x2] = cv2.addWeighted(overlay, alpha, roi, 1 - alpha, 0)
@@ -0,0 +1,139 @@
+"""
+Dynamic input resolution cho pose model
+Người ở gần camera (bbox cao) → imgsz nhỏ vẫn đủ pixel cho keypoints, rẻ hơn nhiều
+(320 ≈ 1/4 chi phí của 640). Chọn imgsz từ ladder theo phân bố chiều cao bbox gần đây:
+- lên size lớn hơn: ngay lập tức
+- xuống size nhỏ hơn: cần dư (hysteresis) liên tục down_frames lần inference
+- có người mới / không có ai / probe định kỳ → size lớn nhất
+"""
+from collections import deque
+from typing import Dict, Optional, Tuple
+
+import numpy as np
+
+from utils.metrics import LatencyHistogram
+
+
+class DynamicResolutionController:
+    """
+    select(tracks, frame_shape) trước mỗi lần full-frame inference → imgsz
+    record(imgsz, seconds) sau khi predict → latency theo từng size
+    Chiều cao người trong input model ≈ bbox_h / cạnh dài frame * imgsz (letterbox)
+    """
+
+    def __init__(self, config: dict):
+        pose_config = config.get('pose', {})
+        dynamic_config = pose_config.get('dynamic_imgsz', {})
+
+        self.enabled = dynamic_config.get('enabled', False)
+        self.max_imgsz = int(pose_config.get('imgsz', 640))
+        ladder = [int(size) for size in dynamic_config.get('ladder', [320, 416, 512, 640])]
+        self.ladder = sorted(set(size for size in ladder if size <= self.max_imgsz) | {self.max_imgsz})
+
+        # Người thấp nhất (percentile) cần cao ít nhất min_person_px trong input model
+        self.min_person_px = float(dynamic_config.get('min_person_px', 96))
+        self.height_percentile = float(dynamic_config.get('height_percentile', 10))
+        self.hysteresis = float(dynamic_config.get('hysteresis', 1.2))
+        self.down_frames = int(dynamic_config.get('down_frames', 15))
+        self.probe_interval = int(dynamic_config.get('probe_interval', 30))
+        self.new_track_hits = int(dynamic_config.get('new_track_hits', 3))
+
+        # Chiều cao bbox (chuẩn hoá theo cạnh dài frame) của các lần inference gần đây
+        self.heights = deque(maxlen=int(dynamic_config.get('window', 60)))
+
+        self.current = self.max_imgsz
+        self.reason = 'init'  # Lý do của lần chọn gần nhất
+        self._down_count = 0
+
+        # Stats
+        self.selections = 0
+        self.forced = {'new_person': 0, 'empty': 0, 'probe': 0}
+        self.frames_per_size = {size: 0 for size in self.ladder}
+        self.latency = {size: LatencyHistogram() for size in self.ladder}
+
+    def select(self, tracks: Dict, frame_shape: Tuple[int, ...]) -> Optional[int]:
+        """imgsz cho lần inference tiếp theo (None nếu tắt → pose.imgsz)"""
+        if not self.enabled:
+            return None
+
+        self.selections += 1
+
+        if not tracks:
+            return self._force('empty')
+
+        # Người mới (track chưa đủ detections) → size lớn nhất tới khi ổn định
+        if any(track.hits < self.new_track_hits for track in tracks.values()):
+            return self._force('new_person')
+
+        # Probe định kỳ ở size lớn nhất (người ở xa có thể không thấy ở size nhỏ)
+        # 1 lần inference, không đổi size đang chọn
+        if self.probe_interval > 0 and self.selections % self.probe_interval == 0:
+            self.forced['probe'] += 1
+            self.reason = 'probe'
+            self.frames_per_size[self.ladder[-1]] += 1
+            return self.ladder[-1]
+
+        long_side = float(max(frame_shape[:2]))
+        for track in tracks.values():
+            self.heights.append(track.last_bbox[3] / long_side)
+
+        reference = float(np.percentile(self.heights, self.height_percentile))
+        self.reason = 'hold'
+        needed = self._smallest_size(reference, 1.0)
+
+        if needed > self.current:
+            # Người nhỏ đi (đi xa camera) → lên ngay
+            self._set(needed, 'grow')
+        elif needed < self.current:
+            # Chỉ xuống khi vẫn đủ pixel với hysteresis, liên tục down_frames lần
+            candidate = self._smallest_size(reference, self.hysteresis)
+            if candidate < self.current:
+                self._down_count += 1
+                if self._down_count >= self.down_frames:
+                    self._set(candidate, 'shrink')
+            else:
+                self._down_count = 0
+        else:
+            self._down_count = 0
+
+        self.frames_per_size[self.current] += 1
+        return self.current
+
+    def _smallest_size(self, height: float, margin: float) -> int:
+        """Size nhỏ nhất trong ladder mà người cao height (chuẩn hoá) đủ min_person_px * margin"""
+        for size in self.ladder:
+            if height * size >= self.min_person_px * margin:
+                return size
+        return self.ladder[-1]
+
+    def _force(self, reason: str) -> int:
+        self.forced[reason] += 1
+        self._set(self.ladder[-1], reason)
+        self.frames_per_size[self.current] += 1
+        return self.current
+
+    def _set(self, size: int, reason: str):
+        self.current = size
+        self.reason = reason
+        self._down_count = 0
+
+    def record(self, imgsz: Optional[int], seconds: float):
+        """Latency của 1 lần predict ở imgsz"""
+        histogram = self.latency.get(imgsz if imgsz is not None else self.max_imgsz)
+        if histogram is not None:
+            histogram.record(seconds)
+
+    def get_stats(self) -> dict:
+        """Số frame + latency (ms) theo từng size"""
+        return {
+            'enabled': self.enabled,
+            'current': self.current,
+            'ladder': list(self.ladder),
+            'frames_per_size': dict(self.frames_per_size),
+            'forced': dict(self.forced),
+            'latency_ms': {
+                size: self.latency[size].summary()
+                for size in self.ladder if self.frames_per_size[size] > 0
+            },
+        }
+
@@ -3,9 +3,9 @@ State Machine for Fall Detection
 Quản lý states: STANDING -> FALLING -> FALLEN -> ALARM
 """
 from enum import Enum
-import time
-from typing import Dict, Optional
-from core.tracker import PersonTrack
+from typing import Callable, Dict, Optional
+from core.tracker import PersonTrack, TrackEvent
+from core.clock import SystemClock
 
 
 class FallState(Enum):
@@ -23,13 +23,26 @@ class PersonStateMachine:
     Theo dõi trạng thái và trigger alarm
     """
     
-    def __init__(self, track_id: int, config: dict):
+    def __init__(
+        self,
+        track_id: int,
+        config: dict,
+        clock=None,
+        on_transition: Optional[Callable] = None
+    ):
+        """
+        Args:
+            clock: object có now() (SystemClock mặc định, VideoClock khi offline)
+            on_transition: callback(track_id, old_state, new_state, timestamp)
+        """
         self.track_id = track_id
         self.config = config
+        self.clock = clock if clock is not None else SystemClock()
+        self.on_transition = on_transition
         
         # State
         self.current_state = FallState.STANDING
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock.now()
         
         # Thresholds
         self.fall_duration_threshold = config['detection']['fall_duration_threshold']
@@ -41,15 +54,19 @@ class PersonStateMachine:
         self.centroid_y_threshold = 0.6    # Low in frame
         
         # History
-        self.state_history = [(FallState.STANDING, time.time())]
+        self.state_history = [(FallState.STANDING, self.state_start_time)]
         self.alarm_triggered = False
         self.alarm_time = None
         
+        # Keypoint flow của frame gần nhất (None nếu không bật keypoint_flow)
+        self.keypoint_motion = None
+        
     def update(
         self, 
         track: PersonTrack,
         motion_energy: float,
-        ml_prediction: Optional[Dict] = None
+        ml_prediction: Optional[Dict] = None,
+        keypoint_motion: Optional[Dict] = None
     ) -> FallState:
         """
         Update state based on features
@@ -57,9 +74,10 @@ class PersonStateMachine:
             track: PersonTrack object
             motion_energy: Motion energy in bbox
             ml_prediction: Optional ML classifier output {'class': 'fall', 'proba': 0.9}
+            keypoint_motion: Optional sparse flow {'limbs': {...}, 'limbs_moving', 'chest', 'vital'}
         """
         features = track.last_features
-        current_time = time.time()
+        current_time = self.clock.now()
         time_in_state = current_time - self.state_start_time
         
         # Get fall indicators
@@ -67,6 +85,11 @@ class PersonStateMachine:
         is_falling_fast = self._is_falling_fast(track)
         is_immobile = motion_energy < self.config['detection']['motion_threshold']
         
+        # Tay / chân còn cử động → không bất động (thở thôi thì vẫn tính là bất động)
+        self.keypoint_motion = keypoint_motion
+        if keypoint_motion is not None and keypoint_motion['limbs_moving']:
+            is_immobile = False
+        
         # ML classifier override (if available and confident)
         if ml_prediction and ml_prediction.get('proba', 0) > 0.8:
             if ml_prediction['class'] == 'fall':
@@ -159,17 +182,21 @@ class PersonStateMachine:
     
     def _transition_to(self, new_state: FallState):
         """Transition to new state"""
+        old_state = self.current_state
         self.current_state = new_state
-        self.state_start_time = time.time()
+        self.state_start_time = self.clock.now()
         self.state_history.append((new_state, self.state_start_time))
         
         # Keep only recent history
         if len(self.state_history) > 100:
             self.state_history = self.state_history[-100:]
+        
+        if self.on_transition is not None:
+            self.on_transition(self.track_id, old_state, new_state, self.state_start_time)
     
     def get_state_duration(self) -> float:
         """Get duration in current state"""
-        return time.time() - self.state_start_time
+        return self.clock.now() - self.state_start_time
     
     def reset(self):
         """Reset to standing state"""
@@ -183,25 +210,42 @@ class StateMachineManager:
     Quản lý state machines cho nhiều người
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, clock=None):
         self.config = config
+        self.clock = clock if clock is not None else SystemClock()
         self.state_machines: Dict[int, PersonStateMachine] = {}
+        
+        # Transition listeners: callback(track_id, old_state, new_state, timestamp)
+        self.transition_listeners = []
+    
+    def add_transition_listener(self, callback: Callable):
+        """Subscribe to state transitions of every person"""
+        self.transition_listeners.append(callback)
+    
+    def _notify_transition(self, track_id, old_state, new_state, timestamp):
+        for callback in self.transition_listeners:
+            callback(track_id, old_state, new_state, timestamp)
     
     def update(
         self,
         track_id: int,
         track: PersonTrack,
         motion_energy: float,
-        ml_prediction: Optional[Dict] = None
+        ml_prediction: Optional[Dict] = None,
+        keypoint_motion: Optional[Dict] = None
     ) -> FallState:
         """Update state machine for a person"""
         
         # Create state machine if not exists
         if track_id not in self.state_machines:
-            self.state_machines[track_id] = PersonStateMachine(track_id, self.config)
+            self.state_machines[track_id] = PersonStateMachine(
+                track_id, self.config,
+                clock=self.clock,
+                on_transition=self._notify_transition
+            )
         
         sm = self.state_machines[track_id]
-        return sm.update(track, motion_energy, ml_prediction)
+        return sm.update(track, motion_energy, ml_prediction, keypoint_motion)
     
     def get_state(self, track_id: int) -> Optional[FallState]:
         """Get current state for a person"""
@@ -217,6 +261,11 @@ class StateMachineManager:
         if track_id in self.state_machines:
             del self.state_machines[track_id]
     
+    def on_track_event(self, event: TrackEvent, track: PersonTrack):
+        """Track lifecycle listener: drop state machine of removed tracks"""
+        if event == TrackEvent.REMOVED:
+            self.remove_state_machine(track.track_id)
+    
     def get_alarms(self) -> Dict[int, PersonStateMachine]:
         """Get all persons in ALARM state"""
         alarms = {}
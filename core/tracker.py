@@ -4,12 +4,38 @@ Sử dụng Kalman Filter + Hungarian algorithm để theo dõi nhiều người
 """
 import numpy as np
 from scipy.optimize import linear_sum_assignment
-from typing import List, Dict, Tuple
+from scipy.sparse import coo_matrix
+from scipy.sparse.csgraph import connected_components
+from typing import List, Dict, Tuple, Callable
+from enum import Enum
 import time
 
 
+# Độ lệch chuẩn keypoint COCO-17 (OKS): điểm trên thân / chân dao động nhiều hơn mặt
+COCO_SIGMAS = np.array([
+    0.26, 0.25, 0.25, 0.35, 0.35, 0.79, 0.79, 0.72, 0.72,
+    0.62, 0.62, 1.07, 1.07, 0.87, 0.87, 0.89, 0.89
+]) / 10.0
+
+# Cost của cặp bị gate (không dùng inf: linear_sum_assignment báo infeasible)
+GATED_COST = 1e6
+
+# 9 ô lân cận (dx, dy) của spatial grid
+_GRID_NEIGHBORS = np.array([(dx, dy) for dx in (-1, 0, 1) for dy in (-1, 0, 1)])
+
+
+class TrackEvent(Enum):
+    """Track lifecycle events (published by MultiPersonTracker)"""
+    CREATED = "created"   # Track mới
+    LOST = "lost"         # Frame đầu tiên không match được detection
+    REMOVED = "removed"   # Mất quá max_disappeared frames → xóa
+
+
 class KalmanTracker:
-    """Simple Kalman filter for 2D position tracking"""
+    """
+    Simple Kalman filter for 2D position tracking (1 object / track)
+    Tracker dùng KalmanBank; giữ lại làm tham chiếu cho benchmarks.kalman_batch
+    """
     
     def __init__(self):
         # State: [x, y, vx, vy]
@@ -58,74 +84,266 @@ class KalmanTracker:
         self.P = (np.eye(4) - K @ self.H) @ self.P
 
 
+# Chỉ số đường chéo của ma trận 4x4 (cộng Q vào P theo batch)
+_DIAG = np.arange(4)
+
+
+class KalmanBank:
+    """
+    Kalman filter [x, y, vx, vy] của mọi track dạng struct-of-arrays
+    state (N, 4), P (N, 4, 4): predict / update nhiều track trong 1 lần gọi
+    - F = [[I, I], [0, I]] (khối 2x2) → F P F^T bằng cộng khối, không matmul
+    - H chọn (x, y) → S = P[:2, :2] + R là 2x2 → nghịch đảo dạng đóng
+    Mỗi track giữ 1 hàng, hàng được tái sử dụng sau khi track bị xoá
+    Cùng kết quả với KalmanTracker (Q = 0.1 I, R = 10 I, P0 = 1000 I)
+    """
+    
+    def __init__(self, capacity: int = 16, process_noise: float = 0.1,
+                 measurement_noise: float = 10.0, initial_uncertainty: float = 1000.0):
+        self.q = float(process_noise)
+        self.r = float(measurement_noise)
+        self.p0 = float(initial_uncertainty)
+        
+        capacity = max(int(capacity), 1)
+        self.state = np.zeros((capacity, 4))
+        self.P = np.zeros((capacity, 4, 4))
+        self._free = list(range(capacity - 1, -1, -1))
+        self.active = 0
+    
+    def allocate(self, x: float, y: float) -> int:
+        """Hàng mới cho track tại (x, y), vận tốc 0"""
+        if not self._free:
+            self._grow()
+        
+        row = self._free.pop()
+        self.state[row] = (x, y, 0.0, 0.0)
+        self.P[row] = np.eye(4) * self.p0
+        self.active += 1
+        return row
+    
+    def release(self, row: int):
+        self._free.append(row)
+        self.active -= 1
+    
+    def _grow(self):
+        """Gấp đôi capacity (view của track đọc lại mảng mới qua row)"""
+        capacity = len(self.state)
+        self.state = np.concatenate([self.state, np.zeros((capacity, 4))])
+        self.P = np.concatenate([self.P, np.zeros((capacity, 4, 4))])
+        self._free.extend(range(2 * capacity - 1, capacity - 1, -1))
+    
+    def predict(self, rows: np.ndarray) -> np.ndarray:
+        """Predict các hàng rows, trả về vị trí dự đoán (n, 2)"""
+        state = self.state[rows]
+        state[:, :2] += state[:, 2:]
+        self.state[rows] = state
+        
+        # F P F^T: hàng (x, y) += hàng (vx, vy), rồi cột (x, y) += cột (vx, vy)
+        P = self.P[rows]
+        P[:, :2, :] += P[:, 2:, :]
+        P[:, :, :2] += P[:, :, 2:]
+        P[:, _DIAG, _DIAG] += self.q
+        self.P[rows] = P
+        
+        return state[:, :2]
+    
+    def update(self, rows: np.ndarray, measurements: np.ndarray):
+        """Update các hàng rows với measurements (n, 2)"""
+        state = self.state[rows]
+        P = self.P[rows]
+        
+        # S^-1 dạng đóng: [[a, b], [c, d]]^-1 = [[d, -b], [-c, a]] / (ad - bc)
+        a = P[:, 0, 0, None] + self.r
+        b = P[:, 0, 1, None]
+        c = P[:, 1, 0, None]
+        d = P[:, 1, 1, None] + self.r
+        det = a * d - b * c
+        
+        # K = P H^T S^-1 = P[:, :2] S^-1 → 2 cột (n, 4)
+        P_x, P_y = P[:, :, 0], P[:, :, 1]
+        K_x = (P_x * d - P_y * c) / det
+        K_y = (P_y * a - P_x * b) / det
+        
+        innovation = np.asarray(measurements, dtype=float) - state[:, :2]
+        state += K_x * innovation[:, 0, None] + K_y * innovation[:, 1, None]
+        
+        # (I - K H) P = P - K P[:2, :]
+        P -= K_x[:, :, None] * P[:, 0, None, :] + K_y[:, :, None] * P[:, 1, None, :]
+        
+        self.state[rows] = state
+        self.P[rows] = P
+
+
+class KalmanView:
+    """Kalman filter của 1 track = 1 hàng của KalmanBank (cùng API với KalmanTracker)"""
+    
+    def __init__(self, bank: KalmanBank, row: int):
+        self.bank = bank
+        self.row = row
+        self._rows = np.array([row])
+    
+    @property
+    def state(self) -> np.ndarray:
+        """View (ghi được) vào hàng của track"""
+        return self.bank.state[self.row]
+    
+    @property
+    def P(self) -> np.ndarray:
+        return self.bank.P[self.row]
+    
+    def predict(self):
+        return self.bank.predict(self._rows)[0]
+    
+    def update(self, measurement: np.ndarray):
+        self.bank.update(self._rows, np.asarray(measurement, dtype=float)[None, :])
+
+
+class TrackHistory:
+    """
+    Ring buffer cố định (capacity entry gần nhất) của 1 track
+    records (N, 7) = [timestamp, cx, cy, x, y, w, h], keypoints (N, 17, 3)
+    Mỗi entry được ghi 2 lần (i và i + capacity) → N entry gần nhất luôn là
+    1 đoạn liền trong buffer: ghi O(1), đọc là view (cũ → mới), không copy
+    """
+    
+    def __init__(self, capacity: int = 60, num_keypoints: int = 17):
+        self.capacity = int(capacity)
+        self._records = np.zeros((2 * self.capacity, 7))
+        self._keypoints = np.zeros((2 * self.capacity, num_keypoints, 3), dtype=np.float32)
+        
+        self._head = 0   # Vị trí ghi tiếp theo trong [0, capacity)
+        self.count = 0
+    
+    def append(self, timestamp: float, centroid, bbox, keypoints: np.ndarray = None):
+        head, mirror = self._head, self._head + self.capacity
+        self._records[head] = self._records[mirror] = (timestamp, *centroid, *bbox)
+        # keypoints None → conf 0 (không thấy)
+        self._keypoints[head] = self._keypoints[mirror] = 0.0 if keypoints is None else keypoints
+        
+        self._head = (head + 1) % self.capacity
+        self.count = min(self.count + 1, self.capacity)
+    
+    def __len__(self) -> int:
+        return self.count
+    
+    def _window(self) -> slice:
+        end = self._head + self.capacity
+        return slice(end - self.count, end)
+    
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self._records[self._window(), 0]
+    
+    @property
+    def centroids(self) -> np.ndarray:
+        return self._records[self._window(), 1:3]
+    
+    @property
+    def bboxes(self) -> np.ndarray:
+        return self._records[self._window(), 3:7]
+    
+    @property
+    def keypoints(self) -> np.ndarray:
+        return self._keypoints[self._window()]
+    
+    def delta(self, n: int) -> Tuple[float, float, float]:
+        """(dt, dx, dy) từ entry cũ nhất tới mới nhất trong n entry gần nhất"""
+        newest = self._head + self.capacity - 1
+        oldest = newest - min(n, self.count) + 1
+        t1, x1, y1 = self._records[newest, :3].tolist()
+        t0, x0, y0 = self._records[oldest, :3].tolist()
+        return t1 - t0, x1 - x0, y1 - y0
+
+
 class PersonTrack:
     """Represents a tracked person"""
     
     next_id = 1
+    max_history = 60
     
-    def __init__(self, detection: Dict):
+    def __init__(self, detection: Dict, kalman_bank: KalmanBank = None):
         self.track_id = PersonTrack.next_id
         PersonTrack.next_id += 1
         
-        # Kalman filter
-        self.kalman = KalmanTracker()
+        # Kalman filter: 1 hàng trong bank dùng chung của tracker (None → bank riêng)
+        if kalman_bank is None:
+            kalman_bank = KalmanBank(capacity=1)
         cx, cy = detection['features']['centroid']
-        self.kalman.state[:2] = [cx, cy]
+        self.kalman = KalmanView(kalman_bank, kalman_bank.allocate(cx, cy))
         
-        # Track history
-        self.detections = [detection]
-        self.timestamps = [detection['timestamp']]
+        # Track history: ring buffer max_history detections gần nhất
+        self.history = TrackHistory(self.max_history)
+        self.hits = 0  # Tổng số detections đã match
         self.disappeared = 0
         
-        # Features for analysis
-        self.last_bbox = detection['bbox']
-        self.last_features = detection['features']
-        self.last_keypoints = detection.get('keypoints')  # ★ Lưu keypoints để vẽ skeleton
+        self.record_detection(detection)
         
+    @property
+    def timestamps(self) -> np.ndarray:
+        return self.history.timestamps
+    
     def update(self, detection: Dict):
         """Update track with new detection"""
         cx, cy = detection['features']['centroid']
         self.kalman.update(np.array([cx, cy]))
-        
-        self.detections.append(detection)
-        self.timestamps.append(detection['timestamp'])
+        self.record_detection(detection)
+    
+    def record_detection(self, detection: Dict):
+        """Thêm detection vào history (Kalman đã được update theo batch)"""
+        keypoints = detection.get('keypoints')
+        self.history.append(
+            detection['timestamp'], detection['features']['centroid'], detection['bbox'], keypoints
+        )
+        self.hits += 1
         self.disappeared = 0
         
+        # Features for analysis
+        self.last_detection = detection
         self.last_bbox = detection['bbox']
         self.last_features = detection['features']
-        self.last_keypoints = detection.get('keypoints')  # ★ Update keypoints
-        
-        # Keep only last N detections
-        max_history = 60
-        if len(self.detections) > max_history:
-            self.detections = self.detections[-max_history:]
-            self.timestamps = self.timestamps[-max_history:]
+        self.last_keypoints = keypoints  # ★ Lưu keypoints để vẽ skeleton
+        self.last_centroid = detection['features']['centroid']  # Vị trí ứng với last_keypoints
     
     def predict(self) -> Tuple[float, float]:
         """Predict next position"""
         return tuple(self.kalman.predict())
     
+    def propagate(self):
+        """
+        Propagate track 1 frame bằng Kalman predict (frame không chạy inference)
+        Dịch bbox + keypoints theo độ dời dự đoán, không thêm vào history
+        """
+        prev_x, prev_y = self.kalman.state[:2]
+        pred_x, pred_y = self.kalman.predict()
+        self.shift(pred_x - prev_x, pred_y - prev_y)
+    
+    def shift(self, dx: float, dy: float):
+        """Dịch bbox + keypoints theo độ dời Kalman"""
+        x, y, w, h = self.last_bbox
+        self.last_bbox = (int(round(x + dx)), int(round(y + dy)), w, h)
+        self.last_centroid = (self.last_centroid[0] + dx, self.last_centroid[1] + dy)
+        
+        if self.last_keypoints is not None:
+            keypoints = self.last_keypoints.copy()
+            keypoints[:, 0] += dx
+            keypoints[:, 1] += dy
+            self.last_keypoints = keypoints
+    
     def mark_disappeared(self):
         """Mark as disappeared (no matching detection)"""
         self.disappeared += 1
     
     def get_velocity(self) -> Tuple[float, float]:
         """Calculate velocity from recent detections"""
-        if len(self.detections) < 2:
+        if len(self.history) < 2:
             return 0.0, 0.0
         
-        recent = self.detections[-10:]  # Last 10 frames
-        times = self.timestamps[-10:]
-        
-        if len(recent) < 2:
-            return 0.0, 0.0
-        
-        # Extract centroids
-        centroids = [d['features']['centroid'] for d in recent]
+        # Last 10 frames
+        dt, dx, dy = self.history.delta(10)
         
         # Calculate velocities
-        vx = (centroids[-1][0] - centroids[0][0]) / max(times[-1] - times[0], 0.001)
-        vy = (centroids[-1][1] - centroids[0][1]) / max(times[-1] - times[0], 0.001)
+        vx = dx / max(dt, 0.001)
+        vy = dy / max(dt, 0.001)
         
         return vx, vy
     
@@ -139,42 +357,39 @@ class PersonTrack:
         ★ HIP DROP: Khoảng cách hip rơi xuống trong time_window giây
         Trả về: normalized drop (0.0 - 1.0, chia cho frame height)
         """
-        if len(self.detections) < 2:
+        count = len(self.history)
+        if count < 2:
             return 0.0
         
-        current_time = self.timestamps[-1]
+        times = self.history.timestamps
+        current_time = times[-1]
         current_hip_y = self.last_features['centroid'][1]
         
-        # Tìm detection cách đây time_window giây
-        for i in range(len(self.detections) - 2, -1, -1):
-            if current_time - self.timestamps[i] >= time_window:
-                prev_hip_y = self.detections[i]['features']['centroid'][1]
-                frame_h = self.last_features.get('bbox_height', 1) * 2  # Ước lượng frame height
-                drop = (current_hip_y - prev_hip_y) / max(frame_h, 1)
-                return max(0.0, drop)  # Chỉ trả về nếu rơi xuống (drop > 0)
+        # Detection mới nhất (trừ hiện tại) cách đây >= time_window giây: binary search
+        i = min(int(np.searchsorted(times, current_time - time_window, side='right')) - 1, count - 2)
+        # Chỉnh biên do làm tròn float (điều kiện gốc: current_time - t >= time_window)
+        while i >= 0 and current_time - times[i] < time_window:
+            i -= 1
+        while i + 1 <= count - 2 and current_time - times[i + 1] >= time_window:
+            i += 1
+        if i < 0:
+            return 0.0
         
-        return 0.0
+        prev_hip_y = self.history.centroids[i, 1]
+        frame_h = self.last_features.get('bbox_height', 1) * 2  # Ước lượng frame height
+        drop = (current_hip_y - prev_hip_y) / max(frame_h, 1)
+        return max(0.0, float(drop))  # Chỉ trả về nếu rơi xuống (drop > 0)
     
     def get_hip_speed_norm(self) -> float:
         """
         ★ HIP SPEED: Vận tốc hip normalized (px/s / frame_height)
         Dùng để phát hiện ngã nhanh
         """
-        if len(self.detections) < 2:
-            return 0.0
-        
-        recent = self.detections[-10:]  # Last 10 frames
-        times = self.timestamps[-10:]
-        
-        if len(recent) < 2:
+        if len(self.history) < 2:
             return 0.0
         
-        # Extract hip y positions
-        hip_ys = [d['features']['centroid'][1] for d in recent]
-        
-        # Calculate velocity
-        dy = hip_ys[-1] - hip_ys[0]
-        dt = times[-1] - times[0]
+        # Hip dy + dt của last 10 frames
+        dt, _, dy = self.history.delta(10)
         
         if dt < 0.01:
             return 0.0
@@ -202,88 +417,361 @@ class MultiPersonTracker:
         self.max_distance = 150  # Was 100 → Tăng để tránh mất track
         self.min_hits = 2  # NEW: Track phải tồn tại 2 frames mới valid (nhanh hơn)
         
+        # Association: cost = khoảng cách centroid (/ max_distance), trộn thêm 1 - OKS
+        # của keypoints nếu oks_weight > 0; cặp không thể (xa quá / OKS quá thấp) bị gate
+        association_config = tracking_config.get('association', {})
+        self.oks_weight = float(association_config.get('oks_weight', 0.0))
+        self.gate_distance = float(association_config.get('gate_distance', self.max_distance))
+        self.min_oks = float(association_config.get('min_oks', 0.1))
+        self.kpt_conf = float(config.get('pose', {}).get('kpt_conf', 0.30))
+        
+        # Phòng đông người: spatial grid (ô = gate_distance) chỉ sinh cặp track ↔ detection
+        # ở gần nhau, Hungarian giải riêng từng thành phần liên thông (ít track hơn → 1 ma trận dense)
+        # Mặc định 150 theo benchmarks.tracker_grid: grid nhanh bằng 0.64x dense ở 100 track
+        # (chậm hơn), 1.24x ở 200 track → điểm hoà vào khoảng 150
+        self.grid_min_tracks = int(association_config.get('grid_min_tracks', 150))
+        
         self.tracks: Dict[int, PersonTrack] = {}
         
-    def update(self, detections: List[Dict]) -> Dict[int, PersonTrack]:
+        # Kalman state + covariance của mọi track (predict / update 1 lần / frame)
+        self.kalman_bank = KalmanBank()
+        
+        # Số lần track được giữ bởi detection conf thấp (stage 2)
+        self.low_conf_matches = 0
+        
+        # Lifecycle listeners: callback(event: TrackEvent, track: PersonTrack)
+        # Mọi store per-track (state machine, motion history, feature buffer...)
+        # subscribe để dọn dữ liệu khi track bị xóa
+        self.lifecycle_listeners = []
+    
+    def add_lifecycle_listener(self, callback: Callable):
+        """Subscribe to track created / lost / removed events"""
+        self.lifecycle_listeners.append(callback)
+    
+    def _notify(self, event: TrackEvent, track: PersonTrack):
+        for callback in self.lifecycle_listeners:
+            callback(event, track)
+    
+    def _create_track(self, detection: Dict) -> PersonTrack:
+        track = PersonTrack(detection, self.kalman_bank)
+        self.tracks[track.track_id] = track
+        self._notify(TrackEvent.CREATED, track)
+        return track
+    
+    def _mark_disappeared(self, track: PersonTrack):
+        track.mark_disappeared()
+        if track.disappeared == 1:
+            self._notify(TrackEvent.LOST, track)
+        
+    def update(self, detections: List[Dict], low_detections: List[Dict] = None) -> Dict[int, PersonTrack]:
         """
         Update tracks with new detections
+        low_detections: detections conf thấp (pose.low_conf_tracking), chỉ dùng để
+                        giữ track không match được detection conf cao
         Returns: Dict of VALID tracks (min_hits >= 3)
         """
-        # If no tracks exist, create new ones
+        low_detections = low_detections or []
+        
+        # If no tracks exist, create new ones (chỉ từ detections conf cao)
         if len(self.tracks) == 0:
             for detection in detections:
-                track = PersonTrack(detection)
-                self.tracks[track.track_id] = track
+                self._create_track(detection)
             # Chỉ return tracks đủ min_hits
-            return {tid: t for tid, t in self.tracks.items() if len(t.detections) >= self.min_hits}
+            return {tid: t for tid, t in self.tracks.items() if t.hits >= self.min_hits}
         
         # If no detections, mark all as disappeared
-        if len(detections) == 0:
+        if len(detections) == 0 and len(low_detections) == 0:
             for track in self.tracks.values():
-                track.mark_disappeared()
+                self._mark_disappeared(track)
             self._remove_disappeared_tracks()
             # Chỉ return tracks valid
-            return {tid: t for tid, t in self.tracks.items() if len(t.detections) >= self.min_hits}
+            return {tid: t for tid, t in self.tracks.items() if t.hits >= self.min_hits}
         
         # Both tracks and detections exist - match them
-        self._match_detections_to_tracks(detections)
+        self._match_detections_to_tracks(detections, low_detections)
         
         # Chỉ return tracks valid
-        return {tid: t for tid, t in self.tracks.items() if len(t.detections) >= self.min_hits}
+        return {tid: t for tid, t in self.tracks.items() if t.hits >= self.min_hits}
+    
+    def propagate(self) -> Dict[int, PersonTrack]:
+        """
+        Frame bị bỏ qua inference: propagate mọi track bằng Kalman predict
+        Returns: Dict of VALID tracks (giống update)
+        """
+        if self.tracks:
+            tracks = list(self.tracks.values())
+            rows = np.array([track.kalman.row for track in tracks])
+            previous = self.kalman_bank.state[rows, :2]
+            delta = self.kalman_bank.predict(rows) - previous
+            for track, (dx, dy) in zip(tracks, delta):
+                track.shift(dx, dy)
+        
+        return {tid: t for tid, t in self.tracks.items() if t.hits >= self.min_hits}
     
-    def _match_detections_to_tracks(self, detections: List[Dict]):
-        """Match detections to existing tracks using Hungarian algorithm"""
+    def _match_detections_to_tracks(self, detections: List[Dict], low_detections: List[Dict]):
+        """
+        Match detections to existing tracks using Hungarian algorithm
+        2 stage (ByteTrack): detections conf cao ↔ mọi track, rồi track còn lại ↔ detections conf thấp
+        """
         
-        # Get track IDs and predicted positions
+        # Get track IDs and predicted positions (1 lần Kalman predict cho mọi track)
         track_ids = list(self.tracks.keys())
-        
-        # Build cost matrix (distance between predictions and detections)
-        cost_matrix = np.zeros((len(track_ids), len(detections)))
-        
-        for i, track_id in enumerate(track_ids):
-            track = self.tracks[track_id]
-            pred_x, pred_y = track.predict()
-            
-            for j, detection in enumerate(detections):
-                det_x, det_y = detection['features']['centroid']
-                
-                # Euclidean distance
-                distance = np.sqrt((pred_x - det_x)**2 + (pred_y - det_y)**2)
-                cost_matrix[i, j] = distance
-        
-        # Hungarian algorithm
-        row_indices, col_indices = linear_sum_assignment(cost_matrix)
-        
-        # Track which detections and tracks are matched
-        matched_detections = set()
-        matched_tracks = set()
+        tracks = [self.tracks[track_id] for track_id in track_ids]
+        predicted = self.kalman_bank.predict(np.array([track.kalman.row for track in tracks]))
+        
+        # Stage 1: cost matrix + gating, Hungarian chỉ trên các cặp còn lại
+        matches = self._match(tracks, predicted, detections)
+        assigned = [(row, detections[col]) for row, col in matches]
+        matched_detections = {col for _, col in matches}
+        
+        # Stage 2: track chưa match ↔ detections conf thấp (người bị che / thiếu sáng lúc ngã)
+        if low_detections:
+            matched_rows = {row for row, _ in matches}
+            remaining = [row for row in range(len(tracks)) if row not in matched_rows]
+            low_matches = self._match([tracks[row] for row in remaining], predicted[remaining], low_detections)
+            assigned += [(remaining[row], low_detections[col]) for row, col in low_matches]
+            self.low_conf_matches += len(low_matches)
         
         # Process matches
-        for row, col in zip(row_indices, col_indices):
-            if cost_matrix[row, col] > self.max_distance:
-                continue  # Too far, ignore match
-            
+        matched_tracks = set()
+        for row, detection in assigned:
             track_id = track_ids[row]
-            detection = detections[col]
-            
-            self.tracks[track_id].update(detection)
-            matched_detections.add(col)
+            self.tracks[track_id].record_detection(detection)
             matched_tracks.add(track_id)
         
+        # Kalman update của mọi track được match: 1 lần
+        if matched_tracks:
+            matched_ids = [track_id for track_id in track_ids if track_id in matched_tracks]
+            self.kalman_bank.update(
+                np.array([self.tracks[track_id].kalman.row for track_id in matched_ids]),
+                np.array([self.tracks[track_id].last_features['centroid'] for track_id in matched_ids])
+            )
+        
         # Handle unmatched tracks (mark disappeared)
         for track_id in track_ids:
             if track_id not in matched_tracks:
-                self.tracks[track_id].mark_disappeared()
+                self._mark_disappeared(self.tracks[track_id])
         
-        # Handle unmatched detections (create new tracks)
+        # Handle unmatched detections (create new tracks, chỉ từ detections conf cao)
         for j, detection in enumerate(detections):
             if j not in matched_detections:
-                track = PersonTrack(detection)
-                self.tracks[track.track_id] = track
+                self._create_track(detection)
         
         # Remove tracks that disappeared too long
         self._remove_disappeared_tracks()
     
+    def _match(self, tracks: List[PersonTrack], predicted: np.ndarray,
+               detections: List[Dict]) -> List[Tuple[int, int]]:
+        """1 stage association → [(index track, index detection)]"""
+        if len(tracks) == 0 or len(detections) == 0:
+            return []
+        
+        if len(tracks) >= self.grid_min_tracks:
+            return self._match_sparse(tracks, predicted, detections)
+        
+        cost_matrix, gated = self._cost_matrix(tracks, predicted, detections)
+        return self._assign(cost_matrix, gated)
+    
+    def _match_sparse(self, tracks: List[PersonTrack], predicted: np.ndarray,
+                      detections: List[Dict]) -> List[Tuple[int, int]]:
+        """
+        Như _cost_matrix + _assign nhưng chỉ trên các cặp cùng / kề ô grid:
+        cặp bị gate không bao giờ được chọn (luôn có cột "không match") nên nghiệm tối ưu
+        = nghiệm của từng thành phần liên thông trong đồ thị các cặp qua được gate
+        """
+        centroids = np.array([detection['features']['centroid'] for detection in detections], dtype=float)
+        rows, cols = self._grid_candidates(predicted, centroids)
+        
+        distance = np.hypot(predicted[rows, 0] - centroids[cols, 0], predicted[rows, 1] - centroids[cols, 1])
+        keep = distance <= self.gate_distance
+        rows, cols = rows[keep], cols[keep]
+        cost = distance[keep] / self.max_distance
+        
+        if self.oks_weight > 0 and len(rows):
+            oks = self._keypoint_similarity(tracks, predicted, detections, rows, cols)
+            has_oks = ~np.isnan(oks)
+            cost[has_oks] = (1 - self.oks_weight) * cost[has_oks] + self.oks_weight * (1 - oks[has_oks])
+            keep = ~has_oks | (oks >= self.min_oks)
+            rows, cols, cost = rows[keep], cols[keep], cost[keep]
+        
+        if len(rows) == 0:
+            return []
+        
+        # Thành phần liên thông của đồ thị 2 phía (node: N tracks rồi M detections)
+        num_tracks = len(tracks)
+        num_nodes = num_tracks + len(detections)
+        graph = coo_matrix((np.ones(len(rows)), (rows, num_tracks + cols)), shape=(num_nodes, num_nodes))
+        num_components, labels = connected_components(graph, directed=False)
+        edge_labels = labels[rows]
+        
+        # Thành phần chỉ có 1 track hoặc 1 detection: nghiệm = cặp cost nhỏ nhất (nếu tốt hơn "không match")
+        track_counts = np.bincount(labels[:num_tracks], minlength=num_components)
+        det_counts = np.bincount(labels[num_tracks:], minlength=num_components)
+        simple = np.minimum(track_counts, det_counts)[edge_labels] == 1
+        
+        order = np.lexsort((cost, edge_labels))
+        order = order[simple[order]]
+        first = np.ones(len(order), dtype=bool)
+        first[1:] = edge_labels[order[1:]] != edge_labels[order[:-1]]
+        best = order[first & (cost[order] <= self._unmatched_cost())]
+        matches = list(zip(rows[best].tolist(), cols[best].tolist()))
+        
+        # Thành phần còn lại: Hungarian riêng trên ma trận dense nhỏ
+        complex_edges = np.flatnonzero(~simple)
+        if len(complex_edges) == 0:
+            return matches
+        
+        # Chỉ số track / detection bên trong thành phần của nó (hàng / cột của ma trận nhỏ)
+        track_order, track_start, local_row = self._component_index(labels[:num_tracks], track_counts)
+        det_order, det_start, local_col = self._component_index(labels[num_tracks:], det_counts)
+        
+        complex_edges = complex_edges[np.argsort(edge_labels[complex_edges], kind='stable')]
+        bounds = np.flatnonzero(np.diff(edge_labels[complex_edges])) + 1
+        unmatched_cost = self._unmatched_cost()
+        for edges in np.split(complex_edges, bounds):
+            label = edge_labels[edges[0]]
+            num_rows, num_cols = track_counts[label], det_counts[label]
+            
+            # [cặp | cột "không match"], cặp không có cạnh = bị gate
+            matrix = np.full((num_rows, num_cols + num_rows), unmatched_cost)
+            matrix[:, :num_cols] = GATED_COST
+            matrix[local_row[rows[edges]], local_col[cols[edges]]] = cost[edges]
+            row_indices, col_indices = linear_sum_assignment(matrix)
+            
+            real = (col_indices < num_cols)
+            real[real] = matrix[row_indices[real], col_indices[real]] < GATED_COST
+            matches.extend(zip(
+                track_order[track_start[label] + row_indices[real]].tolist(),
+                det_order[det_start[label] + col_indices[real]].tolist()
+            ))
+        
+        return matches
+    
+    @staticmethod
+    def _component_index(labels: np.ndarray, counts: np.ndarray) -> Tuple[np.ndarray, np.ndarray, np.ndarray]:
+        """
+        Node sắp theo thành phần: order[start[label] + k] = node thứ k của thành phần label
+        Returns: (order, start, local) - local[node] = k
+        """
+        order = np.argsort(labels, kind='stable')
+        start = np.cumsum(counts) - counts
+        local = np.empty(len(labels), dtype=np.int64)
+        local[order] = np.arange(len(labels)) - start[labels[order]]
+        return order, start, local
+    
+    def _grid_candidates(self, predicted: np.ndarray, centroids: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Uniform grid, ô = gate_distance: cặp trong gate chắc chắn nằm ở 9 ô quanh track
+        Returns: (rows, cols) - mọi cặp (track, detection) ở ô kề nhau
+        """
+        cell = max(self.gate_distance, 1.0)
+        track_cells = np.floor(predicted / cell).astype(np.int64)
+        det_cells = np.floor(centroids / cell).astype(np.int64)
+        
+        # (cx, cy) → 1 key; lề 1 ô để ô lân cận không tràn sang cột khác
+        low = np.minimum(track_cells.min(axis=0), det_cells.min(axis=0)) - 1
+        track_cells -= low
+        det_cells -= low
+        stride = max(track_cells[:, 1].max(), det_cells[:, 1].max()) + 2
+        
+        det_keys = det_cells[:, 0] * stride + det_cells[:, 1]
+        order = np.argsort(det_keys, kind='stable')
+        sorted_keys = det_keys[order]
+        
+        # Detections của 9 ô quanh mỗi track = 9 khoảng liên tiếp trong sorted_keys
+        neighbor_keys = (
+            (track_cells[:, None, 0] + _GRID_NEIGHBORS[None, :, 0]) * stride
+            + track_cells[:, None, 1] + _GRID_NEIGHBORS[None, :, 1]
+        ).ravel()
+        starts = np.searchsorted(sorted_keys, neighbor_keys, side='left')
+        counts = np.searchsorted(sorted_keys, neighbor_keys, side='right') - starts
+        
+        rows = np.repeat(np.arange(len(predicted)).repeat(len(_GRID_NEIGHBORS)), counts)
+        offsets = np.arange(counts.sum()) - np.repeat(np.cumsum(counts) - counts, counts)
+        cols = order[np.repeat(starts, counts) + offsets]
+        return rows, cols
+    
+    def _cost_matrix(self, tracks: List[PersonTrack], predicted: np.ndarray,
+                     detections: List[Dict]) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Cost (N tracks, M detections) tính 1 lần cho mọi cặp
+        Returns: (cost, gated) - gated = cặp không thể ghép
+        """
+        centroids = np.array([detection['features']['centroid'] for detection in detections], dtype=float)
+        distance = np.hypot(
+            predicted[:, 0, None] - centroids[None, :, 0],
+            predicted[:, 1, None] - centroids[None, :, 1]
+        )
+        cost = distance / self.max_distance
+        gated = distance > self.gate_distance
+        
+        # OKS chỉ cho các cặp qua được gate khoảng cách
+        if self.oks_weight > 0 and not gated.all():
+            rows, cols = np.nonzero(~gated)
+            oks = self._keypoint_similarity(tracks, predicted, detections, rows, cols)
+            has_oks = ~np.isnan(oks)
+            rows, cols, oks = rows[has_oks], cols[has_oks], oks[has_oks]
+            cost[rows, cols] = (1 - self.oks_weight) * cost[rows, cols] + self.oks_weight * (1 - oks)
+            gated[rows, cols] = oks < self.min_oks
+        
+        return cost, gated
+    
+    def _keypoint_similarity(self, tracks: List[PersonTrack], predicted: np.ndarray,
+                             detections: List[Dict], rows: np.ndarray, cols: np.ndarray) -> np.ndarray:
+        """
+        Object Keypoint Similarity của các cặp (tracks[rows[k]], detections[cols[k]]):
+        keypoints của track dịch tới vị trí Kalman dự đoán, scale = diện tích bbox detection
+        NaN: không có keypoint nào đủ conf ở cả 2
+        """
+        missing = np.zeros((17, 3))
+        track_kpts = np.stack([
+            track.last_keypoints if track.last_keypoints is not None else missing for track in tracks
+        ]).astype(float)
+        shift = predicted - np.array([track.last_centroid for track in tracks], dtype=float)
+        track_kpts[:, :, :2] += shift[:, None, :]
+        
+        det_kpts = np.stack([
+            detection.get('keypoints') if detection.get('keypoints') is not None else missing
+            for detection in detections
+        ]).astype(float)
+        area = np.array([max(detection['bbox'][2] * detection['bbox'][3], 1) for detection in detections],
+                        dtype=float)
+        
+        a, b = track_kpts[rows], det_kpts[cols]
+        visible = (a[:, :, 2] >= self.kpt_conf) & (b[:, :, 2] >= self.kpt_conf)
+        d2 = ((a[:, :, :2] - b[:, :, :2]) ** 2).sum(axis=2)
+        e = d2 / (2 * area[cols, None] * (2 * COCO_SIGMAS) ** 2)
+        count = visible.sum(axis=1)
+        
+        with np.errstate(invalid='ignore', divide='ignore'):
+            return np.where(count > 0, (np.exp(-e) * visible).sum(axis=1) / count, np.nan)
+    
+    def _assign(self, cost: np.ndarray, gated: np.ndarray) -> List[Tuple[int, int]]:
+        """
+        Hungarian trên các hàng / cột còn ít nhất 1 cặp không bị gate → [(row, col)]
+        Mỗi track có thêm cột "không match" với cost = cost lớn nhất qua được gate:
+        track mất detection không bị ép lấy detection của người bên cạnh (dây chuyền đổi ID)
+        """
+        rows = np.flatnonzero(~gated.all(axis=1))
+        cols = np.flatnonzero(~gated.all(axis=0))
+        if len(rows) == 0 or len(cols) == 0:
+            return []
+        
+        sub_cost = np.where(gated, GATED_COST, cost)[np.ix_(rows, cols)]
+        unmatched = np.full((len(rows), len(rows)), self._unmatched_cost())
+        row_indices, col_indices = linear_sum_assignment(np.hstack([sub_cost, unmatched]))
+        return [
+            (int(rows[r]), int(cols[c])) for r, c in zip(row_indices, col_indices)
+            if c < len(cols) and not gated[rows[r], cols[c]]
+        ]
+    
+    def _unmatched_cost(self) -> float:
+        """Cost của cặp xấu nhất còn qua được gate"""
+        cost = self.gate_distance / self.max_distance
+        if self.oks_weight > 0:
+            cost = (1 - self.oks_weight) * cost + self.oks_weight * (1 - self.min_oks)
+        return cost
+    
     def _remove_disappeared_tracks(self):
         """Remove tracks that have disappeared for too long"""
         to_remove = []
@@ -292,7 +780,9 @@ class MultiPersonTracker:
                 to_remove.append(track_id)
         
         for track_id in to_remove:
-            del self.tracks[track_id]
+            track = self.tracks.pop(track_id)
+            self.kalman_bank.release(track.kalman.row)
+            self._notify(TrackEvent.REMOVED, track)
     
     def get_track(self, track_id: int) -> PersonTrack:
         """Get track by ID"""
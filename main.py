@@ -4,7 +4,9 @@ Realtime fall detection với tất cả features
 """
 import cv2
 import time
+import os
 import argparse
+import threading
 import psutil
 from datetime import datetime
 
@@ -14,17 +16,28 @@ from core import (
     MultiPersonTracker, 
     StateMachineManager,
     FallState,
-    ImmobilityDetector
+    ImmobilityDetector,
+    AdvancedImmobilityDetector,
+    SystemClock,
+    VideoClock
 )
-from core.pose_detector import PoseDetector, draw_skeleton  # ★ Pose-based detector
+from core.capture import LatestFrameGrabber
+from core.inference_scheduler import AdaptiveInferenceScheduler
+from core.motion_gate import MotionGate
+from core.crop_inference import CropRegionPlanner
+from core.resolution_controller import DynamicResolutionController
+from core.breathing import BreathingMonitor
+from core.pose_detector import PoseDetector, draw_skeletons  # ★ Pose-based detector
 from ai import FeatureExtractor, FallClassifier
 from utils import (
     ConfigManager,
     EventLogger,
+    JsonlEventWriter,
     RiskScorer,
-    VideoRecorder
+    VideoRecorder,
+    StageProfiler
 )
-from api import WebSocketServer, AlertHandler
+from api import WebSocketServer, AlertHandler, MetricsServer
 
 
 class FallDetectionSystem:
@@ -33,42 +46,124 @@ class FallDetectionSystem:
     Tích hợp tất cả components
     """
     
-    def __init__(self, config_path: str = 'config.yaml'):
+    def __init__(
+        self,
+        config_path: str = 'config.yaml',
+        config: dict = None,
+        camera_id: str = None,
+        pose_model=None,
+        websocket_server: WebSocketServer = None,
+        clock=None
+    ):
+        """
+        Args:
+            config_path: YAML config (bỏ qua nếu truyền config)
+            config: config dict đã load sẵn (multi-camera: config riêng từng camera)
+            camera_id: ID camera (multi-camera mode)
+            pose_model: YOLO model dùng chung giữa các camera
+            websocket_server: WebSocket server dùng chung giữa các camera
+            clock: SystemClock (live) hoặc VideoClock (offline, theo PTS của video)
+        """
         # Load config
-        self.config_manager = ConfigManager(config_path)
-        self.config = self.config_manager.config
+        if config is None:
+            self.config_manager = ConfigManager(config_path)
+            config = self.config_manager.config
+        self.config = config
+        self.camera_id = camera_id
+        self.clock = clock if clock is not None else SystemClock()
         
         print("\n" + "="*60)
-        print("FALL DETECTION SYSTEM - Professional Edition")
+        if camera_id is None:
+            print("FALL DETECTION SYSTEM - Professional Edition")
+        else:
+            print(f"FALL DETECTION SYSTEM - Camera {camera_id}")
         print("="*60 + "\n")
         
         # Initialize components
         print("[INIT] Initializing components...")
         
         # ★ Dùng PoseDetector thay vì FallDetector (contour-based)
-        self.detector = PoseDetector(self.config)
+        self.detector = PoseDetector(self.config, model=pose_model, camera_id=camera_id)
         self.tracker = MultiPersonTracker(self.config)
-        self.state_manager = StateMachineManager(self.config)
-        self.immobility_detector = ImmobilityDetector(self.config)
+        self.state_manager = StateMachineManager(self.config, clock=self.clock)
+        # Keypoint flow (sparse LK): chuyển động từng chi + micro-motion ngực
+        flow_config = self.config.get('detection', {}).get('keypoint_flow', {})
+        self.keypoint_flow_enabled = flow_config.get('enabled', False)
+        if self.keypoint_flow_enabled:
+            self.immobility_detector = AdvancedImmobilityDetector(self.config)
+        else:
+            self.immobility_detector = ImmobilityDetector(self.config)
+        
+        # Nhịp thở (sliding DFT) cho người đang FALLEN / ALARM
+        self.breathing_monitor = BreathingMonitor(self.config)
+        self.immobility_detector.frame_diff = self.detector.frame_diff
         
         # AI components
         self.feature_extractor = FeatureExtractor(self.config)
         self.classifier = FallClassifier(self.config)
         
         # Utilities
-        self.logger = EventLogger(self.config)
+        self.logger = EventLogger(self.config, camera_id=camera_id)
         self.risk_scorer = RiskScorer(self.config)
         self.recorder = VideoRecorder(self.config)
         
         # API
-        self.websocket_server = WebSocketServer(self.config)
-        self.alert_handler = AlertHandler(self.config, self.websocket_server)
+        if websocket_server is None:
+            websocket_server = WebSocketServer(self.config, clock=self.clock)
+        self.websocket_server = websocket_server
+        self.alert_handler = AlertHandler(
+            self.config, self.websocket_server, camera_id=camera_id, clock=self.clock
+        )
+        
+        # Track lifecycle: mọi store per-track dọn dữ liệu khi track bị xóa
+        for store in (
+            self.state_manager,
+            self.immobility_detector,
+            self.breathing_monitor,
+            self.feature_extractor,
+            self.alert_handler,
+        ):
+            self.tracker.add_lifecycle_listener(store.on_track_event)
+        
+        # ★ Adaptive inference stride (bỏ qua YOLO khi mọi người đều calm)
+        self.scheduler = AdaptiveInferenceScheduler(self.config)
+        
+        # Motion gate (MOG2 downscaled): cảnh tĩnh → dùng lại detections cũ
+        self.motion_gate = MotionGate(self.config)
+        
+        # Crop inference: full-frame mỗi K frame, còn lại chỉ crop quanh track
+        self.crop_planner = CropRegionPlanner(self.config)
+        
+        # Dynamic imgsz: người to trong khung hình → inference ở size nhỏ hơn
+        self.resolution_controller = DynamicResolutionController(self.config)
+        if self.resolution_controller.enabled and getattr(self.detector.model, 'static_imgsz', None):
+            print("[SYSTEM] Pose model has a static input size, dynamic imgsz disabled")
+            self.resolution_controller.enabled = False
+        
+        # Per-stage latency histograms (p50/p95/p99), dump định kỳ vào DB
+        monitoring_config = self.config.get('monitoring', {})
+        self.profiler = StageProfiler(
+            camera_id=camera_id,
+            enabled=monitoring_config.get('profiling', True)
+        )
+        self.stage_stats_interval = float(monitoring_config.get('stage_stats_interval', 60))
+        self._last_stage_dump = time.time()
+        
+        # Offline mode: JSONL journal của transitions + alarms
+        self.event_journal = None
         
         # System state
         self.frame_count = 0
         self.fps = 0
+        self.latency_ms = 0.0     # Capture-to-decision latency
+        self.dropped_frames = 0   # Frames overwritten before processing
         self.start_time = time.time()
         
+        # FPS / latency window
+        self._fps_start_time = self.start_time
+        self._fps_frame_count = 0
+        self._latency_sum = 0.0
+        
         print("[INIT] Initialization complete!\n")
     
     def run(self, camera_source=None):
@@ -79,79 +174,316 @@ class FallDetectionSystem:
             camera_source = self.config['camera']['source']
         
         # Open camera
-        cap = cv2.VideoCapture(camera_source)
-        
-        if not cap.isOpened():
-            print(f"[ERROR] Cannot open camera: {camera_source}")
+        cap, grabber = open_camera(camera_source, self.config['camera'])
+        if cap is None:
             return
         
-        # Set camera properties
-        cam_config = self.config['camera']
-        cap.set(cv2.CAP_PROP_FRAME_WIDTH, cam_config['width'])
-        cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cam_config['height'])
-        cap.set(cv2.CAP_PROP_FPS, cam_config['fps'])
-        
         # Start API server
         self.websocket_server.start()
         
+        # Metrics endpoint (đọc trực tiếp counter của system này)
+        metrics_server = MetricsServer(
+            self.config, lambda: {self.camera_id: self}, self.websocket_server
+        )
+        metrics_server.start()
+        
         print("\n[SYSTEM] Starting detection...")
         print("Press 'q' to quit\n")
         
-        # FPS calculation
-        fps_start_time = time.time()
-        fps_frame_count = 0
-        
         try:
             while True:
-                ret, frame = cap.read()
+                with self.profiler.stage('capture'):
+                    ret, frame, capture_time, skipped = grabber.read(timeout=1.0)
                 if not ret:
-                    print("[WARNING] Failed to read frame")
-                    break
-                
-                current_time = time.time()
-                
-                # Process frame
-                self._process_frame(frame, current_time)
+                    if grabber.stopped:
+                        print("[WARNING] Failed to read frame")
+                        break
+                    continue  # Camera chậm, chờ frame tiếp theo
                 
-                # Calculate FPS
-                fps_frame_count += 1
-                if current_time - fps_start_time >= 1.0:
-                    self.fps = fps_frame_count / (current_time - fps_start_time)
-                    fps_start_time = current_time
-                    fps_frame_count = 0
+                # Process frame (timestamp = thời điểm capture)
+                self._process_frame(
+                    frame, capture_time, skip_inference=not self.needs_inference()
+                )
+                self._update_frame_stats(capture_time, skipped)
                 
                 # Display
                 if self.config['debug']['show_video']:
-                    display = self._create_display(frame)
+                    with self.profiler.stage('display'):
+                        display = self._create_display(frame)
                     cv2.imshow('Fall Detection System', display)
                 
                 # Key press
                 key = cv2.waitKey(1) & 0xFF
                 if key == ord('q'):
                     break
-                
-                self.frame_count += 1
         
         except KeyboardInterrupt:
             print("\n[SYSTEM] Interrupted by user")
         
         finally:
+            grabber.stop()
             cap.release()
-            cv2.destroyAllWindows()
+            if self.config['debug']['show_video']:
+                cv2.destroyAllWindows()
+            metrics_server.stop()
             self.websocket_server.stop()
-            print("\n[SYSTEM] Shutdown complete")
+            self.detector.floor_map.save()
+            print(f"\n[SYSTEM] Frames processed: {self.frame_count}, "
+                  f"dropped: {self.dropped_frames}")
+            self._print_scheduler_stats()
+            print("[SYSTEM] Shutdown complete")
+    
+    def run_offline(self, video_path: str, events_path: str = None, annotated_path: str = None):
+        """
+        Xử lý video nhanh nhất có thể (headless, không waitKey)
+        Clock chạy theo PTS của video → ngưỡng thời gian vẫn đúng
+        Mọi state transition + alarm được ghi vào JSONL
+        annotated_path: ghi thêm video có overlay (skeleton, state, risk) như màn hình live
+        """
+        cap = cv2.VideoCapture(video_path)
+        
+        if not cap.isOpened():
+            print(f"[ERROR] Cannot open video: {video_path}")
+            return
+        
+        video_fps = cap.get(cv2.CAP_PROP_FPS) or self.config['camera']['fps']
+        total_frames = int(cap.get(cv2.CAP_PROP_FRAME_COUNT))
+        
+        if not isinstance(self.clock, VideoClock):
+            print("[WARNING] Offline mode without VideoClock - thresholds use wall time")
+        else:
+            self.clock.fps = video_fps
+        
+        if events_path is None:
+            events_path = os.path.splitext(video_path)[0] + '.events.jsonl'
+        self.event_journal = JsonlEventWriter(events_path)
+        self.state_manager.add_transition_listener(self._journal_transition)
+        
+        print(f"\n[OFFLINE] Processing {video_path} ({total_frames} frames @ {video_fps:.1f} fps)")
+        print(f"[OFFLINE] Events → {events_path}\n")
+        
+        annotated_writer = None
+        if annotated_path is not None:
+            width = int(cap.get(cv2.CAP_PROP_FRAME_WIDTH))
+            height = int(cap.get(cv2.CAP_PROP_FRAME_HEIGHT))
+            fourcc = cv2.VideoWriter_fourcc(*self.recorder.video_codec)
+            annotated_writer = cv2.VideoWriter(annotated_path, fourcc, video_fps, (width, height))
+            if not annotated_writer.isOpened():
+                print(f"[ERROR] Cannot write annotated video: {annotated_path}")
+                annotated_writer = None
+        
+        wall_start = time.time()
+        frame_index = 0
+        
+        try:
+            while True:
+                with self.profiler.stage('capture'):
+                    ret, frame = cap.read()
+                if not ret:
+                    break
+                
+                if isinstance(self.clock, VideoClock):
+                    timestamp = self.clock.update_from_capture(cap, frame_index)
+                else:
+                    timestamp = self.clock.now()
+                
+                self._process_frame(
+                    frame, timestamp, skip_inference=not self.needs_inference()
+                )
+                
+                if annotated_writer is not None:
+                    with self.profiler.stage('display'):
+                        annotated_writer.write(self._create_display(frame))
+                
+                self.frame_count += 1
+                frame_index += 1
+                
+                # Progress
+                if frame_index % 500 == 0:
+                    elapsed = time.time() - wall_start
+                    self.fps = frame_index / max(elapsed, 1e-6)
+                    print(f"[OFFLINE] {frame_index}/{total_frames} frames, "
+                          f"{self.fps:.1f} fps ({self.fps / video_fps:.1f}x realtime)")
+        
+        except KeyboardInterrupt:
+            print("\n[OFFLINE] Interrupted by user")
+        
+        finally:
+            cap.release()
+            if annotated_writer is not None:
+                annotated_writer.release()
+                print(f"[OFFLINE] Annotated video → {annotated_path}")
+            
+            elapsed = time.time() - wall_start
+            video_seconds = frame_index / video_fps if video_fps else 0.0
+            self.event_journal.write({
+                'type': 'summary',
+                'frames': frame_index,
+                'video_seconds': video_seconds,
+                'wall_seconds': elapsed,
+                'speedup': video_seconds / max(elapsed, 1e-6),
+                'inference': self.scheduler.get_stats(),
+                'motion_gate': self.motion_gate.get_stats(),
+                'crop_inference': self.crop_planner.get_stats(),
+                'dynamic_imgsz': self.resolution_controller.get_stats(),
+            })
+            self.event_journal.close()
+            
+            print(f"\n[OFFLINE] {frame_index} frames in {elapsed:.1f}s "
+                  f"({video_seconds / max(elapsed, 1e-6):.1f}x realtime), "
+                  f"{self.event_journal.count} records written")
+            self._print_scheduler_stats()
+    
+    def _journal_transition(self, track_id, old_state, new_state, timestamp):
+        """State transition → JSONL"""
+        if self.event_journal is None:
+            return
+        
+        self.event_journal.write({
+            'type': 'transition',
+            't': timestamp,
+            'frame': self.frame_count,
+            'camera_id': self.camera_id,
+            'track_id': track_id,
+            'from': old_state.value,
+            'to': new_state.value,
+        })
+    
+    def _update_frame_stats(self, capture_time: float, skipped: int = 0):
+        """Update FPS, capture-to-decision latency and dropped frame count"""
+        current_time = time.time()
+        
+        self.dropped_frames += skipped
+        self._latency_sum += current_time - capture_time
+        self._fps_frame_count += 1
+        
+        if current_time - self._fps_start_time >= 1.0:
+            self.fps = self._fps_frame_count / (current_time - self._fps_start_time)
+            self.latency_ms = self._latency_sum / self._fps_frame_count * 1000.0
+            self._fps_start_time = current_time
+            self._fps_frame_count = 0
+            self._latency_sum = 0.0
+        
+        self.frame_count += 1
+    
+    def needs_inference(self) -> bool:
+        """Adaptive stride: có cần chạy pose inference cho frame này không"""
+        return self.scheduler.should_infer(
+            self.tracker.get_all_tracks(), self.state_manager
+        )
+    
+    def motion_gated(self, frame) -> bool:
+        """Motion gate: cảnh tĩnh + mọi người STANDING → bỏ qua YOLO cho frame này"""
+        return self.motion_gate.allows_skip(
+            frame, self.tracker.get_all_tracks(), self.state_manager
+        )
+    
+    def plan_crop_regions(self, frame):
+        """Crop inference: vùng crop quanh các track, None → full-frame detection"""
+        return self.crop_planner.plan(self.tracker.get_all_tracks(), frame.shape)
     
-    def _process_frame(self, frame, timestamp):
-        """Process single frame"""
+    def select_imgsz(self, frame):
+        """Dynamic imgsz cho full-frame inference (None → pose.imgsz)"""
+        return self.resolution_controller.select(self.tracker.get_all_tracks(), frame.shape)
+    
+    def record_inference(self, imgsz, seconds: float, timestamp: float, people: int):
+        """Latency theo imgsz (+ JSONL ở offline mode)"""
+        if not self.resolution_controller.enabled:
+            return
+        
+        self.resolution_controller.record(imgsz, seconds)
+        if self.event_journal is not None:
+            self.event_journal.write({
+                'type': 'inference',
+                't': timestamp,
+                'frame': self.frame_count,
+                'camera_id': self.camera_id,
+                'imgsz': imgsz,
+                'reason': self.resolution_controller.reason,
+                'latency_ms': round(seconds * 1000.0, 2),
+                'people': people,
+            })
+    
+    def _print_scheduler_stats(self):
+        stats = self.scheduler.get_stats()
+        if stats['enabled']:
+            print(f"[SYSTEM] Inference skipped: {stats['skipped_frames']}/"
+                  f"{stats['total_frames']} frames ({stats['skip_ratio'] * 100:.1f}%)")
+        
+        gate_stats = self.motion_gate.get_stats()
+        if gate_stats['enabled']:
+            print(f"[SYSTEM] Motion gate: {gate_stats['gated_frames']}/"
+                  f"{gate_stats['checked_frames']} frames reused "
+                  f"({gate_stats['gate_ratio'] * 100:.1f}%)")
+        
+        crop_stats = self.crop_planner.get_stats()
+        if crop_stats['enabled']:
+            print(f"[SYSTEM] Crop inference: {crop_stats['crop_frames']} crop / "
+                  f"{crop_stats['full_frames']} full frames, "
+                  f"{crop_stats['pixel_ratio'] * 100:.0f}% of full-frame input pixels")
+        
+        imgsz_stats = self.resolution_controller.get_stats()
+        if imgsz_stats['enabled']:
+            sizes = ", ".join(
+                f"{size}: {count}" + (f" (p50 {imgsz_stats['latency_ms'][size]['p50_ms']:.1f}ms)"
+                                      if size in imgsz_stats['latency_ms'] else "")
+                for size, count in imgsz_stats['frames_per_size'].items()
+            )
+            print(f"[SYSTEM] Dynamic imgsz frames: {sizes}")
+    
+    def _process_frame(self, frame, timestamp, detections=None, skip_inference=False):
+        """
+        Process single frame
+        detections: kết quả từ batched inference (multi-camera), None → tự detect
+        skip_inference: frame calm → không chạy YOLO, propagate track bằng Kalman
+        """
+        
+        profiler = self.profiler
         
         # Add frame to recorder buffer
-        self.recorder.add_frame(frame, timestamp)
+        with profiler.stage('recording'):
+            self.recorder.add_frame(frame, timestamp)
         
-        # Detect persons
-        detections = self.detector.detect_persons(frame)
+        # Motion gate: background model phải thấy mọi frame
+        with profiler.stage('motion_gate'):
+            self.motion_gate.update(frame)
         
-        # Update tracker
-        tracks = self.tracker.update(detections)
+        if skip_inference:
+            # Giữ cặp frame liên tiếp cho motion energy, track dịch theo Kalman
+            self.detector.advance_frame(frame)
+            with profiler.stage('tracker_propagate'):
+                tracks = self.tracker.propagate()
+        else:
+            # Detect persons (cảnh tĩnh → dùng lại detections cũ)
+            if detections is None:
+                if self.motion_gated(frame):
+                    detections = self.detector.reuse_detections(frame, timestamp)
+                else:
+                    # Crop inference: chỉ chạy model quanh các track (None → full frame)
+                    regions = self.plan_crop_regions(frame)
+                    with profiler.stage('detect_persons'):
+                        if regions is None:
+                            imgsz = self.select_imgsz(frame)
+                            predict_start = time.perf_counter()
+                            detections = self.detector.detect_persons(frame, timestamp, imgsz=imgsz)
+                            self.record_inference(
+                                imgsz, time.perf_counter() - predict_start, timestamp, len(detections)
+                            )
+                        else:
+                            detections = self.detector.detect_persons_in_regions(
+                                frame, regions, timestamp
+                            )
+            
+            # Update tracker (+ detections conf thấp: chỉ giữ track đang có)
+            with profiler.stage('tracker_update'):
+                tracks = self.tracker.update(detections, self.detector.last_low_detections)
+        
+        # Sparse LK flow cho mọi track (1 pyramid / frame)
+        if self.keypoint_flow_enabled:
+            with profiler.stage('keypoint_flow'):
+                self.immobility_detector.update_keypoint_flow(
+                    self.detector.prev_frame, self.detector.current_frame, tracks
+                )
         
         # Process each person
         for track_id, track in tracks.items():
@@ -160,27 +492,46 @@ class FallDetectionSystem:
         # Log system stats periodically
         if self.frame_count % 300 == 0:  # Every 10 seconds at 30fps
             self._log_system_stats()
+        
+        self._maybe_dump_stage_stats()
+        self.detector.floor_map.maybe_save()
     
     def _process_person(self, track_id, track, timestamp, frame):
         """Process single person track"""
+        profiler = self.profiler
         
         # Calculate motion energy (for immobility)
-        motion_energy = self.detector.calculate_motion_energy(track.last_bbox)
-        self.immobility_detector.update_history(track_id, motion_energy)
-        immobility_score = self.immobility_detector.get_immobility_score(track_id)
+        with profiler.stage('motion_energy'):
+            motion_energy = self.detector.calculate_motion_energy(track.last_bbox)
+            self.immobility_detector.update_history(track_id, motion_energy)
+            immobility_score = self.immobility_detector.get_immobility_score(track_id)
+        
+        keypoint_motion = None
+        if self.keypoint_flow_enabled:
+            keypoint_motion = self.immobility_detector.get_keypoint_motion(track_id)
         
         # Extract features for ML
-        feature_vector = self.feature_extractor.get_feature_vector(track_id, track)
+        with profiler.stage('feature_vector'):
+            feature_vector = self.feature_extractor.get_feature_vector(track_id, track)
         
         # ML prediction
         ml_prediction = None
         if feature_vector is not None:
-            ml_prediction = self.classifier.predict(feature_vector)
+            with profiler.stage('classifier'):
+                ml_prediction = self.classifier.predict(feature_vector)
         
         # Update state machine
-        state = self.state_manager.update(
-            track_id, track, motion_energy, ml_prediction
-        )
+        with profiler.stage('state_machine'):
+            state = self.state_manager.update(
+                track_id, track, motion_energy, ml_prediction, keypoint_motion
+            )
+        
+        # Breathing rate: chỉ tính cho FALLEN / ALARM
+        if self.breathing_monitor.enabled:
+            with profiler.stage('breathing'):
+                self.breathing_monitor.update(
+                    track_id, state, track, keypoint_motion, frame, timestamp
+                )
         
         # Get state machine object
         sm = self.state_manager.get_state_machine(track_id)
@@ -189,15 +540,37 @@ class FallDetectionSystem:
             return
         
         # Calculate risk score
-        risk_score = self.risk_scorer.calculate_risk_score(
-            track, sm, immobility_score, ml_prediction
-        )
+        with profiler.stage('risk_score'):
+            risk_score = self.risk_scorer.calculate_risk_score(
+                track, sm, immobility_score, ml_prediction
+            )
         
         # Handle alarms
-        self._handle_alerts(
-            track_id, track, sm, risk_score, 
-            timestamp, frame, ml_prediction
-        )
+        with profiler.stage('alerts'):
+            self._handle_alerts(
+                track_id, track, sm, risk_score, 
+                timestamp, frame, ml_prediction
+            )
+    
+    def get_stage_stats(self, window: bool = False) -> dict:
+        """
+        Per-stage latency (ms) - query được lúc đang chạy
+        Returns: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        return self.profiler.snapshot(window=window)
+    
+    def _maybe_dump_stage_stats(self):
+        """Dump window percentiles vào EventLogger định kỳ"""
+        if not self.profiler.enabled:
+            return
+        
+        now = time.time()
+        if now - self._last_stage_dump < self.stage_stats_interval:
+            return
+        
+        self.logger.log_stage_latency(self.profiler.snapshot(window=True))
+        self.profiler.reset_window()
+        self._last_stage_dump = now
     
     def _handle_alerts(
         self, track_id, track, sm, risk_score, 
@@ -225,15 +598,37 @@ class FallDetectionSystem:
                 # Start recording event
                 self.recorder.start_event_recording(timestamp)
                 
+                # Pose features là lazy view → dict thường để JSON / gửi qua process
+                features = dict(track.last_features)
+                
+                # Nhịp thở tới thời điểm alarm (None nếu chưa đủ tín hiệu)
+                breathing = self.breathing_monitor.get_estimate(track_id)
+                
                 # Trigger alarm
                 self.alert_handler.trigger_alarm(
                     track_id=track_id,
                     risk_score=risk_score,
                     state=sm.current_state.value,
                     snapshot_path=snapshot_path,
-                    features=track.last_features
+                    features=features,
+                    breathing=breathing
                 )
                 
+                if self.event_journal is not None:
+                    self.event_journal.write({
+                        'type': 'alarm',
+                        't': timestamp,
+                        'frame': self.frame_count,
+                        'camera_id': self.camera_id,
+                        'track_id': track_id,
+                        'risk_score': risk_score,
+                        'state': sm.current_state.value,
+                        'alarm_time': sm.alarm_time,
+                        'snapshot_path': snapshot_path,
+                        'ml_prediction': ml_prediction,
+                        'breathing': breathing,
+                    })
+                
                 # Log event
                 self.logger.log_event(
                     event_type='ALARM',
@@ -241,8 +636,9 @@ class FallDetectionSystem:
                     risk_score=risk_score,
                     state=sm.current_state.value,
                     snapshot_path=snapshot_path,
-                    features=track.last_features,
-                    ml_prediction=ml_prediction
+                    features=features,
+                    ml_prediction=ml_prediction,
+                    breathing=breathing
                 )
             
             # Stop recording after N seconds
@@ -252,6 +648,28 @@ class FallDetectionSystem:
                     _, video_path = self.recorder.stop_event_recording(
                         event_id, track_id
                     )
+            
+            # Đủ window nhịp thở → log thêm 1 event (lúc alarm mới có vài giây tín hiệu)
+            breathing = self.breathing_monitor.take_full_estimate(track_id)
+            if breathing is not None:
+                if self.event_journal is not None:
+                    self.event_journal.write({
+                        'type': 'breathing',
+                        't': timestamp,
+                        'frame': self.frame_count,
+                        'camera_id': self.camera_id,
+                        'track_id': track_id,
+                        'state': sm.current_state.value,
+                        'breathing': breathing,
+                    })
+                
+                self.logger.log_event(
+                    event_type='BREATHING',
+                    track_id=track_id,
+                    risk_score=risk_score,
+                    state=sm.current_state.value,
+                    breathing=breathing
+                )
         
         # WARNING level (not full alarm yet)
         elif risk_level == 'warning' and sm.current_state == FallState.FALLING:
@@ -268,36 +686,41 @@ class FallDetectionSystem:
         # Draw detections and tracks
         tracks = self.tracker.get_all_tracks()
         
+        labels = []
+        skeletons = []
         for track_id, track in tracks.items():
-            x, y, w, h = track.last_bbox
-            
             # Get state and risk
             sm = self.state_manager.get_state_machine(track_id)
             if sm is None:
                 continue
             
-            state = sm.current_state
-            
             # Calculate risk (simplified for display)
             immobility_score = self.immobility_detector.get_immobility_score(track_id)
             risk_score = self.risk_scorer.calculate_risk_score(
                 track, sm, immobility_score
             )
-            
-            # Get color based on risk
-            color = self.risk_scorer.get_risk_color(risk_score)
+            labels.append((track_id, track, sm.current_state, risk_score))
             
             # ★ Vẽ skeleton thay vì bbox (giống hình 4)
             kp = getattr(track, 'last_keypoints', None)
             if kp is not None:
-                draw_skeleton(display, kp, kpt_th=0.30, thickness=2)
+                skeletons.append(kp)
+        
+        # Skeleton của mọi người: 1 lượt vẽ + 1 lần blend (trước text để text không bị mờ)
+        draw_skeletons(display, skeletons, kpt_th=0.30, thickness=2)
+        
+        for track_id, track, state, risk_score in labels:
+            x, y, w, h = track.last_bbox
+            
+            # Get color based on risk
+            color = self.risk_scorer.get_risk_color(risk_score)
             
             # Vẫn vẽ bbox mỏng nếu muốn (optional)
             # thickness = 1 if state != FallState.ALARM else 2
             # cv2.rectangle(display, (x, y), (x+w, y+h), color, thickness)
             
             # ★ Draw info giống hình 4: confidence - ID
-            pose_conf = track.detections[-1].get('pose_conf', 0.0) if track.detections else 0.0
+            pose_conf = track.last_detection.get('pose_conf', 0.0)
             info_text = f"{pose_conf:.2f} - id_{track_id} - {state.value}"
             cv2.putText(
                 display, info_text, (x, y - 10),
@@ -313,6 +736,7 @@ class FallDetectionSystem:
             
             # ★ Debug: hiển thị pose features (optional, comment out nếu không muốn)
             if self.config.get('debug', {}).get('show_pose_debug', False):
+                features = track.last_features
                 torso_angle = features.get('torso_angle', 0.0)
                 hip_drop = track.get_hip_drop()
                 hip_speed = track.get_hip_speed_norm()
@@ -332,12 +756,14 @@ class FallDetectionSystem:
         h, w = frame.shape[:2]
         
         # Background for info
-        cv2.rectangle(frame, (10, 10), (400, 120), (0, 0, 0), -1)
-        cv2.rectangle(frame, (10, 10), (400, 120), (255, 255, 255), 2)
+        cv2.rectangle(frame, (10, 10), (400, 145), (0, 0, 0), -1)
+        cv2.rectangle(frame, (10, 10), (400, 145), (255, 255, 255), 2)
         
         # System info
         info_lines = [
-            f"FPS: {self.fps:.1f}",
+            f"FPS: {self.fps:.1f}  Latency: {self.latency_ms:.0f}ms",
+            f"Dropped: {self.dropped_frames}  "
+            f"Skipped: {self.scheduler.get_stats()['skip_ratio'] * 100:.0f}%",
             f"Tracks: {len(self.tracker.get_all_tracks())}",
             f"Alarms: {len(self.state_manager.get_alarms())}",
             f"Uptime: {int(time.time() - self.start_time)}s"
@@ -365,6 +791,302 @@ class FallDetectionSystem:
         )
 
 
+def open_camera(camera_source, cam_config: dict, frame_event=None):
+    """
+    Open camera/video and start its latest-frame capture thread
+    Returns: (cap, grabber) hoặc (None, None) nếu không mở được
+    """
+    cap = cv2.VideoCapture(camera_source)
+    
+    if not cap.isOpened():
+        print(f"[ERROR] Cannot open camera: {camera_source}")
+        return None, None
+    
+    # Set camera properties
+    cap.set(cv2.CAP_PROP_FRAME_WIDTH, cam_config['width'])
+    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, cam_config['height'])
+    cap.set(cv2.CAP_PROP_FPS, cam_config['fps'])
+    
+    # ★ Capture thread: chỉ giữ frame mới nhất cho camera live
+    # Video file thì không drop frame (đọc lần lượt)
+    is_file = isinstance(camera_source, str) and os.path.isfile(camera_source)
+    if not is_file:
+        cap.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+    
+    grabber = LatestFrameGrabber(
+        cap, drop_frames=not is_file, frame_event=frame_event
+    ).start()
+    
+    return cap, grabber
+
+
+def parse_camera_source(source):
+    """'0' → 0 (webcam index), còn lại giữ nguyên (file/RTSP URL)"""
+    if isinstance(source, str) and source.isdigit():
+        return int(source)
+    return source
+
+
+class MultiCameraSystem:
+    """
+    Nhiều camera trong 1 process
+    - Model YOLOv8-Pose load 1 lần, dùng chung
+    - Mỗi camera có pipeline riêng (tracker, state machine, recorder...)
+    - Frame từ các camera đến trong batch_window được gom vào 1 lần predict
+    """
+    
+    def __init__(
+        self,
+        config_path: str = 'config.yaml',
+        camera_sources: list = None,
+        config: dict = None,
+        websocket_server: WebSocketServer = None
+    ):
+        config_manager = ConfigManager(config_path, config=config)
+        self.config = config_manager.config
+        
+        # Camera list: CLI override > config `cameras` section
+        if camera_sources:
+            self.config['cameras'] = [
+                {'id': f"cam{i}", 'source': parse_camera_source(src)}
+                for i, src in enumerate(camera_sources)
+            ]
+        camera_configs = config_manager.get_camera_configs()
+        
+        if not camera_configs:
+            # Không có section cameras → 1 camera từ config['camera']
+            self.config['cameras'] = [{'id': 'cam0'}]
+            camera_configs = config_manager.get_camera_configs()
+        
+        pose_cfg = self.config.get('pose', {})
+        self.batch_window = float(pose_cfg.get('batch_window_ms', 10)) / 1000.0
+        self.max_batch = int(pose_cfg.get('max_batch', 8))
+        
+        # Shared WebSocket server (1 port cho tất cả camera)
+        if websocket_server is None:
+            websocket_server = WebSocketServer(self.config)
+        self.websocket_server = websocket_server
+        
+        # Per-camera pipelines, model load 1 lần
+        self.systems = {}
+        pose_model = None
+        for camera_id, cam_config in camera_configs:
+            system = FallDetectionSystem(
+                config=cam_config,
+                camera_id=camera_id,
+                pose_model=pose_model,
+                websocket_server=self.websocket_server
+            )
+            pose_model = system.detector.model
+            self.systems[camera_id] = system
+        
+        # Stats
+        self.batches = 0
+        self.batched_frames = 0
+        
+        print(f"[MULTI] {len(self.systems)} cameras, "
+              f"batch window {self.batch_window * 1000:.0f}ms")
+    
+    def run(self):
+        """Run batched multi-camera detection loop"""
+        frame_event = threading.Event()
+        
+        # Open all cameras
+        captures = {}
+        for camera_id, system in self.systems.items():
+            source = system.config['camera']['source']
+            cap, grabber = open_camera(
+                parse_camera_source(source), system.config['camera'], frame_event
+            )
+            if cap is not None:
+                captures[camera_id] = (cap, grabber)
+        
+        if not captures:
+            print("[ERROR] No camera could be opened")
+            return
+        
+        self.websocket_server.start()
+        
+        metrics_server = MetricsServer(
+            self.config, lambda: self.systems, self.websocket_server
+        )
+        metrics_server.start()
+        
+        print("\n[SYSTEM] Starting multi-camera detection...")
+        print("Press 'q' to quit\n")
+        
+        show_video = self.config['debug']['show_video']
+        
+        try:
+            while captures:
+                # Chờ frame đầu tiên từ bất kỳ camera nào
+                # (clear trước khi check để không lỡ notify)
+                frame_event.clear()
+                if self._count_ready(captures) == 0:
+                    frame_event.wait(timeout=1.0)
+                
+                # Gom thêm frame từ camera khác trong batch window
+                batch_target = min(len(captures), self.max_batch)
+                batch_deadline = time.time() + self.batch_window
+                while time.time() < batch_deadline:
+                    frame_event.clear()
+                    if self._count_ready(captures) >= batch_target:
+                        break
+                    frame_event.wait(timeout=max(0.0, batch_deadline - time.time()))
+                
+                batch = self._collect_batch(captures)
+                if not batch:
+                    continue
+                
+                self._process_batch(batch)
+                
+                # Display
+                if show_video:
+                    for camera_id, frame, _, _ in batch:
+                        system = self.systems[camera_id]
+                        with system.profiler.stage('display'):
+                            display = system._create_display(frame)
+                        cv2.imshow(f"Fall Detection - {camera_id}", display)
+                    
+                    key = cv2.waitKey(1) & 0xFF
+                    if key == ord('q'):
+                        break
+        
+        except KeyboardInterrupt:
+            print("\n[SYSTEM] Interrupted by user")
+        
+        finally:
+            for cap, grabber in captures.values():
+                grabber.stop()
+                cap.release()
+            if show_video:
+                cv2.destroyAllWindows()
+            metrics_server.stop()
+            self.websocket_server.stop()
+            
+            for camera_id, system in self.systems.items():
+                system.detector.floor_map.save()
+                print(f"[SYSTEM] {camera_id}: processed {system.frame_count}, "
+                      f"dropped {system.dropped_frames}")
+                system._print_scheduler_stats()
+            if self.batches:
+                print(f"[SYSTEM] Avg batch size: {self.batched_frames / self.batches:.2f}")
+            print("[SYSTEM] Shutdown complete")
+    
+    def get_stage_stats(self, window: bool = False) -> dict:
+        """Per-camera stage latency: {camera_id: {stage: {...}}}"""
+        return {
+            camera_id: system.get_stage_stats(window=window)
+            for camera_id, system in self.systems.items()
+        }
+    
+    def _count_ready(self, captures: dict) -> int:
+        """Số camera có frame mới (hoặc stream đã kết thúc)"""
+        return sum(
+            1 for _, grabber in captures.values()
+            if grabber.has_new_frame() or grabber.stopped
+        )
+    
+    def _collect_batch(self, captures: dict) -> list:
+        """Lấy frame mới nhất từ mỗi camera đã sẵn sàng (tối đa max_batch)"""
+        batch = []
+        
+        for camera_id in list(captures.keys()):
+            cap, grabber = captures[camera_id]
+            
+            if grabber.has_new_frame():
+                ret, frame, capture_time, skipped = grabber.read(timeout=0)
+                if ret:
+                    batch.append((camera_id, frame, capture_time, skipped))
+            elif grabber.stopped:
+                print(f"[WARNING] Camera {camera_id} stream ended")
+                grabber.stop()
+                cap.release()
+                del captures[camera_id]
+            
+            if len(batch) >= self.max_batch:
+                break
+        
+        return batch
+    
+    def _process_batch(self, batch: list):
+        """1 lần predict cho cả batch, rồi trả kết quả về pipeline từng camera"""
+        # Adaptive stride / motion gate: camera calm không cần inference frame này
+        infer_items = []
+        for item in batch:
+            camera_id, frame, capture_time, skipped = item
+            system = self.systems[camera_id]
+            
+            if not system.needs_inference():
+                system._process_frame(frame, capture_time, skip_inference=True)
+                system._update_frame_stats(capture_time, skipped)
+            elif system.motion_gated(frame):
+                # Cảnh tĩnh: không đưa vào batch, dùng lại detections cũ
+                detections = system.detector.reuse_detections(frame, capture_time)
+                system._process_frame(frame, capture_time, detections=detections)
+                system._update_frame_stats(capture_time, skipped)
+            else:
+                infer_items.append(item)
+        
+        if not infer_items:
+            return
+        
+        # Crop inference: camera chỉ cần crop → gom crop của mọi camera vào 1 predict riêng
+        full_items, crop_items, crop_regions = [], [], []
+        for item in infer_items:
+            regions = self.systems[item[0]].plan_crop_regions(item[1])
+            if regions is None:
+                full_items.append(item)
+            else:
+                crop_items.append(item)
+                crop_regions.append((item[1], regions))
+        
+        # Model dùng chung → gọi qua detector của bất kỳ camera nào
+        detector = self.systems[infer_items[0][0]].detector
+        
+        # Dynamic imgsz: 1 predict cho mỗi nhóm camera cùng imgsz
+        size_groups = {}
+        for item in full_items:
+            imgsz = self.systems[item[0]].select_imgsz(item[1])
+            size_groups.setdefault(imgsz, []).append(item)
+        
+        for imgsz, items in size_groups.items():
+            predict_start = time.perf_counter()
+            predictions = detector.predict_batch([frame for _, frame, _, _ in items], imgsz=imgsz)
+            predict_time = time.perf_counter() - predict_start
+            for (camera_id, _, capture_time, _), prediction in zip(items, predictions):
+                self.systems[camera_id].record_inference(
+                    imgsz, predict_time, capture_time, len(prediction[1])
+                )
+            self._dispatch_predictions(items, predictions, predict_time)
+        
+        if crop_items:
+            predict_start = time.perf_counter()
+            predictions = detector.predict_regions(crop_regions)
+            self._dispatch_predictions(
+                crop_items, predictions, time.perf_counter() - predict_start
+            )
+    
+    def _dispatch_predictions(self, items: list, predictions: list, predict_time: float):
+        """Trả kết quả batched predict về pipeline từng camera"""
+        self.batches += 1
+        self.batched_frames += len(items)
+        
+        for (camera_id, frame, capture_time, skipped), prediction in zip(items, predictions):
+            system = self.systems[camera_id]
+            
+            # detect_persons = batched predict (chung) + post-process của camera này
+            post_start = time.perf_counter()
+            detections = system.detector.process_predictions(
+                frame, *prediction, timestamp=capture_time
+            )
+            system.profiler.record(
+                'detect_persons', predict_time + time.perf_counter() - post_start
+            )
+            system._process_frame(frame, capture_time, detections=detections)
+            system._update_frame_stats(capture_time, skipped)
+
+
 def main():
     parser = argparse.ArgumentParser(
         description='Fall Detection System - Professional Edition'
@@ -387,11 +1109,69 @@ def main():
         default=None,
         help='Video file path (instead of camera)'
     )
+    parser.add_argument(
+        '--offline',
+        action='store_true',
+        help='Process --video headless, as fast as possible, with video-time clock'
+    )
+    parser.add_argument(
+        '--events-out',
+        type=str,
+        default=None,
+        help='Offline mode: JSONL output for transitions/alarms (default: <video>.events.jsonl)'
+    )
+    parser.add_argument(
+        '--annotated-out',
+        type=str,
+        default=None,
+        help='Offline mode: also write the video with skeleton/state overlays (e.g. annotated.mp4)'
+    )
+    parser.add_argument(
+        '--cameras',
+        type=str,
+        nargs='+',
+        default=None,
+        help='Multi-camera mode: list of camera indices / video paths / RTSP URLs'
+    )
+    parser.add_argument(
+        '--reset-floor-map',
+        action='store_true',
+        help='Discard the saved floor map of every camera and learn it again (camera moved / re-aimed)'
+    )
     
     args = parser.parse_args()
     
+    config = ConfigManager(args.config).config
+    if args.reset_floor_map:
+        config.setdefault('pose', {}).setdefault('floor_map', {})['reset'] = True
+    
+    # ★ Offline mode: reprocess footage nhanh hơn realtime
+    if args.offline:
+        if args.video is None:
+            parser.error('--offline requires --video')
+        
+        config['debug']['show_video'] = False
+        # Footage cũ không được ghi đè floor map đã học của camera live
+        config.setdefault('pose', {}).setdefault('floor_map', {})['persist'] = False
+        system = FallDetectionSystem(
+            config_path=args.config, config=config, clock=VideoClock()
+        )
+        system.run_offline(
+            args.video, events_path=args.events_out, annotated_path=args.annotated_out
+        )
+        return
+    
+    # ★ Multi-camera mode: --cameras hoặc section `cameras` trong config
+    single_override = args.camera is not None or args.video is not None
+    if args.cameras or (config.get('cameras') and not single_override):
+        system = MultiCameraSystem(
+            config_path=args.config, camera_sources=args.cameras, config=config
+        )
+        system.run()
+        return
+    
     # Create system
-    system = FallDetectionSystem(config_path=args.config)
+    system = FallDetectionSystem(config_path=args.config, config=config)
     
     # Determine camera source
     camera_source = args.camera
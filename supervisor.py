@@ -0,0 +1,244 @@
+"""
+Camera Supervisor
+Chia camera ra nhiều worker process (mỗi process 1 camera / 1 nhóm camera)
+để dùng hết CPU cores - phần Python (tracker, features, state machine) bị GIL giới hạn
+"""
+import os
+import sys
+import time
+import copy
+import argparse
+import multiprocessing as mp
+
+# ⚠️ Không import cv2/numpy/torch/main (kể cả package utils) ở đây: worker (spawn)
+# import lại module này, OpenMP/MKL/OpenBLAS đọc env lúc load → phải set số thread trước
+
+
+def _limit_threads(num_threads: int):
+    """Pin intra-op thread count (phải gọi trước khi import torch/cv2)"""
+    for var in ('OMP_NUM_THREADS', 'MKL_NUM_THREADS', 'OPENBLAS_NUM_THREADS'):
+        os.environ[var] = str(num_threads)
+
+
+def worker_main(worker_name: str, config: dict, alert_queue, num_threads: int):
+    """
+    Worker process entry: chạy MultiCameraSystem cho nhóm camera của nó
+    Alert được đẩy về supervisor qua alert_queue
+    """
+    _limit_threads(num_threads)
+
+    import cv2
+    cv2.setNumThreads(num_threads)
+
+    try:
+        import torch
+        torch.set_num_threads(num_threads)
+    except ImportError:
+        pass
+
+    from main import MultiCameraSystem
+    from api import QueueAlertSink
+
+    system = MultiCameraSystem(
+        config=config,
+        websocket_server=QueueAlertSink(alert_queue, worker_name)
+    )
+    system.run()
+
+    # Stream live kết thúc (mất RTSP, rút camera) → exit != 0 để supervisor restart
+    # Chỉ video file mới được coi là kết thúc bình thường
+    live_sources = [
+        cam for cam in config['cameras']
+        if not os.path.isfile(str(cam.get('source', '')))
+    ]
+    if live_sources:
+        sys.exit(1)
+
+
+class CameraSupervisor:
+    """
+    Spawn 1 worker process / nhóm camera, restart worker bị crash,
+    gom alert từ tất cả worker về 1 WebSocketServer
+    """
+
+    def __init__(self, config_path: str = 'config.yaml'):
+        # Import lazy: utils/__init__ kéo theo cv2 + numpy (xem ghi chú đầu file)
+        from utils.config import ConfigManager
+
+        self.config_manager = ConfigManager(config_path)
+        self.config = self.config_manager.config
+
+        sup_config = self.config.get('supervisor', {})
+        self.cameras_per_worker = max(1, int(sup_config.get('cameras_per_worker', 1)))
+        self.threads_per_worker = max(1, int(sup_config.get('threads_per_worker', 1)))
+        self.restart_delay = float(sup_config.get('restart_delay', 2.0))
+        self.max_restart_delay = float(sup_config.get('max_restart_delay', 60.0))
+
+        cameras = self.config.get('cameras') or []
+        if not cameras:
+            raise ValueError("supervisor requires a non-empty `cameras` section in config")
+
+        # Worker groups: {worker_name: [camera entries]}
+        self.groups = self._group_cameras(cameras)
+
+        self.ctx = mp.get_context('spawn')
+        self.alert_queue = self.ctx.Queue(maxsize=1000)
+
+        # Worker state: {name: {'process', 'restarts', 'next_start', 'delay'}}
+        self.workers = {}
+
+        print(f"[SUPERVISOR] {len(cameras)} cameras → {len(self.groups)} workers "
+              f"({self.threads_per_worker} threads each)")
+
+    def _group_cameras(self, cameras: list) -> dict:
+        """
+        Nhóm camera theo key `worker` (nếu có),
+        còn lại chia đều cameras_per_worker camera / worker
+        """
+        groups = {}
+        ungrouped = []
+
+        for index, cam in enumerate(cameras):
+            cam = dict(cam)
+            cam.setdefault('id', f"cam{index}")
+            worker = cam.pop('worker', None)
+            if worker is None:
+                ungrouped.append(cam)
+            else:
+                groups.setdefault(str(worker), []).append(cam)
+
+        for start in range(0, len(ungrouped), self.cameras_per_worker):
+            chunk = ungrouped[start:start + self.cameras_per_worker]
+            name = "+".join(str(cam['id']) for cam in chunk)
+            groups[name] = chunk
+
+        return groups
+
+    def _worker_config(self, cameras: list, worker_index: int) -> dict:
+        """Config cho 1 worker: chỉ camera của nó, headless"""
+        config = copy.deepcopy(self.config)
+        config['cameras'] = cameras
+        config.setdefault('debug', {})['show_video'] = False
+        
+        # Mỗi worker 1 metrics port riêng: port, port+1, ...
+        metrics_config = config.setdefault('monitoring', {}).setdefault('metrics_server', {})
+        metrics_config['port'] = int(metrics_config.get('port', 9100)) + worker_index
+        return config
+
+    def _start_worker(self, name: str):
+        process = self.ctx.Process(
+            target=worker_main,
+            args=(
+                name,
+                self._worker_config(self.groups[name], list(self.groups).index(name)),
+                self.alert_queue,
+                self.threads_per_worker,
+            ),
+            name=f"fall-worker-{name}",
+            daemon=True,
+        )
+        process.start()
+
+        state = self.workers.setdefault(name, {
+            'restarts': 0,
+            'delay': self.restart_delay,
+            'next_start': None,
+        })
+        state['process'] = process
+        state['started_at'] = time.time()
+        state['next_start'] = None
+
+        print(f"[SUPERVISOR] Worker {name} started (pid {process.pid})")
+
+    def _check_workers(self):
+        """Restart workers that crashed (exponential backoff)"""
+        now = time.time()
+
+        for name, state in self.workers.items():
+            process = state.get('process')
+
+            # Chờ backoff để restart
+            if state['next_start'] is not None:
+                if now >= state['next_start']:
+                    state['restarts'] += 1
+                    self._start_worker(name)
+                continue
+
+            if process is None or process.is_alive():
+                continue
+
+            if process.exitcode == 0:
+                # Stream kết thúc bình thường (video file) - không restart
+                if state.get('finished') is None:
+                    print(f"[SUPERVISOR] Worker {name} finished")
+                    state['finished'] = now
+                continue
+
+            # Crash → reset backoff nếu worker đã chạy ổn định 1 lúc
+            if now - state['started_at'] > self.max_restart_delay:
+                state['delay'] = self.restart_delay
+
+            print(f"[SUPERVISOR] Worker {name} crashed (exit {process.exitcode}), "
+                  f"restarting in {state['delay']:.1f}s")
+            state['process'] = None
+            state['next_start'] = now + state['delay']
+            state['delay'] = min(state['delay'] * 2, self.max_restart_delay)
+
+    def _all_finished(self) -> bool:
+        return all(state.get('finished') is not None for state in self.workers.values())
+
+    def run(self):
+        """Start workers + shared WebSocket server, supervise until Ctrl+C"""
+        from api import WebSocketServer, AlertForwarder
+
+        websocket_server = WebSocketServer(self.config)
+        forwarder = AlertForwarder(self.alert_queue, websocket_server)
+
+        websocket_server.start()
+        forwarder.start()
+
+        for name in self.groups:
+            self._start_worker(name)
+
+        try:
+            while not self._all_finished():
+                time.sleep(1.0)
+                self._check_workers()
+
+        except KeyboardInterrupt:
+            print("\n[SUPERVISOR] Interrupted by user")
+
+        finally:
+            for name, state in self.workers.items():
+                process = state.get('process')
+                if process is not None and process.is_alive():
+                    process.terminate()
+                    process.join(timeout=5.0)
+
+            forwarder.stop()
+            websocket_server.stop()
+
+            restarts = {name: state['restarts'] for name, state in self.workers.items()}
+            print(f"[SUPERVISOR] Alerts forwarded: {forwarder.forwarded}, restarts: {restarts}")
+            print("[SUPERVISOR] Shutdown complete")
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Fall Detection Supervisor - 1 worker process per camera group'
+    )
+    parser.add_argument(
+        '--config',
+        type=str,
+        default='config.yaml',
+        help='Config file path (must contain a `cameras` section)'
+    )
+
+    args = parser.parse_args()
+
+    supervisor = CameraSupervisor(config_path=args.config)
+    supervisor.run()
+
+
+if __name__ == '__main__':
+    main()
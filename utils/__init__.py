@@ -1,13 +1,17 @@
 """Utils modules initialization"""
 from utils.config import ConfigManager
-from utils.logger import EventLogger
+from utils.logger import EventLogger, JsonlEventWriter
 from utils.risk_scorer import RiskScorer
 from utils.video_buffer import VideoRecorder, CircularVideoBuffer
+from utils.metrics import LatencyHistogram, StageProfiler
 
 __all__ = [
     'ConfigManager',
     'EventLogger',
+    'JsonlEventWriter',
     'RiskScorer',
     'VideoRecorder',
-    'CircularVideoBuffer'
+    'CircularVideoBuffer',
+    'LatencyHistogram',
+    'StageProfiler'
 ]
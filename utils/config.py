@@ -4,15 +4,17 @@ Load và validate config từ YAML
 """
 import yaml
 import os
-from typing import Dict, Any
+import copy
+from typing import Dict, Any, List, Tuple
 
 
 class ConfigManager:
     """Load and manage configuration"""
     
-    def __init__(self, config_path: str = 'config.yaml'):
+    def __init__(self, config_path: str = 'config.yaml', config: Dict[str, Any] = None):
         self.config_path = config_path
-        self.config = self.load_config()
+        # config truyền sẵn (vd. worker process) → không đọc lại file
+        self.config = config if config is not None else self.load_config()
     
     def load_config(self) -> Dict[str, Any]:
         """Load config from YAML file"""
@@ -145,6 +147,42 @@ class ConfigManager:
         
         config[keys[-1]] = value
     
+    def get_camera_configs(self) -> List[Tuple[str, Dict[str, Any]]]:
+        """
+        Build per-camera configs from the optional `cameras` section
+        Mỗi entry: id, source (+ width/height/fps) và có thể override
+        bất kỳ section nào khác (vd. detection, recording)
+        Returns: [(camera_id, config)] - list rỗng nếu không có section
+        """
+        cameras = self.config.get('cameras') or []
+        camera_configs = []
+        
+        for index, cam in enumerate(cameras):
+            cam = dict(cam)
+            camera_id = str(cam.pop('id', f"cam{index}"))
+            cam.pop('worker', None)  # Chỉ dùng bởi supervisor.py
+            
+            cam_config = copy.deepcopy(self.config)
+            cam_config.pop('cameras', None)
+            
+            # Top-level keys của camera (source/width/height/fps) → camera section
+            for key in list(cam.keys()):
+                if key in cam_config['camera']:
+                    cam_config['camera'][key] = cam.pop(key)
+            
+            # Các section còn lại → deep merge
+            _deep_merge(cam_config, cam)
+            
+            # Mỗi camera ghi recordings vào thư mục riêng
+            recording = cam_config.setdefault('recording', {})
+            recording['output_dir'] = os.path.join(
+                recording.get('output_dir', 'recordings'), camera_id
+            )
+            
+            camera_configs.append((camera_id, cam_config))
+        
+        return camera_configs
+    
     def save_config(self, path: str = None):
         """Save config to YAML file"""
         if path is None:
@@ -156,3 +194,13 @@ class ConfigManager:
             print(f"[INFO] Config saved to {path}")
         except Exception as e:
             print(f"[ERROR] Failed to save config: {e}")
+
+
+def _deep_merge(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Recursively merge override into base (in place)"""
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(base.get(key), dict):
+            _deep_merge(base[key], value)
+        else:
+            base[key] = value
+    return base
@@ -4,9 +4,11 @@ SQLite database để log events
 """
 import sqlite3
 import os
+import time
 from datetime import datetime
 from typing import Dict, Optional
 import json
+from utils.metrics import LatencyHistogram
 
 
 class EventLogger:
@@ -14,13 +16,17 @@ class EventLogger:
     Log fall detection events to SQLite database
     """
     
-    def __init__(self, config: dict):
+    def __init__(self, config: dict, camera_id: Optional[str] = None):
         self.config = config
+        self.camera_id = camera_id  # Multi-camera: ghi kèm camera vào events
         monitoring_config = config.get('monitoring', {})
         
         self.enabled = monitoring_config.get('enabled', True)
         self.log_file = monitoring_config.get('log_file', 'logs/fall_detection.db')
         
+        # SQLite write latency (connect → commit), exposed qua metrics endpoint
+        self.write_latency = LatencyHistogram()
+        
         # Create logs directory
         os.makedirs(os.path.dirname(self.log_file), exist_ok=True)
         
@@ -51,6 +57,26 @@ class EventLogger:
                 )
             ''')
             
+            # Per-stage latency (p50/p95/p99 mỗi window)
+            cursor.execute('''
+                CREATE TABLE IF NOT EXISTS stage_latency (
+                    id INTEGER PRIMARY KEY AUTOINCREMENT,
+                    timestamp TEXT NOT NULL,
+                    camera_id TEXT,
+                    stage TEXT NOT NULL,
+                    count INTEGER,
+                    mean_ms REAL,
+                    p50_ms REAL,
+                    p95_ms REAL,
+                    p99_ms REAL,
+                    max_ms REAL
+                )
+            ''')
+            
+            # Migrate database cũ (trước multi-camera)
+            self._ensure_column(cursor, 'events', 'camera_id', 'TEXT')
+            self._ensure_column(cursor, 'events', 'breathing', 'TEXT')
+            
             # System stats table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS system_stats (
@@ -71,6 +97,13 @@ class EventLogger:
             print(f"[ERROR] Failed to initialize database: {e}")
             self.enabled = False
     
+    def _ensure_column(self, cursor, table: str, column: str, column_type: str):
+        """Add column to an existing table if missing"""
+        cursor.execute(f"PRAGMA table_info({table})")
+        columns = [row[1] for row in cursor.fetchall()]
+        if column not in columns:
+            cursor.execute(f"ALTER TABLE {table} ADD COLUMN {column} {column_type}")
+    
     def log_event(
         self,
         event_type: str,
@@ -81,34 +114,41 @@ class EventLogger:
         video_path: Optional[str] = None,
         features: Optional[Dict] = None,
         ml_prediction: Optional[Dict] = None,
-        notes: Optional[str] = None
+        notes: Optional[str] = None,
+        breathing: Optional[Dict] = None
     ):
         """Log a fall detection event"""
         if not self.enabled:
             return
         
         try:
+            write_start = time.perf_counter()
             conn = sqlite3.connect(self.log_file)
             cursor = conn.cursor()
             
             timestamp = datetime.now().isoformat()
             
             # Convert dicts to JSON
-            features_json = json.dumps(features) if features else None
+            # dict(...): features có thể là Mapping (PoseFeatures), json.dumps chỉ nhận dict
+            features_json = json.dumps(dict(features)) if features else None
             ml_pred_json = json.dumps(ml_prediction) if ml_prediction else None
+            breathing_json = json.dumps(breathing) if breathing else None
             
             cursor.execute('''
                 INSERT INTO events (
                     timestamp, event_type, track_id, risk_score, state,
-                    snapshot_path, video_path, features, ml_prediction, notes
-                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                    snapshot_path, video_path, features, ml_prediction, notes,
+                    camera_id, breathing
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
             ''', (
                 timestamp, event_type, track_id, risk_score, state,
-                snapshot_path, video_path, features_json, ml_pred_json, notes
+                snapshot_path, video_path, features_json, ml_pred_json, notes,
+                self.camera_id, breathing_json
             ))
             
             conn.commit()
             conn.close()
+            self.write_latency.record(time.perf_counter() - write_start)
             
         except Exception as e:
             print(f"[ERROR] Failed to log event: {e}")
@@ -125,6 +165,7 @@ class EventLogger:
             return
         
         try:
+            write_start = time.perf_counter()
             conn = sqlite3.connect(self.log_file)
             cursor = conn.cursor()
             
@@ -138,10 +179,48 @@ class EventLogger:
             
             conn.commit()
             conn.close()
+            self.write_latency.record(time.perf_counter() - write_start)
             
         except Exception as e:
             print(f"[ERROR] Failed to log system stats: {e}")
     
+    def log_stage_latency(self, stage_stats: Dict[str, Dict[str, float]]):
+        """
+        Log per-stage latency summaries
+        stage_stats: {stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}
+        """
+        if not self.enabled or not stage_stats:
+            return
+        
+        try:
+            write_start = time.perf_counter()
+            conn = sqlite3.connect(self.log_file)
+            cursor = conn.cursor()
+            
+            timestamp = datetime.now().isoformat()
+            
+            cursor.executemany('''
+                INSERT INTO stage_latency (
+                    timestamp, camera_id, stage, count,
+                    mean_ms, p50_ms, p95_ms, p99_ms, max_ms
+                ) VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+            ''', [
+                (
+                    timestamp, self.camera_id, stage, stats['count'],
+                    stats['mean_ms'], stats['p50_ms'], stats['p95_ms'],
+                    stats['p99_ms'], stats['max_ms']
+                )
+                for stage, stats in stage_stats.items()
+                if stats['count'] > 0
+            ])
+            
+            conn.commit()
+            conn.close()
+            self.write_latency.record(time.perf_counter() - write_start)
+            
+        except Exception as e:
+            print(f"[ERROR] Failed to log stage latency: {e}")
+    
     def get_recent_events(self, limit: int = 100) -> list:
         """Get recent events from database"""
         if not self.enabled:
@@ -206,3 +285,39 @@ class EventLogger:
         except Exception as e:
             print(f"[ERROR] Failed to get stats: {e}")
             return {}
+
+
+class JsonlEventWriter:
+    """
+    Append-only JSONL log (1 JSON object / dòng)
+    Dùng cho offline mode: ghi mọi state transition + alarm để phân tích lại
+    """
+    
+    def __init__(self, path: str):
+        self.path = path
+        
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        
+        self.file = open(path, 'w')
+        self.count = 0
+    
+    def write(self, record: Dict):
+        """Write one record"""
+        self.file.write(json.dumps(record, default=_json_default) + '\n')
+        self.count += 1
+    
+    def close(self):
+        """Flush and close file"""
+        if not self.file.closed:
+            self.file.close()
+
+
+def _json_default(value):
+    """Serialize numpy scalars/arrays and tuples in feature dicts"""
+    if hasattr(value, 'tolist'):
+        return value.tolist()
+    if hasattr(value, 'item'):
+        return value.item()
+    return str(value)
@@ -0,0 +1,187 @@
+"""
+Pipeline Metrics
+Fixed-bucket latency histograms (p50/p95/p99) cho từng stage của frame pipeline
+Overhead thấp: bucket cố định, chỉ tăng counter, không lưu từng sample
+"""
+import time
+from bisect import bisect_left
+from typing import Dict, List, Optional
+
+
+def _default_bounds_ms() -> List[float]:
+    """Log-spaced bucket upper bounds: 0.05ms → ~20s, mỗi bucket x1.25"""
+    bounds = []
+    value = 0.05
+    while value < 20000.0:
+        bounds.append(round(value, 4))
+        value *= 1.25
+    return bounds
+
+
+DEFAULT_BOUNDS_MS = _default_bounds_ms()
+
+
+class LatencyHistogram:
+    """
+    Histogram với bucket cố định (ms)
+    Giữ 2 bộ đếm: cumulative (cho metrics endpoint) và window (reset sau mỗi lần dump)
+    """
+
+    def __init__(self, bounds_ms: Optional[List[float]] = None):
+        self.bounds = list(bounds_ms) if bounds_ms is not None else DEFAULT_BOUNDS_MS
+        num_buckets = len(self.bounds) + 1  # + overflow bucket
+
+        # Cumulative
+        self.counts = [0] * num_buckets
+        self.count = 0
+        self.sum_ms = 0.0
+        self.max_ms = 0.0
+
+        # Window (since last reset_window)
+        self.window_counts = [0] * num_buckets
+        self.window_count = 0
+        self.window_sum_ms = 0.0
+        self.window_max_ms = 0.0
+
+    def record(self, seconds: float):
+        """Record one duration (seconds)"""
+        value_ms = seconds * 1000.0
+        index = bisect_left(self.bounds, value_ms)
+
+        self.counts[index] += 1
+        self.count += 1
+        self.sum_ms += value_ms
+        if value_ms > self.max_ms:
+            self.max_ms = value_ms
+
+        self.window_counts[index] += 1
+        self.window_count += 1
+        self.window_sum_ms += value_ms
+        if value_ms > self.window_max_ms:
+            self.window_max_ms = value_ms
+
+    def percentile(self, q: float, window: bool = False) -> float:
+        """
+        Percentile (ms), nội suy tuyến tính trong bucket
+        q: 0-100
+        """
+        counts = self.window_counts if window else self.counts
+        total = self.window_count if window else self.count
+        max_ms = self.window_max_ms if window else self.max_ms
+
+        if total == 0:
+            return 0.0
+
+        rank = q / 100.0 * total
+        cumulative = 0
+        for index, bucket_count in enumerate(counts):
+            if bucket_count == 0:
+                continue
+            if cumulative + bucket_count >= rank:
+                lower = self.bounds[index - 1] if index > 0 else 0.0
+                upper = self.bounds[index] if index < len(self.bounds) else max_ms
+                fraction = (rank - cumulative) / bucket_count
+                return min(lower + (upper - lower) * fraction, max_ms)
+            cumulative += bucket_count
+
+        return max_ms
+
+    def summary(self, window: bool = False) -> Dict[str, float]:
+        """count, mean, p50, p95, p99, max (ms)"""
+        count = self.window_count if window else self.count
+        total_ms = self.window_sum_ms if window else self.sum_ms
+
+        return {
+            'count': count,
+            'mean_ms': total_ms / count if count else 0.0,
+            'p50_ms': self.percentile(50, window),
+            'p95_ms': self.percentile(95, window),
+            'p99_ms': self.percentile(99, window),
+            'max_ms': self.window_max_ms if window else self.max_ms,
+        }
+
+    def reset_window(self):
+        """Start a new window (cumulative counters are kept)"""
+        self.window_counts = [0] * len(self.window_counts)
+        self.window_count = 0
+        self.window_sum_ms = 0.0
+        self.window_max_ms = 0.0
+
+
+class _StageTimer:
+    """Reusable context manager (1 instance / stage, không allocate mỗi frame)"""
+
+    __slots__ = ('histogram', 'start')
+
+    def __init__(self, histogram: LatencyHistogram):
+        self.histogram = histogram
+        self.start = 0.0
+
+    def __enter__(self):
+        self.start = time.perf_counter()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        self.histogram.record(time.perf_counter() - self.start)
+        return False
+
+
+class StageProfiler:
+    """
+    Per-stage latency histograms cho 1 camera
+    Usage:
+        with profiler.stage('detect_persons'):
+            detections = detector.detect_persons(frame)
+    """
+
+    def __init__(self, camera_id: Optional[str] = None, enabled: bool = True):
+        self.camera_id = camera_id
+        self.enabled = enabled
+        self.histograms: Dict[str, LatencyHistogram] = {}
+        self._timers: Dict[str, _StageTimer] = {}
+        self._null_timer = _NullTimer()
+
+    def stage(self, name: str):
+        """Context manager timing one stage"""
+        if not self.enabled:
+            return self._null_timer
+
+        timer = self._timers.get(name)
+        if timer is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+            timer = _StageTimer(histogram)
+            self._timers[name] = timer
+        return timer
+
+    def record(self, name: str, seconds: float):
+        """Record a duration measured elsewhere"""
+        if not self.enabled:
+            return
+
+        histogram = self.histograms.get(name)
+        if histogram is None:
+            histogram = self.histograms.setdefault(name, LatencyHistogram())
+        histogram.record(seconds)
+
+    def snapshot(self, window: bool = False) -> Dict[str, Dict[str, float]]:
+        """{stage: {count, mean_ms, p50_ms, p95_ms, p99_ms, max_ms}}"""
+        return {
+            name: histogram.summary(window)
+            for name, histogram in self.histograms.items()
+        }
+
+    def reset_window(self):
+        for histogram in self.histograms.values():
+            histogram.reset_window()
+
+
+class _NullTimer:
+    """No-op timer khi profiler tắt"""
+
+    __slots__ = ()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        return False